@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Moteur de backtest vectorisé (TP/SL + Break Even optionnel)
+Version 1.0 - 2026-10-18
+
+OBJECTIF:
+- Remplacer les boucles df_test[df_test['time'] > entry_time].head(N) + iterrows()
+  des backtests V2 / V3 / V4
+- Indices de barres calculés une seule fois, sorties résolues par resolve_exits
+- Même journal de trades (entry_time, exit_price, bars_held, be_activated, pnl_usd...)
+
+Règles (identiques aux scripts d'origine):
+- Direction: signal_score >= 2 -> BUY, <= -2 -> SELL, sinon pas de trade
+- Barres futures: barres de df_bars avec time > entry_time (max_bars au maximum)
+- Break Even à +1R: stop déplacé au prix d'entrée, sortie au BE = WIN
+- Ni TP ni SL: sortie au close de la dernière barre, WIN si P&L > 0
+- Trades sans barre future ignorés
+"""
+
+import numpy as np
+import pandas as pd
+from labeling_engine import resolve_exits, LOSS, TIMEOUT
+
+TRADE_COLUMNS = [
+    'entry_time', 'entry_price', 'exit_price', 'direction', 'signal_proba',
+    'result', 'pnl_pct', 'pnl_usd', 'bars_held', 'be_activated',
+    'tp_price', 'sl_price_initial', 'atr'
+]
+
+
+def simulate_trades(df_bars, signals_mask, signal_proba, max_bars=180, use_break_even=False,
+                    risk_per_trade=100, sl_col='sl_price', tp_col='tp_price', atr_col='atr14'):
+    """
+    Simule tous les signaux d'un coup sur les barres de test.
+
+    Args:
+        df_bars: barres de test triées par 'time' (high, low, close, signal_score, SL/TP, ATR)
+        signals_mask: masque booléen (ou positions entières) des barres de signal
+        signal_proba: probabilité du modèle pour chaque signal (même ordre que signals_mask)
+        max_bars: horizon maximum en barres (180 en V2/V3, 240 en V4)
+        use_break_even: déplacer le SL au prix d'entrée à +1R
+        risk_per_trade: risque en $ par trade (P&L exprimé en multiples de R)
+
+    Returns:
+        DataFrame des trades (colonnes TRADE_COLUMNS)
+    """
+    times = df_bars['time'].values
+    high = df_bars['high'].values
+    low = df_bars['low'].values
+    close = df_bars['close'].values
+
+    signals_mask = np.asarray(signals_mask)
+    positions = np.flatnonzero(signals_mask) if signals_mask.dtype == bool else signals_mask
+    signal_proba = np.asarray(signal_proba, dtype=np.float64)
+
+    # Direction basée sur signal_score
+    signal_score = df_bars['signal_score'].values[positions]
+    direction = np.where(signal_score >= 2, 1, np.where(signal_score <= -2, -1, 0))
+
+    # Première barre strictement après entry_time (même résultat que time > entry_time)
+    first_future = np.searchsorted(times, times[positions], side='right')
+    has_future = first_future < len(times)
+
+    keep = (direction != 0) & has_future
+    positions = positions[keep]
+    direction = direction[keep]
+    signal_proba = signal_proba[keep]
+    scan_start = first_future[keep] - 1
+
+    entry_price = close[positions]
+    sl_price = df_bars[sl_col].values[positions].astype(np.float64)
+    tp_price = df_bars[tp_col].values[positions].astype(np.float64)
+    atr = df_bars[atr_col].values[positions]
+
+    # Break Even level (+1R)
+    sl_distance = np.abs(sl_price - entry_price)
+    be_level = np.where(direction > 0, entry_price + sl_distance, entry_price - sl_distance)
+
+    outcome, bars_held, be_activated = resolve_exits(
+        high, low, scan_start, direction, sl_price, tp_price, max_bars,
+        be_trigger=be_level if use_break_even else None, be_stop=entry_price
+    )
+
+    # Prix de sortie
+    exit_price = tp_price.copy()
+    stopped = outcome == LOSS
+    exit_price[stopped] = np.where(be_activated[stopped], entry_price[stopped], sl_price[stopped])
+    timeout = outcome == TIMEOUT
+    exit_price[timeout] = close[scan_start[timeout] + bars_held[timeout]]
+
+    # Calculer P&L
+    pnl_pct = (exit_price - entry_price) / entry_price * 100
+    pnl_pct = np.where(direction == -1, -pnl_pct, pnl_pct)
+    pnl_usd = risk_per_trade * (pnl_pct / (sl_distance / entry_price * 100))
+
+    # BE protégé = WIN, timeout = WIN si P&L > 0
+    win = (outcome != LOSS) | be_activated
+    win[timeout] = pnl_pct[timeout] > 0
+
+    return pd.DataFrame({
+        'entry_time': df_bars['time'].values[positions],
+        'entry_price': entry_price,
+        'exit_price': exit_price,
+        'direction': direction,
+        'signal_proba': signal_proba,
+        'result': np.where(win, 'WIN', 'LOSS'),
+        'pnl_pct': pnl_pct,
+        'pnl_usd': pnl_usd,
+        'bars_held': bars_held,
+        'be_activated': be_activated,
+        'tp_price': tp_price,
+        'sl_price_initial': sl_price,
+        'atr': atr
+    }, columns=TRADE_COLUMNS)
@@ -11,10 +11,11 @@ OBJECTIF:
 
 import pandas as pd
 import numpy as np
-import joblib
 import os
 from datetime import datetime
-import matplotlib.pyplot as plt
+from prediction_store import PredictionStore, cached_predict
+from model_bundle import load_model, saved_fingerprint
+from run_report import RunReport
 
 print("=" * 80)
 print("📊 BACKTEST MODÈLE LIGHTGBM")
@@ -37,7 +38,14 @@ TEST_RATIO = 0.2
 # Seuil de prédiction
 PREDICTION_THRESHOLD = 0.25  # Probabilité minimum pour prendre un trade
 
+# Cache des probabilités par barre (sous base_path): relance avec d'autres
+# paramètres de risque / threshold sans re-scorer
+PREDICTION_DIR = "prediction_store"
+
+report = RunReport("backtest_lightgbm")
+
 # ==================== CHARGEMENT ====================
+report.stage("chargement")
 print("\n" + "=" * 80)
 print("📂 CHARGEMENT MODÈLE ET DONNÉES")
 print("=" * 80)
@@ -48,8 +56,7 @@ model_path = os.path.join(base_path, MODEL_FILE)
 
 # Charger le modèle
 print("🤖 Chargement du modèle...")
-model_data = joblib.load(model_path)
-model = model_data['model']
+model_data = load_model(model_path)
 feature_cols = model_data['feature_cols']
 print(f"✅ Modèle chargé ({len(feature_cols)} features)")
 
@@ -74,6 +81,7 @@ print(f"   Test:  {df_test['time'].min()} → {df_test['time'].max()}")
 print(f"   Test:  {len(df_test)} barres ({len(df_test)/len(df)*100:.1f}% du dataset)")
 
 # ==================== PRÉDICTIONS ====================
+report.stage("predictions")
 print("\n" + "=" * 80)
 print("🔮 GÉNÉRATION PRÉDICTIONS ML")
 print("=" * 80)
@@ -81,8 +89,16 @@ print("=" * 80)
 X_test = df_test[feature_cols].copy()
 X_test = X_test.replace([np.inf, -np.inf], np.nan).fillna(0)
 
+def score_bars(d):
+    # Booster lu dans le bundle seulement s'il reste des barres à scorer
+    model = model_data['model']
+    return {'proba': model.predict(d[feature_cols], num_iteration=model.best_iteration)}
+
 print("🚀 Prédiction en cours...")
-y_pred_proba = model.predict(X_test, num_iteration=model.best_iteration)
+prediction_store = PredictionStore(os.path.join(base_path, PREDICTION_DIR))
+y_pred_proba = cached_predict(
+    prediction_store, saved_fingerprint(model_path), X_test.assign(time=df_test['time']), score_bars
+)['proba'].values
 y_pred = (y_pred_proba >= PREDICTION_THRESHOLD).astype(int)
 
 df_test['ml_pred'] = y_pred
@@ -93,6 +109,7 @@ print(f"   Signaux WIN prédits: {(y_pred == 1).sum()} ({(y_pred == 1).sum()/len
 print(f"   Signaux LOSS prédits: {(y_pred == 0).sum()} ({(y_pred == 0).sum()/len(y_pred)*100:.1f}%)")
 
 # ==================== SIMULATION TRADES ====================
+report.stage("backtest")
 print("\n" + "=" * 80)
 print("💼 SIMULATION TRADES")
 print("=" * 80)
@@ -145,6 +162,7 @@ print(f"   Return:            {ml_total_pnl/INITIAL_CAPITAL*100:.2f}%")
 print(f"   Profit Factor:     {ml_profit_factor:.2f}")
 
 # ==================== COMPARAISON SANS FILTRE ML ====================
+report.stage("backtest sans filtre")
 print("\n" + "=" * 80)
 print("📊 COMPARAISON AVEC STRATÉGIE 'BUY ALL SIGNALS'")
 print("=" * 80)
@@ -223,3 +241,5 @@ else:
     print(f"   3. Réentraîner et retester")
 
 print("\n" + "=" * 80)
+
+report.save(model_path, tag="backtest")
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Datasets LightGBM binnés une seule fois par fold, réutilisés par tous les trials Optuna
+Version 1.0 - 2026-10-18
+
+OBJECTIF:
+- hyperparameter_tuning_optuna.py reconstruisait lgb.Dataset à chaque fold de
+  chaque trial (200 trials x 3 folds), V5 / V6 refaisaient LGBMClassifier.fit
+  sur le DataFrame: LightGBM re-binnait les mêmes features des centaines de fois
+- Ici: chaque fold est binné au premier trial puis réutilisé tel quel
+  (num_leaves, learning_rate, min_child_samples, lambda... ne touchent pas au binning)
+- Un trial ne coûte plus que la croissance des arbres
+
+NOTE:
+- feature_pre_filter=False: sinon LightGBM retire au binning les features non
+  splittables pour le min_data_in_leaf du premier trial et refuse ensuite de
+  changer min_child_samples
+- Un paramètre de binning (max_bin, min_data_in_bin, seed...) différent ->
+  nouveau jeu de datasets (un par combinaison rencontrée)
+- Même modèle que LGBMClassifier(**params).fit(X_train, y_train): mêmes alias
+  (n_estimators, subsample, colsample_bytree, reg_alpha...) acceptés par lgb.train
+"""
+
+from collections import namedtuple
+import lightgbm as lgb
+
+# Paramètres (et alias) qui changent la construction du Dataset
+BINNING_PARAMS = {
+    'max_bin', 'max_bins', 'max_bin_by_feature', 'min_data_in_bin',
+    'bin_construct_sample_cnt', 'subsample_for_bin',
+    'data_random_seed', 'data_seed', 'seed', 'random_seed', 'random_state',
+    'use_missing', 'zero_as_missing', 'enable_bundle', 'is_enable_bundle', 'bundle',
+    'linear_tree', 'linear_trees', 'categorical_feature', 'cat_feature', 'categorical_column',
+    'forcedbins_filename', 'feature_pre_filter',
+}
+
+DATASET_PARAMS = {'feature_pre_filter': False, 'verbosity': -1}
+
+Fold = namedtuple('Fold', ['train_set', 'valid_set', 'X_val', 'y_val'])
+
+
+class BinnedFolds:
+    """
+    Folds train / validation dont les lgb.Dataset sont construits une seule fois.
+
+    Args:
+        fold_frames: fonction sans argument -> itérable de (X_train, y_train, X_val, y_val)
+            (appelée à chaque construction: les copies iloc ne sont pas conservées)
+    """
+
+    def __init__(self, fold_frames):
+        self._fold_frames = fold_frames
+        self._datasets = {}
+
+    def train_params(self, params):
+        """Paramètres du trial complétés des paramètres de construction des datasets."""
+        return {**params, **DATASET_PARAMS}
+
+    def folds(self, params):
+        """Folds binnés pour ces paramètres (construits au premier appel)."""
+        key = tuple(sorted((k, repr(v)) for k, v in params.items() if k in BINNING_PARAMS))
+        if key not in self._datasets:
+            dataset_params = {k: v for k, v in params.items() if k in BINNING_PARAMS}
+            dataset_params.update(DATASET_PARAMS)
+
+            folds = []
+            for X_train, y_train, X_val, y_val in self._fold_frames():
+                train_set = lgb.Dataset(X_train, label=y_train, params=dataset_params).construct()
+                valid_set = lgb.Dataset(X_val, label=y_val, reference=train_set,
+                                        params=dataset_params).construct()
+                folds.append(Fold(train_set, valid_set, X_val, y_val))
+            self._datasets[key] = folds
+        return self._datasets[key]
+
+    def train(self, params, fold, num_boost_round=100, valid=True, **kwargs):
+        """lgb.train sur un fold binné (valid=True: fold.valid_set en valid_sets)."""
+        if valid:
+            kwargs.setdefault('valid_sets', [fold.valid_set])
+        return lgb.train(self.train_params(params), fold.train_set,
+                         num_boost_round=num_boost_round, **kwargs)
+
+
+def cv_folds(X, y, splits):
+    """Folds de validation croisée (ex: TimeSeriesSplit(n_splits).split(X))."""
+    splits = list(splits)
+    return BinnedFolds(lambda: ((X.iloc[train_idx], y.iloc[train_idx], X.iloc[val_idx], y.iloc[val_idx])
+                                for train_idx, val_idx in splits))
+
+
+def holdout_folds(X_train, y_train, X_val, y_val):
+    """Un seul fold (train / calib de V5, fenêtre walk-forward V6)."""
+    return BinnedFolds(lambda: [(X_train, y_train, X_val, y_val)])
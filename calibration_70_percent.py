@@ -11,11 +11,12 @@ OBJECTIF:
 
 import pandas as pd
 import numpy as np
-import joblib
 import os
-from sklearn.calibration import calibration_curve
-from sklearn.metrics import roc_auc_score, precision_score, recall_score, f1_score
-import matplotlib.pyplot as plt
+from threshold_curve import threshold_curve, sample_curve, find_optimal_threshold, reliability_curve
+from dataset_store import read_dataset
+from prediction_store import PredictionStore, cached_predict
+from model_bundle import load_model, save_model, saved_fingerprint, model_exists, model_size_mb
+from run_report import RunReport
 
 print("=" * 80)
 print("🎯 CALIBRATION 70%+ WIN RATE")
@@ -25,12 +26,16 @@ print("=" * 80)
 DATA_CSV = "XAUUSD_COMPLETE_ML_Data_20Y_ENGINEERED.csv"
 MODEL_FILE = "xauusd_lightgbm_optimized_model.pkl"  # Généré par Optuna
 OUTPUT_MODEL = "xauusd_calibrated_70percent_model.pkl"
+PREDICTION_DIR = "prediction_store"  # Cache des probabilités par barre (sous base_path)
 
 # Objectifs de calibration
 TARGET_WIN_RATE = 0.70  # 70% de win rate minimum
 MIN_TRADES = 100        # Minimum de trades sur période test (pour statistique valide)
 
+report = RunReport("calibration_70_percent")
+
 # ==================== CHARGEMENT ====================
+report.stage("chargement")
 print("\n" + "=" * 80)
 print("📂 CHARGEMENT MODÈLE ET DONNÉES")
 print("=" * 80)
@@ -41,21 +46,22 @@ model_path = os.path.join(base_path, MODEL_FILE)
 
 # Charger le modèle
 print("🤖 Chargement du modèle...")
-if not os.path.exists(model_path):
+if not model_exists(model_path):
     print(f"❌ Modèle introuvable: {model_path}")
     print(f"Lancez d'abord: python ensemble_methods.py")
     print(f"   ou: python hyperparameter_tuning_optuna.py")
     exit(1)
 
-model_data = joblib.load(model_path)
+model_data = load_model(model_path)
 
-# Déterminer le type de modèle
+# Déterminer le type de modèle (en-tête seulement: l'objet modèle est lu
+# dans le bundle au premier predict)
 if 'ensemble' in model_data:
-    model = model_data['ensemble']
+    model_key = 'ensemble'
     model_type = "Ensemble"
     print(f"✅ Modèle Ensemble chargé")
 else:
-    model = model_data['model']
+    model_key = 'model'
     model_type = "LightGBM"
     print(f"✅ Modèle LightGBM chargé")
 
@@ -64,7 +70,7 @@ print(f"   Features: {len(feature_cols)}")
 
 # Charger les données
 print("\n📊 Chargement des données...")
-df = pd.read_csv(csv_path)
+df = read_dataset(csv_path, columns=['time'] + feature_cols + ['target'])
 df = df[df['target'].isin([0, 1])].copy()
 print(f"✅ {len(df)} lignes chargées")
 
@@ -80,12 +86,18 @@ X_test = X_test.replace([np.inf, -np.inf], np.nan).fillna(0)
 y_test = df_test['target'].copy()
 
 # ==================== PRÉDICTIONS ====================
+report.stage("predictions")
 print("\n" + "=" * 80)
 print("🔮 GÉNÉRATION PRÉDICTIONS")
 print("=" * 80)
 
+# Barres déjà scorées par ce fichier modèle -> relues depuis le cache
 print("🚀 Prédiction en cours...")
-y_pred_proba = model.predict_proba(X_test)[:, 1]
+prediction_store = PredictionStore(os.path.join(base_path, PREDICTION_DIR))
+y_pred_proba = cached_predict(
+    prediction_store, saved_fingerprint(model_path), X_test.assign(time=df_test['time']),
+    lambda d: {'proba': model_data[model_key].predict_proba(d[feature_cols])[:, 1]}
+)['proba'].values
 print(f"✅ Prédictions générées")
 
 # ==================== ANALYSE CALIBRATION ====================
@@ -94,7 +106,7 @@ print("📊 ANALYSE CALIBRATION DU MODÈLE")
 print("=" * 80)
 
 # Courbe de calibration
-fraction_of_positives, mean_predicted_value = calibration_curve(
+fraction_of_positives, mean_predicted_value = reliability_curve(
     y_test, y_pred_proba, n_bins=10
 )
 
@@ -106,49 +118,23 @@ for pred, real in zip(mean_predicted_value, fraction_of_positives):
     print(f"{pred:.2f}{'':<21} {real:.2f}{'':<21} {diff:+.2f}")
 
 # ==================== OPTIMISATION THRESHOLD ====================
+report.stage("threshold")
 print("\n" + "=" * 80)
 print("🎯 OPTIMISATION THRESHOLD POUR 70%+ WIN RATE")
 print("=" * 80)
 
-# Tester différents seuils
+# Courbe complète (tri unique), échantillonnée sur les seuils 0.50-0.94
+curve = threshold_curve(y_pred_proba, y_test.values)
 thresholds = np.arange(0.50, 0.95, 0.01)
-results = []
-
-for threshold in thresholds:
-    y_pred = (y_pred_proba >= threshold).astype(int)
-
-    # Calculer métriques
-    n_predicted_win = y_pred.sum()
-
-    if n_predicted_win == 0:
-        continue
-
-    # Win rate = parmi les signaux prédits WIN, combien sont réellement WIN
-    predicted_win_mask = (y_pred == 1)
-    actual_wins = y_test[predicted_win_mask].sum()
-    win_rate = actual_wins / n_predicted_win if n_predicted_win > 0 else 0
+df_results = sample_curve(curve, thresholds)
+df_results = df_results[['threshold', 'n_trades', 'win_rate', 'precision', 'recall', 'f1']]
 
-    # Autres métriques
-    precision = precision_score(y_test, y_pred, zero_division=0)
-    recall = recall_score(y_test, y_pred, zero_division=0)
-    f1 = f1_score(y_test, y_pred, zero_division=0)
+# Trouver le seuil qui donne 70%+ win rate avec le plus de trades (>= MIN_TRADES)
+best_row = find_optimal_threshold(df_results, metric='n_trades',
+                                  min_win_rate=TARGET_WIN_RATE, min_trades=MIN_TRADES)
 
-    results.append({
-        'threshold': threshold,
-        'n_trades': n_predicted_win,
-        'win_rate': win_rate,
-        'precision': precision,
-        'recall': recall,
-        'f1': f1
-    })
-
-df_results = pd.DataFrame(results)
-
-# Trouver le seuil qui donne 70%+ win rate avec le plus de trades
-df_70plus = df_results[df_results['win_rate'] >= TARGET_WIN_RATE].copy()
-
-if len(df_70plus) == 0:
-    print(f"❌ IMPOSSIBLE d'atteindre {TARGET_WIN_RATE*100}% de win rate")
+if best_row is None:
+    print(f"❌ IMPOSSIBLE d'atteindre {TARGET_WIN_RATE*100}% de win rate avec {MIN_TRADES}+ trades")
     print(f"   Win rate maximum: {df_results['win_rate'].max()*100:.2f}%")
     print(f"   Au seuil: {df_results.loc[df_results['win_rate'].idxmax(), 'threshold']:.2f}")
 
@@ -163,18 +149,17 @@ if len(df_70plus) == 0:
     print(f"   Win Rate: {optimal_win_rate*100:.2f}%")
     print(f"   Trades: {int(optimal_n_trades)}")
 else:
-    # Parmi les seuils à 70%+, prendre celui avec le plus de trades
-    best_idx = df_70plus['n_trades'].idxmax()
-    optimal_threshold = df_70plus.loc[best_idx, 'threshold']
-    optimal_win_rate = df_70plus.loc[best_idx, 'win_rate']
-    optimal_n_trades = df_70plus.loc[best_idx, 'n_trades']
+    # Parmi les seuils à 70%+, celui avec le plus de trades
+    optimal_threshold = best_row['threshold']
+    optimal_win_rate = best_row['win_rate']
+    optimal_n_trades = best_row['n_trades']
 
     print(f"✅ SEUIL OPTIMAL TROUVÉ:")
     print(f"   Threshold: {optimal_threshold:.2f}")
     print(f"   Win Rate: {optimal_win_rate*100:.2f}%")
     print(f"   Trades: {int(optimal_n_trades)}")
-    print(f"   Precision: {df_70plus.loc[best_idx, 'precision']:.4f}")
-    print(f"   Recall: {df_70plus.loc[best_idx, 'recall']:.4f}")
+    print(f"   Precision: {best_row['precision']:.4f}")
+    print(f"   Recall: {best_row['recall']:.4f}")
 
 # ==================== AFFICHER TOP THRESHOLDS ====================
 print("\n" + "=" * 80)
@@ -197,6 +182,7 @@ for _, row in top_10.iterrows():
     print(f"{threshold_str:<12} {win_rate_str:<12} {trades_str:<10} {precision_str:<12} {recall_str:<12}{marker}")
 
 # ==================== VALIDATION FINALE ====================
+report.stage("validation")
 print("\n" + "=" * 80)
 print("✅ VALIDATION FINALE AVEC THRESHOLD OPTIMAL")
 print("=" * 80)
@@ -246,6 +232,7 @@ print(f"      Trades: {n_predicted_win} ({(n_predicted_win/n_50-1)*100:+.1f}%)")
 print(f"      Win Rate: {optimal_win_rate*100:.2f}% ({(optimal_win_rate-wr_50)*100:+.2f}%)")
 
 # ==================== SAUVEGARDE ====================
+report.stage("sauvegarde")
 print("\n" + "=" * 80)
 print("💾 SAUVEGARDE MODÈLE CALIBRÉ")
 print("=" * 80)
@@ -258,18 +245,21 @@ calibrated_model_data['calibrated_win_rate'] = optimal_win_rate
 calibrated_model_data['calibration_date'] = pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
 calibrated_model_data['target_win_rate'] = TARGET_WIN_RATE
 
-joblib.dump(calibrated_model_data, output_path)
-print(f"✅ Modèle calibré sauvegardé: {output_path}")
+bundle_dir = save_model(calibrated_model_data, output_path)
+print(f"✅ Modèle calibré sauvegardé: {bundle_dir}")
 
-file_size_mb = os.path.getsize(output_path) / (1024 * 1024)
+file_size_mb = model_size_mb(output_path)
 print(f"📦 Taille: {file_size_mb:.2f} MB")
 
 # ==================== COURBE CALIBRATION ====================
+report.stage("courbe calibration")
 print("\n" + "=" * 80)
 print("📈 GÉNÉRATION GRAPHIQUE CALIBRATION")
 print("=" * 80)
 
 try:
+    import matplotlib.pyplot as plt
+
     fig, axes = plt.subplots(1, 2, figsize=(14, 6))
 
     # 1. Courbe de calibration
@@ -329,10 +319,12 @@ print(f"   2. Si résultats confirmés → Paper trading")
 print(f"   3. Si paper trading OK → Live trading")
 
 print(f"\n💡 Utilisation:")
-print(f"   import joblib")
-print(f"   model = joblib.load('{OUTPUT_MODEL}')")
+print(f"   from model_bundle import load_model")
+print(f"   model = load_model('{OUTPUT_MODEL}')")
 print(f"   threshold = model['calibrated_threshold']")
 print(f"   predictions = model['ensemble'].predict_proba(X)[:, 1]")
 print(f"   signals = predictions >= threshold")
 
 print("\n" + "=" * 80)
+
+report.save(output_path)
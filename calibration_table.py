@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Calibration isotonique en tables de points de rupture (sans sklearn à l'inférence)
+Version 1.0 - 2026-10-18
+
+OBJECTIF:
+- Les 5 modèles V6 sont enveloppés dans CalibratedClassifierCV(method='isotonic',
+  cv='prefit'): chaque prédiction traverse les objets calibrateurs sklearn
+- Une IsotonicRegression n'est qu'une fonction affine par morceaux:
+  points de rupture X_thresholds_ (triés) -> y_thresholds_
+- Ici: une table (x trié, y) par modèle, et les poids de l'ensemble
+  (0.3 / 0.25 / 0.25 / 0.1 / 0.1) déjà multipliés dans y
+- Calibration + moyenne pondérée = une interpolation (recherche binaire) par
+  modèle puis une somme
+- Entrée des tables = réponse sur laquelle le calibrateur a été ajusté:
+  CalibratedClassifierCV prend decision_function si l'estimateur en a une
+  (LGBMClassifier depuis lightgbm 4.7: marge brute), sinon predict_proba
+  -> méthode enregistrée par modèle (responses), calibration_input la calcule
+
+NOTE:
+- Plusieurs calibrated_classifiers_ (cv != 'prefit'): leur moyenne est encore
+  affine par morceaux -> fusionnée exactement sur l'union des points de rupture
+- Hors de [x_min, x_max]: valeur du bord (out_of_bounds='clip' de sklearn)
+- Modèle non calibré: table identité [0, 1] -> [0, 1]
+- Fichier .npz (NumPy seul pour recharger)
+"""
+
+import numpy as np
+
+IDENTITY = (np.array([0.0, 1.0]), np.array([0.0, 1.0]))
+
+# Ordre de préférence de CalibratedClassifierCV (_get_response_values)
+RESPONSE_METHODS = ('decision_function', 'predict_proba')
+
+
+def response_method(model):
+    """
+    Réponse de l'estimateur sur laquelle les calibrateurs ont été ajustés.
+
+    Returns:
+        'decision_function' ou 'predict_proba' (modèle non calibré: 'predict_proba')
+    """
+    if not hasattr(model, 'calibrated_classifiers_'):
+        return 'predict_proba'
+    estimator = model.calibrated_classifiers_[0].estimator
+    return next(m for m in RESPONSE_METHODS if getattr(estimator, m, None) is not None)
+
+
+def calibration_input(model, X):
+    """
+    Réponse brute (1-D) attendue par les tables de model pour X.
+
+    Même valeur que celle passée par CalibratedClassifierCV à ses calibrateurs:
+    decision_function de l'estimateur si elle existe, sinon predict_proba classe 1.
+    """
+    if not hasattr(model, 'calibrated_classifiers_'):
+        return model.predict_proba(X)[:, 1]
+    from sklearn.utils._response import _get_response_values
+
+    response, _ = _get_response_values(model.calibrated_classifiers_[0].estimator, X,
+                                       response_method=list(RESPONSE_METHODS))
+    return response
+
+
+def isotonic_breakpoints(model):
+    """
+    Table (x, y) équivalente aux calibrateurs isotoniques d'un CalibratedClassifierCV.
+
+    Args:
+        model: CalibratedClassifierCV binaire (method='isotonic'), ou modèle non calibré
+
+    Returns:
+        (x, y): tableaux float64, x strictement croissant
+    """
+    if not hasattr(model, 'calibrated_classifiers_'):
+        return IDENTITY
+
+    calibrators = [cc.calibrators[0] for cc in model.calibrated_classifiers_]
+    for cal in calibrators:
+        if not hasattr(cal, 'X_thresholds_'):
+            raise ValueError(f"Calibrateur non isotonique: {type(cal).__name__}")
+
+    # Moyenne des calibrateurs sur l'union de leurs points de rupture (exacte)
+    x = np.unique(np.concatenate([np.asarray(cal.X_thresholds_, dtype=np.float64) for cal in calibrators]))
+    y = np.mean([np.interp(x, cal.X_thresholds_, cal.y_thresholds_) for cal in calibrators], axis=0)
+    return x, y
+
+
+class CalibrationTable:
+    """
+    Calibration isotonique + moyenne pondérée de l'ensemble, en tableaux.
+
+    Attributs:
+        names: modèles (ordre des tables)
+        weights: poids de chaque modèle dans l'ensemble
+        x, y: points de rupture par modèle (y non pondéré)
+        y_weighted: y * poids (mélange de l'ensemble replié dans la table)
+        responses: entrée attendue par modèle ('decision_function' / 'predict_proba')
+    """
+
+    def __init__(self, names, weights, x, y, responses=None):
+        self.names = list(names)
+        self.responses = list(responses) if responses is not None else ['predict_proba'] * len(self.names)
+        self.weights = np.asarray([weights[name] for name in self.names], dtype=np.float64)
+        self.x = [np.asarray(v, dtype=np.float64) for v in x]
+        self.y = [np.asarray(v, dtype=np.float64) for v in y]
+        self.y_weighted = [y_k * w for y_k, w in zip(self.y, self.weights)]
+
+    def calibrate(self, name, raw):
+        """Probabilité calibrée d'un modèle à partir de sa réponse brute (responses)."""
+        k = self.names.index(name)
+        return np.interp(raw, self.x[k], self.y[k])
+
+    def blend(self, raw_by_model):
+        """
+        Probabilité de l'ensemble (calibration + moyenne pondérée).
+
+        Args:
+            raw_by_model: dict nom -> réponse brute du modèle non calibré
+                (decision_function ou predict_proba classe 1, voir responses)
+        """
+        return sum(np.interp(raw_by_model[name], self.x[k], self.y_weighted[k])
+                   for k, name in enumerate(self.names))
+
+    def save(self, path):
+        """Sauvegarde .npz (points de rupture + poids)."""
+        arrays = {'names': np.asarray(self.names), 'weights': self.weights,
+                  'responses': np.asarray(self.responses)}
+        for k in range(len(self.names)):
+            arrays[f'x_{k}'] = self.x[k]
+            arrays[f'y_{k}'] = self.y[k]
+        np.savez(path, **arrays)
+
+
+def calibration_table(model_data, weights, names=None):
+    """
+    Tables de calibration des modèles d'un model_data.
+
+    Args:
+        model_data: dict du trainer (modèles CalibratedClassifierCV)
+        weights: poids par modèle (ex: walk_forward.ENSEMBLE_WEIGHTS)
+        names: modèles à inclure (défaut: clés de weights)
+
+    Returns:
+        CalibrationTable
+    """
+    names = list(weights) if names is None else list(names)
+    tables = [isotonic_breakpoints(model_data[name]) for name in names]
+    return CalibrationTable(names, weights, [x for x, _ in tables], [y for _, y in tables],
+                            responses=[response_method(model_data[name]) for name in names])
+
+
+def load_calibration_table(path):
+    """Recharge une table sauvegardée par CalibrationTable.save."""
+    with np.load(path) as data:
+        names = [str(name) for name in data['names']]
+        weights = dict(zip(names, data['weights']))
+        x = [data[f'x_{k}'] for k in range(len(names))]
+        y = [data[f'y_{k}'] for k in range(len(names))]
+        # Tables antérieures à responses: predict_proba
+        responses = [str(r) for r in data['responses']] if 'responses' in data else None
+    return CalibrationTable(names, weights, x, y, responses)
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Contrôle de parité: ensemble compilé vs model_data (fenêtre walk-forward réelle)
+Version 1.0 - 2026-10-18
+
+OBJECTIF:
+- Entraîner une vraie fenêtre V6 (walk_forward.train_window, 5 modèles calibrés)
+  sur un petit jeu synthétique, la compiler et comparer les probabilités
+  calibrées à model_data (compare_with_model_data)
+- Deux configurations: features toutes numériques, et hour / day_of_week en
+  category (CATEGORICAL_FEATURES du trainer V6: splits catégoriels XGBoost /
+  LightGBM, CatBoost)
+- Code de sortie 1 si un écart dépasse PARITY_TOLERANCE: à relancer après une
+  mise à jour de LightGBM / XGBoost / CatBoost / scikit-learn
+
+UTILISATION:
+    python check_compiled_parity.py
+"""
+
+import sys
+import numpy as np
+import pandas as pd
+from compact_dtypes import compact_frame
+from walk_forward import train_window, ENSEMBLE_WEIGHTS
+from compiled_ensemble import compile_ensemble, compare_with_model_data, PARITY_TOLERANCE
+
+print("=" * 80)
+print("PARITE ENSEMBLE COMPILE / MODEL_DATA")
+print("=" * 80)
+
+# ==================== CONFIGURATION ====================
+N_BARS = 6000                # train 50% / calib 25% / test 25%
+N_TRIALS = 3                 # trials Optuna LightGBM
+N_JOBS = 2
+FEATURES = ['f1', 'f2', 'f3', 'hour', 'day_of_week']
+CONFIGURATIONS = {
+    'numérique': [],
+    'catégorielle': ['hour', 'day_of_week'],
+}
+
+
+def synthetic_bars(n, seed=42):
+    """Barres H1 synthétiques: target dépendant des features et de l'heure / du jour."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'time': pd.date_range('2015-01-01', periods=n, freq='h'),
+        'f1': rng.normal(size=n),
+        'f2': rng.normal(size=n),
+        'f3': rng.uniform(size=n),
+    })
+    df['hour'] = df['time'].dt.hour
+    df['day_of_week'] = df['time'].dt.dayofweek
+    logit = df['f1'] + 0.5 * df['f2'] + 0.8 * df['hour'].isin([8, 9, 14, 15]) - 0.6 * (df['day_of_week'] == 4)
+    df['target'] = (rng.uniform(size=n) < 1 / (1 + np.exp(-logit))).astype(int)
+    return df
+
+
+# ==================== CONTROLE ====================
+failures = []
+for label, categorical in CONFIGURATIONS.items():
+    print(f"\n--- Configuration {label} (category: {categorical or 'aucune'}) ---")
+    df = compact_frame(synthetic_bars(N_BARS), columns=FEATURES, categorical=categorical)
+    n_train, n_calib = N_BARS // 2, N_BARS // 4
+    df_train = df.iloc[:n_train]
+    df_calib = df.iloc[n_train:n_train + n_calib]
+    df_test = df.iloc[n_train + n_calib:]
+
+    model_entry, _ = train_window(1, df_train, df_calib, df_test, FEATURES, 'target',
+                                  n_jobs=N_JOBS, n_trials=N_TRIALS, categorical=categorical)
+    model_data = {name: model_entry[name] for name in ENSEMBLE_WEIGHTS}
+    model_data.update({'features': FEATURES, 'threshold': 0.5})
+
+    compiled = compile_ensemble(model_data, weights=ENSEMBLE_WEIGHTS)
+    check = compare_with_model_data(compiled, model_data, df_test[FEATURES])
+    kinds = {m['name']: m['kind'] for m in compiled.models}
+    for name in [*ENSEMBLE_WEIGHTS, 'ensemble', 'row']:
+        status = "OK" if check[name] <= PARITY_TOLERANCE else "ECART"
+        print(f"   {name:<10} {kinds.get(name, ''):<8} écart max {check[name]:.2e}  {status}")
+    print(f"   Latence 1 barre: {check['latency_model_data_ms']:.2f} ms -> {check['latency_compiled_ms']:.2f} ms")
+    if not check['ok']:
+        failures.append(label)
+
+# ==================== RESULTAT ====================
+print("\n" + "=" * 80)
+if failures:
+    print(f"❌ Parité non respectée (tolérance {PARITY_TOLERANCE:.0e}): {', '.join(failures)}")
+    sys.exit(1)
+print(f"✅ Parité respectée (tolérance {PARITY_TOLERANCE:.0e}) dans les {len(CONFIGURATIONS)} configurations")
+print("=" * 80)
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Types compacts pour les matrices d'entraînement (float32 / int8 / category)
+Version 1.0 - 2026-10-18
+
+OBJECTIF:
+- Diviser par 2 (float32) à 8 (int8) la mémoire des X_train / X_calib / X_test
+  au lieu de tout garder en float64
+- Features continues -> float32, flags et signaux (adx_strong_trend,
+  rsi_extreme_high, signal_ema, signal_score...) -> int8
+- hour / day_of_week -> category (catégories fixes 0-23 / 0-6, codes = valeurs)
+- Nettoyage inf / NaN -> 0 colonne par colonne (pas de copie float64 complète)
+- Rapport mémoire mesuré (memory_usage(deep=True)) vs équivalent float64
+  -> 20 ans H1 + macro tiennent largement, M15 / M5 envisageables
+
+NOTE:
+- LightGBM, XGBoost, CatBoost et les arbres sklearn travaillent déjà en float32
+  en interne: le passage en float32 ne change pas les seuils de split utiles
+- Les colonnes category exigent enable_categorical (XGBoost) et cat_features
+  (CatBoost): voir categorical_params()
+- CatBoost: one_hot_max_size couvre toutes les catégories (24 heures au plus)
+  -> splits one-hot, pas de CTR: le modèle reste compilable (compiled_ensemble)
+"""
+
+import numpy as np
+import pandas as pd
+
+# Catégories fixes: mêmes codes quelle que soit la fenêtre (train / calib / test)
+CATEGORIES = {
+    'hour': list(range(24)),
+    'day_of_week': list(range(7)),
+}
+
+# Plafond CatBoost de one_hot_max_size (catégories non listées dans CATEGORIES)
+CATBOOST_MAX_ONE_HOT = 255
+
+INT8_MIN, INT8_MAX = np.iinfo(np.int8).min, np.iinfo(np.int8).max
+
+
+def _is_int8_flag(values):
+    """Valeurs entières, sans NaN, dans la plage int8 (flags, signaux, scores)."""
+    if values.size == 0 or not np.isfinite(values).all():
+        return False
+    return (values == np.round(values)).all() and values.min() >= INT8_MIN and values.max() <= INT8_MAX
+
+
+def compact_frame(df, columns=None, categorical=()):
+    """
+    Convertit les colonnes numériques en types compacts.
+
+    Args:
+        df: DataFrame
+        columns: colonnes à convertir (None = toutes les colonnes numériques)
+        categorical: colonnes à passer en category (catégories de CATEGORIES)
+
+    Returns:
+        DataFrame (nouvelles colonnes, les autres inchangées)
+    """
+    df = df.copy(deep=False)
+    columns = df.columns if columns is None else columns
+
+    for col in columns:
+        series = df[col]
+        if col in categorical:
+            df[col] = pd.Categorical(series.fillna(0).astype(np.int64),
+                                     categories=CATEGORIES.get(col, sorted(series.dropna().unique())))
+            continue
+        if not (pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series)):
+            continue
+
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        if _is_int8_flag(values):
+            df[col] = values.astype(np.int8)
+        elif pd.api.types.is_integer_dtype(series):
+            df[col] = pd.to_numeric(series, downcast='integer')
+        else:
+            df[col] = values.astype(np.float32)
+
+    return df
+
+
+def clean_matrix(X):
+    """
+    Équivalent de X.replace([np.inf, -np.inf], np.nan).fillna(0), colonne par colonne.
+
+    Seule une colonne est copiée à la fois (pic mémoire = une colonne).
+    """
+    X = X.copy(deep=False)
+    for col in X.columns:
+        series = X[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            if series.isna().any():
+                X[col] = series.fillna(0)
+        elif pd.api.types.is_float_dtype(series):
+            values = series.to_numpy()
+            bad = ~np.isfinite(values)
+            if bad.any():
+                values = values.copy()
+                values[bad] = 0
+                X[col] = values
+    return X
+
+
+def categorical_params(categorical):
+    """Paramètres XGBoost / CatBoost pour des colonnes category (vides sinon)."""
+    if not categorical:
+        return {}, {}
+    one_hot_max_size = max(len(CATEGORIES.get(col, [])) for col in categorical)
+    if any(col not in CATEGORIES for col in categorical):
+        one_hot_max_size = CATBOOST_MAX_ONE_HOT
+    return ({'enable_categorical': True, 'tree_method': 'hist'},
+            {'cat_features': list(categorical), 'one_hot_max_size': one_hot_max_size})
+
+
+def memory_mb(df, columns=None):
+    """Mémoire mesurée d'un DataFrame (Mo), ou de certaines colonnes sans les copier."""
+    if columns is None:
+        return df.memory_usage(deep=True).sum() / 1024**2
+    return df.memory_usage(deep=True, index=False)[list(columns)].sum() / 1024**2
+
+
+def memory_report(frames, title="MEMOIRE"):
+    """
+    Affiche la mémoire de chaque matrice vs la même matrice en float64.
+
+    Args:
+        frames: dict nom -> DataFrame
+        title: titre du rapport
+
+    Returns:
+        DataFrame du rapport (frame, rows, cols, mb, mb_float64, ratio)
+    """
+    rows = []
+    for name, df in frames.items():
+        mb = memory_mb(df)
+        mb_float64 = (df.shape[0] * df.shape[1] * 8 + df.index.memory_usage(deep=True)) / 1024**2
+        rows.append({'frame': name, 'rows': df.shape[0], 'cols': df.shape[1],
+                     'mb': mb, 'mb_float64': mb_float64,
+                     'ratio': mb_float64 / mb if mb > 0 else np.nan})
+    report = pd.DataFrame(rows)
+
+    print(f"\n{title}:")
+    for _, r in report.iterrows():
+        print(f"   {r['frame']:<10} {r['rows']:>9} x {r['cols']:<4} "
+              f"{r['mb']:>9.1f} Mo (float64: {r['mb_float64']:.1f} Mo, x{r['ratio']:.1f})")
+    print(f"   {'TOTAL':<10} {report['mb'].sum():>26.1f} Mo (float64: {report['mb_float64'].sum():.1f} Mo)")
+    return report
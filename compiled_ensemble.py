@@ -0,0 +1,726 @@
+# -*- coding: utf-8 -*-
+"""
+Ensemble d'arbres compilé en tableaux NumPy (inférence faible latence)
+Version 1.0 - 2026-10-18
+
+OBJECTIF:
+- À l'inférence, predict_proba passait par 5 librairies (LightGBM, XGBoost,
+  CatBoost, RF, ET) chacune enveloppée dans CalibratedClassifierCV: sur une
+  seule barre, le temps est dominé par l'overhead Python / librairie
+- Export: tous les arbres aplatis dans des tableaux contigus
+  (feature, threshold, left, right, value) + racine de chaque arbre
+- Un seul évaluateur vectorisé parcourt tous les arbres d'un modèle niveau par
+  niveau, pour un lot de barres ou une barre unique
+- Calibration isotonique + poids de l'ensemble: tables de points de rupture
+  (calibration_table), plus aucun objet sklearn à l'inférence
+- Chaque modèle sort la réponse vue par son calibrateur: marge brute (sans
+  sigmoïde) si CalibratedClassifierCV a utilisé decision_function (LightGBM >= 4.7),
+  sinon predict_proba classe 1
+- Mêmes probabilités que le model_data V6 (compare_with_model_data: écart max
+  <= PARITY_TOLERANCE, sinon l'ensemble compilé n'est pas livré)
+
+Sémantique des splits (ramenée à "gauche si x <= threshold"):
+- sklearn / LightGBM: x <= t
+- XGBoost: x < t (float32) -> x <= nextafter(t, -inf); marge cumulée en float32
+  arbre par arbre depuis base_score, sigmoïde float32 (comme predict_proba XGBoost:
+  un ulp d'écart est amplifié par la pente des tables isotoniques)
+- CatBoost (arbres symétriques): bit = x > border (ou catégorie one-hot du split,
+  -> droite), développé en arbre binaire complet
+- Catégorielles: catégories du split -> gauche (LightGBM et XGBoost: colonne
+  Category de trees_to_dataframe = branche Yes)
+- Valeurs manquantes: direction par défaut du nœud; LightGBM missing_type None
+  (NaN -> 0) et Zero (0 ou NaN -> défaut)
+
+NOTE:
+- Aucun import LightGBM / XGBoost / CatBoost / sklearn: modèles reconnus par nom
+  de type, l'objet compilé se recharge sans ces librairies (NumPy, pandas, joblib)
+- CatBoost à cat_features: compilé si toutes ses catégorielles sont en one-hot
+  (compact_dtypes.categorical_params: one_hot_max_size); les valeurs hachées du
+  JSON sont ramenées aux catégories de CATEGORIES par calc_leaf_indexes. Avec des
+  CTR, ce modèle reste évalué par sa librairie ('native')
+- Entrées float32 pour sklearn / XGBoost / CatBoost (comme ces librairies),
+  précision d'origine pour LightGBM
+"""
+
+import os
+import json
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import joblib
+from compact_dtypes import CATEGORIES
+from calibration_table import calibration_table
+
+# Éléments (lignes x arbres) traités par lot: borne la mémoire de l'évaluateur
+MAX_BATCH_CELLS = 2_000_000
+
+# Écart max toléré (probabilités calibrées) entre ensemble compilé et model_data
+PARITY_TOLERANCE = 1e-6
+
+MISSING_NAN, MISSING_AS_ZERO, MISSING_ZERO = 0, 1, 2
+
+
+class _TreeBuffer:
+    """Accumule les nœuds de plusieurs arbres (indices globaux)."""
+
+    def __init__(self):
+        self.columns = {k: [] for k in ('feature', 'threshold', 'left', 'right', 'value',
+                                        'default_left', 'missing', 'cat_index', 'cat_left')}
+        self.roots = []
+        self.depths = []
+        self.cat_sets = []
+        self.n_nodes = 0
+
+    def add_tree(self, nodes, depth):
+        """
+        Ajoute un arbre.
+
+        Args:
+            nodes: dict de tableaux locaux (feature, threshold, left, right, value,
+                default_left, missing, cat_index, cat_left); feuilles: left = right = soi-même
+            depth: profondeur de l'arbre
+        """
+        offset = self.n_nodes
+        n = len(nodes['feature'])
+        for k, col in self.columns.items():
+            values = np.asarray(nodes[k])
+            if k in ('left', 'right'):
+                values = values + offset
+            col.append(values)
+        self.roots.append(offset)
+        self.depths.append(depth)
+        self.n_nodes += n
+
+    def add_cat_set(self, categories):
+        """Enregistre un ensemble de catégories, retourne son index."""
+        self.cat_sets.append(sorted(int(c) for c in categories))
+        return len(self.cat_sets) - 1
+
+
+def _new_nodes():
+    return {k: [] for k in ('feature', 'threshold', 'left', 'right', 'value',
+                            'default_left', 'missing', 'cat_index', 'cat_left')}
+
+
+def _append_node(nodes, feature=0, threshold=np.inf, value=0.0, default_left=True,
+                 missing=MISSING_NAN, cat_index=-1, cat_left=True):
+    """Ajoute un nœud (enfants fixés ensuite), retourne son index local."""
+    idx = len(nodes['feature'])
+    nodes['feature'].append(feature)
+    nodes['threshold'].append(threshold)
+    nodes['left'].append(idx)
+    nodes['right'].append(idx)
+    nodes['value'].append(value)
+    nodes['default_left'].append(default_left)
+    nodes['missing'].append(missing)
+    nodes['cat_index'].append(cat_index)
+    nodes['cat_left'].append(cat_left)
+    return idx
+
+
+# ==================== EXTRACTION DES ARBRES ====================
+
+def _sklearn_trees(forest, buffer):
+    """RandomForest / ExtraTrees: proba de la classe 1 de chaque feuille."""
+    pos = list(forest.classes_).index(1)
+    for est in forest.estimators_:
+        t = est.tree_
+        idx = np.arange(t.node_count)
+        leaf = t.children_left == -1
+        value = t.value[:, 0, :]
+        missing_left = getattr(t, 'missing_go_to_left', None)
+        nodes = {
+            'feature': np.where(leaf, 0, t.feature),
+            'threshold': np.where(leaf, np.inf, t.threshold),
+            'left': np.where(leaf, idx, t.children_left),
+            'right': np.where(leaf, idx, t.children_right),
+            'value': value[:, pos] / value.sum(axis=1),
+            'default_left': (np.ones(t.node_count, dtype=bool) if missing_left is None
+                             else np.asarray(missing_left, dtype=bool)),
+            'missing': np.full(t.node_count, MISSING_NAN),
+            'cat_index': np.full(t.node_count, -1),
+            'cat_left': np.ones(t.node_count, dtype=bool),
+        }
+        buffer.add_tree(nodes, int(t.max_depth))
+    return {'kind': 'forest', 'bias': 0.0, 'float32': True}
+
+
+def _lgbm_trees(model, buffer):
+    """LightGBM: dump_model (arbres jusqu'à best_iteration comme predict)."""
+    booster = model.booster_
+    dump = booster.dump_model()
+    missing_modes = {'None': MISSING_AS_ZERO, 'Zero': MISSING_ZERO, 'NaN': MISSING_NAN}
+
+    def visit(node, nodes, depth):
+        if 'split_index' not in node:
+            return _append_node(nodes, value=node['leaf_value']), depth
+        missing = missing_modes[node.get('missing_type', 'None')]
+        if node['decision_type'] == '==':
+            cats = buffer.add_cat_set(str(node['threshold']).split('||'))
+            # Catégorielle NaN (missing_type NaN) -> droite
+            idx = _append_node(nodes, feature=node['split_feature'], cat_index=cats, cat_left=True,
+                               default_left=False, missing=missing)
+        else:
+            idx = _append_node(nodes, feature=node['split_feature'], threshold=float(node['threshold']),
+                               default_left=bool(node['default_left']), missing=missing)
+        nodes['left'][idx], d_left = visit(node['left_child'], nodes, depth + 1)
+        nodes['right'][idx], d_right = visit(node['right_child'], nodes, depth + 1)
+        return idx, max(d_left, d_right)
+
+    for info in dump['tree_info']:
+        nodes = _new_nodes()
+        _, depth = visit(info['tree_structure'], nodes, 0)
+        buffer.add_tree(nodes, depth)
+    return {'kind': 'gbdt', 'bias': 0.0, 'float32': False}
+
+
+def _xgb_trees(model, features, buffer):
+    """XGBoost: trees_to_dataframe + base_score (marge logit)."""
+    booster = model.get_booster()
+    df = booster.trees_to_dataframe()
+    best_iteration = booster.attr('best_iteration')
+    if best_iteration is not None:
+        df = df[df['Tree'] <= int(best_iteration)]
+
+    config = json.loads(booster.save_config())
+    base_score = np.float32(str(config['learner']['learner_model_param']['base_score']).strip('[]'))
+    # Marge initiale calculée en float32 comme XGBoost: -log(1 / base_score - 1)
+    bias = float(np.float32(-np.log(np.float64(np.float32(1) / base_score - np.float32(1)))))
+
+    feature_index = {name: j for j, name in enumerate(features)}
+    has_categories = 'Category' in df.columns
+
+    for _, tree in df.groupby('Tree', sort=True):
+        rows = {r.ID: r for r in tree.itertuples(index=False)}
+        nodes = _new_nodes()
+
+        def visit(node_id, depth):
+            r = rows[node_id]
+            if r.Feature == 'Leaf':
+                return _append_node(nodes, value=float(r.Gain)), depth
+            j = feature_index[r.Feature] if r.Feature in feature_index else int(r.Feature.lstrip('f'))
+            categories = getattr(r, 'Category', None) if has_categories else None
+            if isinstance(categories, (list, np.ndarray)) and len(categories):
+                idx = _append_node(nodes, feature=j, cat_index=buffer.add_cat_set(categories), cat_left=True,
+                                   default_left=r.Missing == r.Yes)
+            else:
+                threshold = float(np.nextafter(np.float32(r.Split), np.float32(-np.inf)))
+                idx = _append_node(nodes, feature=j, threshold=threshold, default_left=r.Missing == r.Yes)
+            nodes['left'][idx], d_left = visit(r.Yes, depth + 1)
+            nodes['right'][idx], d_right = visit(r.No, depth + 1)
+            return idx, max(d_left, d_right)
+
+        root_id = tree.loc[tree['Node'] == 0, 'ID'].iloc[0]
+        _, depth = visit(root_id, 0)
+        buffer.add_tree(nodes, depth)
+    return {'kind': 'gbdt', 'bias': bias, 'float32': True, 'float32_margin': True}
+
+
+def _catboost_one_hot(model, dump, features):
+    """
+    Catégories de chaque split one-hot CatBoost (valeurs hachées dans le JSON).
+
+    Une barre sonde par catégorie (CATEGORIES): bit d de calc_leaf_indexes à 1
+    = catégorie du split d. Retourne {(arbre, niveau): codes}, None si une
+    colonne catégorielle n'a pas de catégories fixes.
+    """
+    cat_features = dump['features_info'].get('categorical_features', [])
+    if any(cf['feature_id'] not in CATEGORIES for cf in cat_features):
+        return None
+
+    names = list(model.feature_names_) if model.feature_names_ else list(features)
+    members = {}
+    for cf in cat_features:
+        categories = CATEGORIES[cf['feature_id']]
+        probe = pd.DataFrame({name: np.zeros(len(categories), dtype=np.float32) for name in names})
+        for other in cat_features:
+            values = categories if other is cf else [CATEGORIES[other['feature_id']][0]] * len(categories)
+            probe[other['feature_id']] = pd.Categorical(values, categories=CATEGORIES[other['feature_id']])
+        leaves = np.asarray(model.calc_leaf_indexes(probe))
+        for t, tree in enumerate(dump['oblivious_trees']):
+            for d, split in enumerate(tree.get('splits') or []):
+                if split['split_type'] == 'OneHotFeature' and split['cat_feature_index'] == cf['feature_index']:
+                    members[(t, d)] = np.flatnonzero((leaves[:, t] >> d) & 1)
+    return members
+
+
+def _catboost_trees(model, features, buffer):
+    """
+    CatBoost: arbres symétriques développés en arbres binaires.
+
+    Splits numériques et one-hot (catégorielles <= one_hot_max_size);
+    None si le modèle utilise des CTR (évalué par sa librairie).
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.json')
+        model.save_model(path, format='json')
+        with open(path, encoding='utf-8') as f:
+            dump = json.load(f)
+
+    split_types = {s['split_type'] for tree in dump['oblivious_trees'] for s in tree.get('splits') or []}
+    if not split_types <= {'FloatFeature', 'OneHotFeature'}:
+        return None
+    one_hot = _catboost_one_hot(model, dump, features) if 'OneHotFeature' in split_types else {}
+    if one_hot is None:
+        return None
+
+    float_features = {ff['feature_index']: ff for ff in dump['features_info']['float_features']}
+    cat_features = {cf['feature_index']: cf for cf in dump['features_info'].get('categorical_features', [])}
+    scale, bias = 1.0, 0.0
+    if 'scale_and_bias' in dump:
+        scale, biases = dump['scale_and_bias']
+        bias = float(biases[0]) if isinstance(biases, list) else float(biases)
+
+    for t, tree in enumerate(dump['oblivious_trees']):
+        splits = tree.get('splits') or []
+        leaf_values = np.asarray(tree['leaf_values'], dtype=np.float64) * scale
+        depth = len(splits)
+        nodes = _new_nodes()
+
+        # Niveau d: bit d de l'index de feuille = (x > border_d) ou (x == catégorie_d); gauche = bit à 0
+        level = [(_append_node(nodes), 0)]
+        for d, split in enumerate(splits):
+            if split['split_type'] == 'OneHotFeature':
+                cf = cat_features[split['cat_feature_index']]
+                attrs = {'feature': cf['flat_feature_index'], 'threshold': np.inf, 'default_left': True,
+                         'cat_index': buffer.add_cat_set(one_hot[(t, d)]), 'cat_left': False}
+            else:
+                ff = float_features[split['float_feature_index']]
+                attrs = {'feature': ff.get('flat_feature_index', split['float_feature_index']),
+                         'threshold': float(split['border']),
+                         'default_left': ff.get('nan_value_treatment', 'AsIs') != 'AsTrue'}
+            next_level = []
+            for idx, prefix in level:
+                for k, v in attrs.items():
+                    nodes[k][idx] = v
+                left = _append_node(nodes)
+                right = _append_node(nodes)
+                nodes['left'][idx], nodes['right'][idx] = left, right
+                next_level += [(left, prefix), (right, prefix | (1 << d))]
+            level = next_level
+        for idx, prefix in level:
+            nodes['value'][idx] = leaf_values[prefix]
+        buffer.add_tree(nodes, depth)
+    return {'kind': 'gbdt', 'bias': bias, 'float32': True}
+
+
+def _base_estimator(model):
+    """Estimateur non calibré d'un CalibratedClassifierCV (prefit), sinon le modèle."""
+    if hasattr(model, 'calibrated_classifiers_'):
+        return model.calibrated_classifiers_[0].estimator
+    return model
+
+
+# ==================== ENSEMBLE COMPILÉ ====================
+
+class CompiledEnsemble:
+    """
+    Ensemble V6 (ou V5) compilé: arbres en tableaux NumPy contigus.
+
+    Attributs:
+        features: colonnes attendues (ordre du model_data)
+        weights: poids de la moyenne par modèle
+        models: liste de dicts (name, kind, trees, depth, bias, float32)
+        calibration: CalibrationTable (isotonique + poids repliés)
+    """
+
+    def __init__(self, features, weights, models, buffer, calibration, threshold=None):
+        self.features = list(features)
+        self.weights = dict(weights)
+        self.threshold = threshold
+        self.models = models
+        self.calibration = calibration
+
+        cols = {k: np.concatenate(v) if v else np.zeros(0) for k, v in buffer.columns.items()}
+        self.feature = cols['feature'].astype(np.int32)
+        self.threshold_values = cols['threshold'].astype(np.float64)
+        self.left = cols['left'].astype(np.int32)
+        self.right = cols['right'].astype(np.int32)
+        self.value = cols['value'].astype(np.float64)
+        self.default_left = cols['default_left'].astype(bool)
+        self.missing = cols['missing'].astype(np.int8)
+        self.cat_index = cols['cat_index'].astype(np.int32)
+        self.cat_left = cols['cat_left'].astype(bool)
+        self.roots = np.asarray(buffer.roots, dtype=np.int32)
+        self.tree_depths = np.asarray(buffer.depths, dtype=np.int64)
+
+        width = max([max(s) + 1 for s in buffer.cat_sets if s] + [1])
+        self.cat_bits = np.zeros((max(len(buffer.cat_sets), 1), width), dtype=bool)
+        for k, cats in enumerate(buffer.cat_sets):
+            self.cat_bits[k, [c for c in cats if c >= 0]] = True
+
+    def __getstate__(self):
+        # Tableaux de predict_row: dérivés, reconstruits au premier appel après chargement
+        state = dict(self.__dict__)
+        state.pop('_row', None)
+        return state
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def _matrix(self, X):
+        """DataFrame / tableau -> (X float64, X arrondi float32 puis float64)."""
+        if isinstance(X, pd.DataFrame):
+            cols = []
+            for col in self.features:
+                series = X[col]
+                if isinstance(series.dtype, pd.CategoricalDtype):
+                    codes = series.cat.codes.to_numpy().astype(np.float64)
+                    codes[codes < 0] = np.nan
+                    cols.append(codes)
+                else:
+                    cols.append(series.to_numpy(dtype=np.float64, na_value=np.nan))
+            X64 = np.column_stack(cols) if cols else np.zeros((len(X), 0))
+        else:
+            X64 = np.asarray(X, dtype=np.float64)
+            if X64.ndim == 1:
+                X64 = X64[None, :]
+        return X64, X64.astype(np.float32).astype(np.float64)
+
+    def _frame(self, X):
+        """DataFrame des features (modèles évalués par leur librairie)."""
+        if isinstance(X, pd.DataFrame):
+            return X[self.features]
+        X = np.asarray(X, dtype=np.float64)
+        df = pd.DataFrame(X if X.ndim == 2 else X[None, :], columns=self.features)
+        for col, categories in CATEGORIES.items():
+            if col in df.columns:
+                df[col] = pd.Categorical(df[col].fillna(0).astype(np.int64), categories=categories)
+        return df
+
+    @staticmethod
+    def _aggregate(m, leaves):
+        """Score brut d'un modèle à partir de ses feuilles (dernier axe = arbres)."""
+        if m['kind'] == 'forest':
+            return leaves.mean(axis=-1)
+        if m.get('float32_margin'):
+            # XGBoost: base_score puis chaque arbre, dans l'ordre, en float32
+            start = np.full(leaves.shape[:-1] + (1,), m['bias'], dtype=np.float32)
+            margin = np.concatenate([start, leaves.astype(np.float32)], axis=-1)
+            return np.cumsum(margin, axis=-1, dtype=np.float32)[..., -1]
+        return leaves.sum(axis=-1) + m['bias']
+
+    @staticmethod
+    def _response(m, score):
+        """Score brut -> réponse vue par le calibrateur (decision_function ou proba classe 1)."""
+        if m.get('response', 'predict_proba') == 'decision_function':
+            # Calibrateur ajusté sur la marge: pas de sigmoïde
+            return np.asarray(score, dtype=np.float64)
+        if m['kind'] == 'gbdt' and m.get('float32_margin'):
+            # Sigmoïde XGBoost (1 / (expf(-x) + 1) en float32), exp arrondi depuis float64
+            e = np.exp(np.minimum(-score, np.float32(88.7)).astype(np.float64)).astype(np.float32)
+            return (np.float32(1) / (e + np.float32(1))).astype(np.float64)
+        if m['kind'] == 'gbdt':
+            return 1.0 / (1.0 + np.exp(-score))
+        return score
+
+    def _raw_scores(self, m, X):
+        """Score brut d'un modèle compilé (somme des feuilles ou moyenne des arbres)."""
+        start, end = m['trees']
+        roots = self.roots[start:end]
+        n, n_trees = len(X), end - start
+        check_missing = m['has_zero_missing'] or np.isnan(X).any()
+
+        rows = np.arange(n)[:, None]
+
+        node = np.broadcast_to(roots, (n, n_trees)).copy()
+        for _ in range(m['depth']):
+            x = X[rows, self.feature[node]]
+            if check_missing:
+                # LightGBM missing_type None: NaN -> 0 avant le test
+                mode = self.missing[node]
+                nan = np.isnan(x)
+                x = np.where(nan & (mode == MISSING_AS_ZERO), 0.0, x)
+                is_missing = (nan & (mode != MISSING_AS_ZERO)) | ((mode == MISSING_ZERO) & (x == 0))
+
+            go_left = x <= self.threshold_values[node]
+
+            if m['has_categorical']:
+                ci = self.cat_index[node]
+                is_cat = ci >= 0
+                valid = is_cat & np.isfinite(x) & (x >= 0) & (x < self.cat_bits.shape[1])
+                xi = np.where(valid, x, 0).astype(np.int64)
+                member = valid & self.cat_bits[np.maximum(ci, 0), xi]
+                go_left = np.where(is_cat, member == self.cat_left[node], go_left)
+
+            if check_missing:
+                go_left = np.where(is_missing, self.default_left[node], go_left)
+
+            node = np.where(go_left, self.left[node], self.right[node])
+
+        return self._aggregate(m, self.value[node])
+
+    def _model_proba(self, m, X64, X32, frame):
+        """Réponse brute d'un modèle avant calibration (decision_function ou predict_proba classe 1)."""
+        if m['kind'] == 'native':
+            if m.get('response', 'predict_proba') == 'decision_function':
+                return m['estimator'].decision_function(frame)
+            return m['estimator'].predict_proba(frame)[:, 1]
+        X = X32 if m['float32'] else X64
+        step = max(1, MAX_BATCH_CELLS // max(m['trees'][1] - m['trees'][0], 1))
+        score = np.concatenate([self._raw_scores(m, X[s:s + step]) for s in range(0, len(X), step)])
+        return self._response(m, score)
+
+    def _row_plan(self):
+        """
+        Tableaux de predict_row, construits une fois.
+
+        - Ligne évaluée: [x, x arrondi float32, direction des splits catégoriels]
+          -> chaque nœud devient "droite si valeur > seuil" (catégoriel: 1 = droite, seuil 0.5)
+        - Arbres triés par profondeur décroissante: au niveau d, seuls les
+          active[d] premiers arbres descendent encore
+        - Nœuds renumérotés niveau par niveau, enfants gauche / droite adjacents:
+          nœud suivant = first_child[nœud] + (droite); feuille: first_child = soi-même
+        """
+        plan = getattr(self, '_row', None)
+        if plan is not None:
+            return plan
+        n_features = len(self.features)
+        compiled = [m for m in self.models if m['kind'] != 'native']
+        bounds = np.append(self.roots, len(self.feature))
+        node_float32 = np.zeros(len(self.feature), dtype=bool)
+        model_depths = np.zeros(self.n_trees, dtype=np.int64)
+        for m in compiled:
+            start, end = m['trees']
+            node_float32[bounds[start]:bounds[end]] = m['float32']
+            model_depths[start:end] = m['depth']
+        # Ensemble compilé avant tree_depths: profondeur max de chaque modèle
+        tree_depths = getattr(self, 'tree_depths', model_depths)
+        value_feature = (self.feature + n_features * node_float32).astype(np.intp)
+
+        # Splits catégoriels: un nœud représentatif par ensemble (mêmes attributs pour tous ses nœuds)
+        is_cat = self.cat_index >= 0
+        sets, first = np.unique(self.cat_index[is_cat], return_index=True)
+        cat_nodes = np.flatnonzero(is_cat)[first]
+        feature = value_feature.copy()
+        feature[is_cat] = 2 * n_features + np.searchsorted(sets, self.cat_index[is_cat])
+        threshold = np.where(is_cat, 0.5, self.threshold_values)
+        missing = np.where(is_cat, MISSING_NAN, self.missing).astype(np.int8)
+        left, right = self.left.astype(np.intp), self.right.astype(np.intp)
+        is_leaf = left == np.arange(len(left))
+        default_left = self.default_left | is_leaf
+
+        # Renumérotation: racines (triées par profondeur) puis enfants de chaque niveau, par paires
+        order = np.argsort(-tree_depths, kind='stable')
+        levels = [self.roots[order].astype(np.intp)]
+        while len(levels[-1]):
+            internal = levels[-1][~is_leaf[levels[-1]]]
+            levels.append(np.stack([left[internal], right[internal]], axis=1).ravel())
+        old = np.concatenate(levels)
+        new = np.empty(len(old), dtype=np.intp)
+        new[old] = np.arange(len(old))
+
+        self._row = {
+            'feature': feature[old],
+            'threshold': threshold[old],
+            'missing': missing[old],
+            'default_left': default_left[old],
+            'first_child': new[left[old]],
+            'value': self.value[old],
+            'start': np.arange(self.n_trees, dtype=np.intp),
+            'inverse': np.argsort(order),
+            'active': [int((tree_depths > d).sum()) for d in range(int(tree_depths.max(initial=0)))],
+            'has_zero_missing': any(m['has_zero_missing'] for m in compiled),
+            'cat_sets': sets,
+            'cat_feature': value_feature[cat_nodes],
+            'cat_missing': self.missing[cat_nodes],
+            'cat_default_left': self.default_left[cat_nodes],
+            'cat_left': self.cat_left[cat_nodes],
+        }
+        return self._row
+
+    def predict_row(self, x):
+        """
+        Probabilité de l'ensemble pour une seule barre (serveur d'inférence).
+
+        Mêmes valeurs que predict_proba, sans DataFrame ni dict: un seul parcours
+        de tous les arbres compilés (_row_plan), calibration par index de modèle.
+
+        Args:
+            x: tableau 1D des features (ordre self.features, codes pour les category)
+
+        Returns:
+            float
+        """
+        plan = self._row_plan()
+        x = np.asarray(x, dtype=np.float64)
+        xx = np.concatenate([x, x.astype(np.float32)])
+        check_missing = plan['has_zero_missing'] or np.isnan(x).any()
+
+        if len(plan['cat_sets']):
+            # Direction de chaque split catégoriel pour cette barre (1.0 = droite)
+            xc = xx[plan['cat_feature']]
+            if check_missing:
+                mode = plan['cat_missing']
+                nan = np.isnan(xc)
+                xc = np.where(nan & (mode == MISSING_AS_ZERO), 0.0, xc)
+                is_missing = (nan & (mode != MISSING_AS_ZERO)) | ((mode == MISSING_ZERO) & (xc == 0))
+            valid = np.isfinite(xc) & (xc >= 0) & (xc < self.cat_bits.shape[1])
+            member = valid & self.cat_bits[plan['cat_sets'], np.where(valid, xc, 0).astype(np.int64)]
+            go_left = member == plan['cat_left']
+            if check_missing:
+                go_left = np.where(is_missing, plan['cat_default_left'], go_left)
+            xx = np.concatenate([xx, np.where(go_left, 0.0, 1.0)])
+
+        feature, threshold, first_child = plan['feature'], plan['threshold'], plan['first_child']
+        node = plan['start'].copy()
+        for active in plan['active']:
+            nd = node[:active]
+            v = xx.take(feature.take(nd))
+            if check_missing:
+                # LightGBM missing_type None: NaN -> 0 avant le test
+                mode = plan['missing'].take(nd)
+                nan = np.isnan(v)
+                v = np.where(nan & (mode == MISSING_AS_ZERO), 0.0, v)
+                is_missing = (nan & (mode != MISSING_AS_ZERO)) | ((mode == MISSING_ZERO) & (v == 0))
+                go_right = ~np.where(is_missing, plan['default_left'].take(nd), v <= threshold.take(nd))
+            else:
+                go_right = v > threshold.take(nd)
+            node[:active] = first_child.take(nd) + go_right
+        leaves = plan['value'].take(node[plan['inverse']])
+
+        calibration = self.calibration
+        total = 0.0
+        for k, m in enumerate(self.models):
+            if m['kind'] == 'native':
+                raw = self._model_proba(m, None, None, self._frame(x))[0]
+            else:
+                start, end = m['trees']
+                raw = self._response(m, self._aggregate(m, leaves[start:end]))
+            total = total + np.interp(raw, calibration.x[k], calibration.y_weighted[k])
+        return float(total)
+
+    def predict_raw(self, X):
+        """Réponses brutes (non calibrées) de chaque modèle (dict nom -> tableau, voir _model_proba)."""
+        X64, X32 = self._matrix(X)
+        frame = self._frame(X) if any(m['kind'] == 'native' for m in self.models) else None
+        return {m['name']: self._model_proba(m, X64, X32, frame) for m in self.models}
+
+    def predict_models(self, X):
+        """Probabilités calibrées de chaque modèle (dict nom -> tableau)."""
+        raw = self.predict_raw(X)
+        return {name: self.calibration.calibrate(name, proba) for name, proba in raw.items()}
+
+    def predict_proba(self, X):
+        """Probabilité de l'ensemble (tables de calibration pondérées)."""
+        return self.calibration.blend(self.predict_raw(X))
+
+    def predict(self, X, threshold=None):
+        """Décision (1 = trade) au threshold du modèle ou donné."""
+        threshold = self.threshold if threshold is None else threshold
+        return (self.predict_proba(X) >= threshold).astype(np.int8)
+
+
+def compile_ensemble(model_data, weights=None, model_names=('lgbm', 'xgb', 'catboost', 'rf', 'et')):
+    """
+    Compile les modèles d'un model_data (V5 / V6) en un CompiledEnsemble.
+
+    Args:
+        model_data: dict du trainer (modèles calibrés + 'features' + 'threshold')
+        weights: poids par modèle (None = moyenne simple des modèles présents)
+        model_names: clés des modèles à chercher dans model_data
+
+    Returns:
+        CompiledEnsemble
+    """
+    features = model_data['features']
+    names = [name for name in model_names if name in model_data and (weights is None or name in weights)]
+    weights = weights or {name: 1.0 / len(names) for name in names}
+
+    calibration = calibration_table(model_data, weights, names)
+    responses = dict(zip(names, calibration.responses))
+
+    buffer = _TreeBuffer()
+    models = []
+    for name in names:
+        estimator = _base_estimator(model_data[name])
+        model_type = type(estimator).__name__
+        start = len(buffer.roots)
+        n_cats = len(buffer.cat_sets)
+
+        if model_type in ('RandomForestClassifier', 'ExtraTreesClassifier'):
+            info = _sklearn_trees(estimator, buffer)
+        elif model_type == 'LGBMClassifier':
+            info = _lgbm_trees(estimator, buffer)
+        elif model_type == 'XGBClassifier':
+            info = _xgb_trees(estimator, features, buffer)
+        elif model_type == 'CatBoostClassifier':
+            info = _catboost_trees(estimator, features, buffer)
+        else:
+            info = None
+
+        if info is None:
+            # CatBoost à CTR ou modèle inconnu: librairie d'origine
+            models.append({'name': name, 'kind': 'native', 'estimator': estimator,
+                           'response': responses[name]})
+            continue
+
+        end = len(buffer.roots)
+        missing = np.concatenate(buffer.columns['missing'][start:end]) if end > start else np.zeros(0)
+        models.append({
+            **info,
+            'name': name,
+            'response': responses[name],
+            'trees': (start, end),
+            'depth': max(buffer.depths[start:end], default=0),
+            'has_categorical': len(buffer.cat_sets) > n_cats,
+            'has_zero_missing': bool((missing == MISSING_ZERO).any()),
+        })
+
+    return CompiledEnsemble(features, weights, models, buffer, calibration,
+                            threshold=model_data.get('threshold'))
+
+
+def compare_with_model_data(compiled, model_data, X, n_latency=200, n_rows=200, tolerance=PARITY_TOLERANCE):
+    """
+    Écart maximal compilé vs model_data et latence sur une barre.
+
+    Args:
+        compiled: CompiledEnsemble
+        model_data: dict du trainer (mêmes modèles)
+        X: DataFrame des features (ex: X_test)
+        n_latency: répétitions pour la latence d'une barre
+        n_rows: premières barres aussi évaluées une par une (predict_row, serveur)
+        tolerance: écart max accepté (modèles calibrés, ensemble et predict_row)
+
+    Returns:
+        dict (max_abs_diff par modèle, 'ensemble' et 'row', 'ok' si tous <= tolerance,
+        latences en ms)
+    """
+    X = X[compiled.features]
+    compiled_probas = compiled.predict_models(X)
+    report = {}
+    reference = 0.0
+    for name, weight in compiled.weights.items():
+        expected = model_data[name].predict_proba(X)[:, 1]
+        report[name] = float(np.max(np.abs(compiled_probas[name] - expected)))
+        reference = reference + expected * weight
+    report['ensemble'] = float(np.max(np.abs(compiled.predict_proba(X) - reference)))
+    X64, _ = compiled._matrix(X.iloc[:n_rows])
+    rows = np.array([compiled.predict_row(x) for x in X64])
+    report['row'] = float(np.max(np.abs(rows - reference[:len(rows)]), initial=0.0))
+    report['ok'] = all(report[name] <= tolerance for name in [*compiled.weights, 'ensemble', 'row'])
+
+    row = X.iloc[[0]]
+    start = time.perf_counter()
+    for _ in range(n_latency):
+        sum(model_data[name].predict_proba(row)[:, 1] * w for name, w in compiled.weights.items())
+    report['latency_model_data_ms'] = (time.perf_counter() - start) / n_latency * 1000
+
+    start = time.perf_counter()
+    for _ in range(n_latency):
+        compiled.predict_row(X64[0])
+    report['latency_compiled_ms'] = (time.perf_counter() - start) / n_latency * 1000
+    return report
+
+
+def save_compiled(compiled, path):
+    """Sauvegarde l'ensemble compilé."""
+    joblib.dump(compiled, path)
+
+
+def load_compiled(path):
+    """Charge un ensemble compilé."""
+    return joblib.load(path)
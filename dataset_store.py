@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Stockage colonnaire des datasets (Parquet partitionné par année)
+Version 1.0 - 2026-10-18
+
+OBJECTIF:
+- Remplacer les pd.read_csv / to_csv de 20 ans H1 x 150+ colonnes en texte
+- Fichiers typés et compressés (zstd), un fichier par année
+- Lecture d'un sous-ensemble de colonnes (FEATURES + target) et/ou d'années
+- CSV conservé pour l'échange avec MT5 (export MQ5 -> Python, Python -> EA)
+
+Organisation: pour "XAUUSD_..._20Y.csv" -> dossier "XAUUSD_..._20Y.parquet/"
+contenant "year=2008.parquet", "year=2009.parquet"... et "_SUCCESS" (écrit en dernier).
+
+Si le CSV est plus récent que le store (nouvel export MT5), le CSV est lu puis
+converti automatiquement. Sans pyarrow, tout fonctionne en CSV.
+"""
+
+import os
+import glob
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    USE_PARQUET = True
+except ImportError:
+    USE_PARQUET = False
+
+SUCCESS_FILE = "_SUCCESS"
+
+
+def store_path(csv_path):
+    """Dossier Parquet associé à un CSV."""
+    return os.path.splitext(csv_path)[0] + ".parquet"
+
+
+def _store_is_fresh(csv_path):
+    """Store complet et au moins aussi récent que le CSV."""
+    marker = os.path.join(store_path(csv_path), SUCCESS_FILE)
+    if not os.path.exists(marker):
+        return False
+    if os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(marker):
+        return False
+    return True
+
+
+def dataset_exists(csv_path):
+    """CSV ou store Parquet disponible."""
+    return os.path.exists(csv_path) or _store_is_fresh(csv_path)
+
+
+def _partition_year(path):
+    return int(os.path.basename(path).split("=")[1].split(".")[0])
+
+
+def write_dataset(df, csv_path, csv=False, time_col='time'):
+    """
+    Écrit un dataset en Parquet partitionné par année.
+
+    Args:
+        df: DataFrame avec une colonne temps
+        csv_path: chemin CSV de référence (le store est écrit à côté)
+        csv: écrire aussi le CSV (échange avec MT5)
+        time_col: colonne temps utilisée pour le partitionnement
+    """
+    if csv or not USE_PARQUET:
+        df.to_csv(csv_path, index=False)
+    if not USE_PARQUET:
+        return
+
+    directory = store_path(csv_path)
+    os.makedirs(directory, exist_ok=True)
+
+    # Réécriture complète: invalider puis supprimer les anciennes partitions
+    marker = os.path.join(directory, SUCCESS_FILE)
+    if os.path.exists(marker):
+        os.remove(marker)
+    for old in glob.glob(os.path.join(directory, "year=*.parquet")):
+        os.remove(old)
+
+    years = pd.to_datetime(df[time_col]).dt.year
+    for year, df_year in df.groupby(years, sort=True):
+        df_year.to_parquet(os.path.join(directory, f"year={year}.parquet"),
+                           engine='pyarrow', compression='zstd', index=False)
+
+    with open(marker, "w") as f:
+        f.write(f"{len(df)}\n")
+
+
+def append_dataset(df_new, csv_path, time_col='time'):
+    """
+    Ajoute / remplace des lignes dans un dataset existant (upsert sur time_col).
+
+    Seules les partitions des années présentes dans df_new sont réécrites.
+    Une ligne de df_new remplace la ligne stockée de même time_col.
+
+    Args:
+        df_new: nouvelles lignes (mêmes colonnes que le dataset)
+        csv_path: chemin CSV de référence
+        time_col: colonne temps (clé d'upsert et de partitionnement)
+
+    Returns:
+        nombre total de lignes du dataset après mise à jour
+    """
+    df_new = df_new.copy()
+    df_new[time_col] = pd.to_datetime(df_new[time_col])
+
+    if not USE_PARQUET or not _store_is_fresh(csv_path):
+        # Pas de store à jour: réécriture complète
+        df_old = read_dataset(csv_path, time_col=time_col) if dataset_exists(csv_path) else None
+        df = pd.concat([df_old, df_new], ignore_index=True) if df_old is not None else df_new
+        df = (df.drop_duplicates(subset=time_col, keep='last')
+                .sort_values(time_col, kind='stable').reset_index(drop=True))
+        write_dataset(df, csv_path, time_col=time_col)
+        return len(df)
+
+    directory = store_path(csv_path)
+    marker = os.path.join(directory, SUCCESS_FILE)
+    os.remove(marker)
+
+    years = df_new[time_col].dt.year
+    for year, df_year in df_new.groupby(years, sort=True):
+        path = os.path.join(directory, f"year={year}.parquet")
+        if os.path.exists(path):
+            df_old = pd.read_parquet(path, engine='pyarrow')
+            df_old[time_col] = pd.to_datetime(df_old[time_col])
+            df_year = pd.concat([df_old, df_year[df_old.columns]], ignore_index=True)
+        df_year = (df_year.drop_duplicates(subset=time_col, keep='last')
+                          .sort_values(time_col, kind='stable'))
+        df_year.to_parquet(path, engine='pyarrow', compression='zstd', index=False)
+
+    n_rows = sum(pd.read_parquet(p, columns=[time_col], engine='pyarrow').shape[0]
+                 for p in glob.glob(os.path.join(directory, "year=*.parquet")))
+    with open(marker, "w") as f:
+        f.write(f"{n_rows}\n")
+    return n_rows
+
+
+def read_dataset(csv_path, columns=None, years=None, time_col='time'):
+    """
+    Lit un dataset (Parquet si disponible et à jour, sinon CSV).
+
+    Args:
+        csv_path: chemin du CSV de référence
+        columns: colonnes à lire (None = toutes)
+        years: années à lire (None = toutes)
+        time_col: colonne temps (convertie en datetime)
+
+    Returns:
+        DataFrame trié par time_col
+    """
+    if USE_PARQUET and _store_is_fresh(csv_path):
+        paths = sorted(glob.glob(os.path.join(store_path(csv_path), "year=*.parquet")),
+                       key=_partition_year)
+        if years is not None:
+            paths = [p for p in paths if _partition_year(p) in set(years)]
+        if not paths:
+            return pd.DataFrame(columns=columns)
+        df = pd.concat([pd.read_parquet(p, columns=columns, engine='pyarrow') for p in paths],
+                       ignore_index=True)
+    else:
+        df = pd.read_csv(csv_path)
+        if time_col in df.columns:
+            df[time_col] = pd.to_datetime(df[time_col])
+
+        # Conversion pour les prochaines lectures
+        if USE_PARQUET:
+            write_dataset(df, csv_path, time_col=time_col)
+
+        if years is not None:
+            df = df[df[time_col].dt.year.isin(years)]
+        if columns is not None:
+            df = df[columns]
+        df = df.reset_index(drop=True)
+
+    if time_col in df.columns:
+        df[time_col] = pd.to_datetime(df[time_col])
+        df = df.sort_values(time_col, kind='stable').reset_index(drop=True)
+    return df
@@ -14,11 +14,13 @@ import numpy as np
 import lightgbm as lgb
 import xgboost as xgb
 import catboost as cb
-from sklearn.model_selection import TimeSeriesSplit
 from sklearn.ensemble import VotingClassifier
 from sklearn.metrics import roc_auc_score, classification_report, confusion_matrix
-import joblib
 import os
+from dataset_store import read_dataset, dataset_exists
+from compact_dtypes import compact_frame, clean_matrix, memory_mb
+from model_bundle import save_model, model_size_mb
+from run_report import RunReport
 from datetime import datetime
 
 print("=" * 80)
@@ -30,16 +32,19 @@ INPUT_CSV = "XAUUSD_COMPLETE_ML_Data_20Y_ENGINEERED.csv"
 MODEL_OUTPUT = "xauusd_ensemble_model.pkl"
 N_SPLITS = 3  # Cross-validation folds
 
+report = RunReport("ensemble_methods")
+
 # ==================== CHARGEMENT ====================
+report.stage("chargement")
 print("\n📂 Chargement des données...")
 csv_path = os.path.join(r"C:\Users\lbye3\AppData\Roaming\MetaQuotes\Terminal\Common\Files", INPUT_CSV)
 
-if not os.path.exists(csv_path):
+if not dataset_exists(csv_path):
     print(f"❌ Fichier introuvable: {csv_path}")
     print(f"Lancez d'abord: python feature_engineering_advanced.py")
     exit(1)
 
-df = pd.read_csv(csv_path)
+df = read_dataset(csv_path)
 print(f"✅ {len(df)} lignes chargées")
 
 # Préparer les données
@@ -59,12 +64,11 @@ print(f"✅ Dataset équilibré: {len(df_balanced)} lignes")
 exclude_cols = ['target', 'time']
 feature_cols = [col for col in df_balanced.columns if col not in exclude_cols]
 
-X = df_balanced[feature_cols].copy()
+# Types compacts (float32 / int8) puis inf / NaN -> 0 colonne par colonne
+X = clean_matrix(compact_frame(df_balanced[feature_cols]))
 y = df_balanced['target'].copy()
 
-X = X.replace([np.inf, -np.inf], np.nan).fillna(0)
-
-print(f"✅ {X.shape[0]} lignes × {X.shape[1]} features")
+print(f"✅ {X.shape[0]} lignes × {X.shape[1]} features ({memory_mb(X):.1f} Mo)")
 
 # ==================== CONFIGURATION MODÈLES ====================
 print("\n" + "=" * 80)
@@ -124,6 +128,7 @@ print("✅ XGBoost configuré")
 print("✅ CatBoost configuré")
 
 # ==================== ENTRAÎNEMENT INDIVIDUEL ====================
+report.stage("entrainement")
 print("\n" + "=" * 80)
 print("🚀 ENTRAÎNEMENT DES 3 MODÈLES INDIVIDUELS")
 print("=" * 80)
@@ -176,6 +181,7 @@ cat_auc = roc_auc_score(y_test, cat_pred)
 print(f"   ✅ CatBoost AUC: {cat_auc:.4f}")
 
 # ==================== ENSEMBLE VOTING ====================
+report.stage("ensemble")
 print("\n" + "=" * 80)
 print("🎯 CRÉATION ENSEMBLE VOTING CLASSIFIER")
 print("=" * 80)
@@ -222,6 +228,7 @@ print(f"   CatBoost: {cat_auc:.4f}")
 print(f"   Ensemble: {ensemble_auc:.4f} {'✅ MEILLEUR' if ensemble_auc > max(lgbm_auc, xgb_auc, cat_auc) else ''}")
 
 # ==================== MÉTRIQUES DÉTAILLÉES ====================
+report.stage("metriques")
 print("\n" + "=" * 80)
 print("📊 MÉTRIQUES DÉTAILLÉES ENSEMBLE")
 print("=" * 80)
@@ -242,6 +249,7 @@ win_rate = cm[1, 1] / (cm[1, 1] + cm[0, 1]) if (cm[1, 1] + cm[0, 1]) > 0 else 0
 print(f"\n🎯 Win Rate (sur signaux prédits WIN): {win_rate*100:.2f}%")
 
 # ==================== SAUVEGARDE ====================
+report.stage("sauvegarde")
 print("\n" + "=" * 80)
 print("💾 SAUVEGARDE MODÈLE ENSEMBLE")
 print("=" * 80)
@@ -267,10 +275,10 @@ model_data = {
     'ensemble_method': 'soft_voting'
 }
 
-joblib.dump(model_data, model_path)
-print(f"✅ Modèle sauvegardé: {model_path}")
+bundle_dir = save_model(model_data, model_path)
+print(f"✅ Modèle sauvegardé: {bundle_dir}")
 
-file_size_mb = os.path.getsize(model_path) / (1024 * 1024)
+file_size_mb = model_size_mb(model_path)
 print(f"📦 Taille: {file_size_mb:.2f} MB")
 
 # ==================== RÉSUMÉ ====================
@@ -296,3 +304,5 @@ print(f"   2. Calibrer pour obtenir 70%+ confidence threshold")
 print(f"   3. Backtest final")
 
 print("\n" + "=" * 80)
+
+report.save(model_path)
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Ordonnanceur d'entraînement de l'ensemble (budget de threads)
+Version 1.0 - 2026-10-18
+
+OBJECTIF:
+- Éviter la sur-souscription CPU: RF/ET en n_jobs=-1 + LightGBM/XGBoost/CatBoost
+  qui prennent tous les cœurs par défaut
+- Connaître le paramètre de threads de chaque modèle (n_jobs / thread_count)
+- Répartir un budget de cœurs entre les fits selon leur coût relatif
+- Entraîner les modèles en même temps (threads: les librairies libèrent le GIL)
+
+Ordonnancement:
+- Cœurs >= modèles: tous les fits en parallèle, cœurs proportionnels au coût
+- Cœurs < modèles: 1 cœur par fit, les plus longs lancés en premier (LPT)
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Paramètre contrôlant le nombre de threads de chaque modèle
+THREAD_PARAMS = {
+    'LGBMClassifier': 'n_jobs',
+    'XGBClassifier': 'n_jobs',
+    'CatBoostClassifier': 'thread_count',
+    'RandomForestClassifier': 'n_jobs',
+    'ExtraTreesClassifier': 'n_jobs',
+}
+
+# Coût relatif estimé d'un fit (200 arbres, ~100k lignes H1)
+DEFAULT_COSTS = {
+    'LGBMClassifier': 1.0,
+    'XGBClassifier': 1.5,
+    'CatBoostClassifier': 2.0,
+    'RandomForestClassifier': 2.0,
+    'ExtraTreesClassifier': 1.0,
+}
+
+
+def set_threads(model, n_threads):
+    """Fixe le nombre de threads d'un modèle (ignoré si modèle inconnu)."""
+    param = THREAD_PARAMS.get(type(model).__name__)
+    if param is not None:
+        model.set_params(**{param: n_threads})
+    return model
+
+
+def allocate_cores(costs, total_cores):
+    """
+    Répartit total_cores entre les fits proportionnellement au coût.
+
+    Chaque fit reçoit au moins 1 cœur; le reste est distribué au plus fort reste.
+
+    Returns:
+        liste du nombre de cœurs par fit (même ordre que costs)
+    """
+    n = len(costs)
+    if total_cores <= n:
+        return [1] * n
+
+    total_cost = sum(costs)
+    shares = [total_cores * c / total_cost for c in costs]
+    cores = [max(1, int(s)) for s in shares]
+
+    # Ajuster pour respecter exactement le budget
+    while sum(cores) > total_cores:
+        # Jamais sous 1 cœur (n_jobs=0 refusé): seuls les fits à 2+ cœurs cèdent
+        k = max((j for j in range(n) if cores[j] > 1), key=lambda j: (cores[j] - shares[j], cores[j]))
+        cores[k] -= 1
+    while sum(cores) < total_cores:
+        k = max(range(n), key=lambda j: shares[j] - cores[j])
+        cores[k] += 1
+    return cores
+
+
+def fit_ensemble(tasks, total_cores=None, costs=None, verbose=True):
+    """
+    Entraîne plusieurs modèles en parallèle dans un budget de cœurs.
+
+    Args:
+        tasks: liste de (name, model, fit_args, fit_kwargs)
+        total_cores: budget total (défaut: tous les cœurs)
+        costs: dict name -> coût relatif (défaut: DEFAULT_COSTS par type de modèle)
+        verbose: afficher la répartition
+
+    Returns:
+        dict name -> modèle entraîné (ordre des tasks)
+    """
+    total_cores = total_cores or os.cpu_count() or 1
+    costs = costs or {}
+    task_costs = [costs.get(name, DEFAULT_COSTS.get(type(model).__name__, 1.0))
+                  for name, model, _, _ in tasks]
+
+    cores = allocate_cores(task_costs, total_cores)
+    for (_, model, _, _), n_threads in zip(tasks, cores, strict=True):
+        set_threads(model, n_threads)
+
+    if verbose:
+        plan = ", ".join(f"{name}={n}" for (name, _, _, _), n in zip(tasks, cores, strict=True))
+        print(f"   Répartition {total_cores} cœurs: {plan}")
+
+    # Fits les plus longs en premier (LPT)
+    order = sorted(range(len(tasks)), key=lambda j: -task_costs[j])
+    max_workers = min(len(tasks), total_cores)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {}
+        for j in order:
+            name, model, fit_args, fit_kwargs = tasks[j]
+            futures[name] = pool.submit(model.fit, *fit_args, **fit_kwargs)
+        # .result() propage les erreurs de fit
+        for future in futures.values():
+            future.result()
+
+    return {name: model for name, model, _, _ in tasks}
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Cache disque des features / labels adressé par contenu
+Version 1.0 - 2026-10-18
+
+OBJECTIF:
+- Ne plus recalculer les features (create_advanced_features, TP/SL, target RR4)
+  quand ni les données ni le code ni les paramètres n'ont changé
+- Clé = empreinte des données d'entrée + code source des fonctions de calcul
+  (et modules dont elles dépendent) + paramètres
+- Relancer un entraînement en ne changeant que les hyperparamètres des modèles
+  réutilise directement le résultat
+- Taille du cache bornée: éviction LRU (fichiers les moins récemment utilisés)
+- Seules les colonnes ajoutées ou modifiées par la fonction sont stockées, puis
+  rejointes aux données d'entrée (le dataset brut n'est pas dupliqué à chaque étape)
+
+NOTE:
+- Changer une constante globale lue par la fonction (ex: SL_ATR_MULTIPLIER) doit
+  passer par `params`, sinon la clé ne change pas
+- Fichiers Parquet (pyarrow), sinon pickle
+- Résultat aux lignes différentes de l'entrée (filtrage) ou colonnes supprimées
+  / réordonnées: stocké en entier
+"""
+
+import os
+import hashlib
+import inspect
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    USE_PARQUET = True
+except ImportError:
+    USE_PARQUET = False
+
+MAX_CACHE_MB = 2048
+
+
+def data_fingerprint(df):
+    """Empreinte du contenu d'un DataFrame (colonnes, types, valeurs, index)."""
+    h = hashlib.sha256()
+    h.update(repr([(str(c), str(t)) for c, t in df.dtypes.items()]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return h.hexdigest()
+
+
+def code_fingerprint(*objects):
+    """Empreinte du code source de fonctions / modules (repr pour le reste)."""
+    h = hashlib.sha256()
+    for obj in objects:
+        try:
+            src = inspect.getsource(obj)
+        except (TypeError, OSError):
+            src = repr(obj)
+        h.update(src.encode())
+    return h.hexdigest()
+
+
+def cache_key(df, func, params=None, code=()):
+    """Clé du résultat de func(df) pour ces données, ce code et ces paramètres."""
+    h = hashlib.sha256()
+    h.update(data_fingerprint(df).encode())
+    h.update(code_fingerprint(func, *code).encode())
+    h.update(repr(sorted((params or {}).items())).encode())
+    return h.hexdigest()[:32]
+
+
+def evict(cache_dir, max_mb=MAX_CACHE_MB):
+    """Supprime les entrées les moins récemment utilisées au-delà de max_mb."""
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if os.path.isfile(path) and not name.endswith(".tmp"):
+            entries.append((os.path.getmtime(path), os.path.getsize(path), path))
+
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_mb * 1024 * 1024:
+            break
+        os.remove(path)
+        total -= size
+        removed += 1
+    return removed
+
+
+def _delta_columns(df, result):
+    """
+    Colonnes ajoutées ou modifiées par func (None si le résultat n'est pas
+    reconstructible à partir de df: lignes, colonnes supprimées ou ordre différent).
+    """
+    if not result.index.equals(df.index):
+        return None
+    added = [c for c in result.columns if c not in df.columns]
+    if list(result.columns) != list(df.columns) + added:
+        return None
+    return [c for c in df.columns if not result[c].equals(df[c])] + added
+
+
+def _read_frame(path):
+    return pd.read_parquet(path, engine='pyarrow') if USE_PARQUET else pd.read_pickle(path)
+
+
+def _write_frame(df, path):
+    # Écriture atomique (pas d'entrée partielle si interruption)
+    tmp_path = path + ".tmp"
+    if USE_PARQUET:
+        df.to_parquet(tmp_path, engine='pyarrow', compression='zstd')
+    else:
+        df.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def cached_frame(func, df, cache_dir, params=None, code=(), max_mb=MAX_CACHE_MB, verbose=True):
+    """
+    Résultat de func(df) depuis le cache, calculé et stocké si absent.
+
+    Args:
+        func: fonction df -> DataFrame (features, labels...)
+        df: données d'entrée
+        cache_dir: dossier du cache
+        params: paramètres influençant le résultat (dict, entrent dans la clé)
+        code: fonctions / modules utilisés par func (leur code entre dans la clé)
+        max_mb: taille maximale du cache
+        verbose: afficher hit / miss
+
+    Returns:
+        DataFrame (identique à func(df))
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    key = cache_key(df, func, params, code)
+    ext = ".parquet" if USE_PARQUET else ".pkl"
+    path = os.path.join(cache_dir, f"{func.__name__}_{key}{ext}")
+    delta_path = os.path.join(cache_dir, f"{func.__name__}_{key}.delta{ext}")
+
+    if os.path.exists(delta_path):
+        os.utime(delta_path)  # LRU: marquer comme récemment utilisé
+        delta = _read_frame(delta_path)
+        delta.index = df.index
+        kept = [c for c in df.columns if c not in delta.columns]
+        order = list(df.columns) + [c for c in delta.columns if c not in df.columns]
+        result = pd.concat([df[kept], delta], axis=1)[order]
+        if verbose:
+            print(f"OK: {func.__name__} depuis le cache ({key[:12]}, {delta.shape[1]} colonnes)")
+        return result
+
+    if os.path.exists(path):
+        os.utime(path)
+        result = _read_frame(path)
+        if verbose:
+            print(f"OK: {func.__name__} depuis le cache ({key[:12]})")
+        return result
+
+    result = func(df)
+
+    columns = _delta_columns(df, result)
+    if columns is not None:
+        _write_frame(result[columns], delta_path)
+    else:
+        _write_frame(result, path)
+
+    removed = evict(cache_dir, max_mb)
+    if verbose:
+        print(f"OK: {func.__name__} mis en cache ({key[:12]}"
+              + (f", {removed} entrées évincées)" if removed else ")"))
+    return result
@@ -13,6 +13,9 @@ NOUVELLES FEATURES:
 import pandas as pd
 import numpy as np
 import os
+from dataset_store import read_dataset, write_dataset, dataset_exists
+from feature_registry import compute_features
+from run_report import RunReport
 
 print("=" * 80)
 print("🧬 FEATURE ENGINEERING AVANCÉ")
@@ -22,21 +25,27 @@ print("=" * 80)
 INPUT_CSV = "XAUUSD_COMPLETE_ML_Data_20Y.csv"
 OUTPUT_CSV = "XAUUSD_COMPLETE_ML_Data_20Y_ENGINEERED.csv"
 
+report = RunReport("feature_engineering_advanced")
+
 # ==================== CHARGEMENT ====================
+report.stage("chargement")
 print("\n📂 Chargement des données...")
 csv_path = os.path.join(r"C:\Users\lbye3\AppData\Roaming\MetaQuotes\Terminal\Common\Files", INPUT_CSV)
 
-if not os.path.exists(csv_path):
+if not dataset_exists(csv_path):
     print(f"❌ Fichier introuvable: {csv_path}")
     exit(1)
 
-df = pd.read_csv(csv_path)
-df['time'] = pd.to_datetime(df['time'])
+df = read_dataset(csv_path)
 print(f"✅ {len(df)} lignes chargées")
 print(f"📊 {len(df.columns)} colonnes existantes")
 
 initial_cols = len(df.columns)
 
+# Noms des features à créer (calculées ensemble via feature_registry,
+# intermédiaires partagés: ex. volatility_roll_mean_20 -> volatility_ratio)
+new_features = []
+
 # ==================== LAG FEATURES ====================
 print("\n" + "=" * 80)
 print("🔙 CRÉATION LAG FEATURES (valeurs passées)")
@@ -58,11 +67,10 @@ lag_count = 0
 for feat in important_features:
     if feat in df.columns:
         for lag in lags:
-            new_col = f"{feat}_lag{lag}"
-            df[new_col] = df[feat].shift(lag)
+            new_features.append(f"{feat}_lag{lag}")
             lag_count += 1
 
-print(f"✅ {lag_count} lag features créées")
+print(f"✅ {lag_count} lag features planifiées")
 
 # ==================== ROLLING STATISTICS ====================
 print("\n" + "=" * 80)
@@ -76,13 +84,11 @@ roll_count = 0
 for feat in important_features[:8]:  # Top 8 pour éviter trop de features
     if feat in df.columns:
         for window in windows:
-            # Moyenne mobile
-            df[f"{feat}_roll_mean_{window}"] = df[feat].rolling(window).mean()
-            # Écart-type mobile
-            df[f"{feat}_roll_std_{window}"] = df[feat].rolling(window).std()
+            # Moyenne mobile et écart-type mobile
+            new_features += [f"{feat}_roll_mean_{window}", f"{feat}_roll_std_{window}"]
             roll_count += 2
 
-print(f"✅ {roll_count} rolling features créées")
+print(f"✅ {roll_count} rolling features planifiées")
 
 # ==================== INTERACTIONS ====================
 print("\n" + "=" * 80)
@@ -102,38 +108,30 @@ interactions = [
 inter_count = 0
 for feat1, feat2 in interactions:
     if feat1 in df.columns and feat2 in df.columns:
-        df[f"{feat1}_x_{feat2}"] = df[feat1] * df[feat2]
+        new_features.append(f"{feat1}_x_{feat2}")
         inter_count += 1
 
-print(f"✅ {inter_count} interaction features créées")
+print(f"✅ {inter_count} interaction features planifiées")
 
 # ==================== TIME-BASED FEATURES ====================
 print("\n" + "=" * 80)
 print("⏰ CRÉATION TIME-BASED FEATURES AVANCÉES")
 print("=" * 80)
 
-# Patterns horaires (sinus/cosinus pour capturer cyclicité)
-df['hour_sin'] = np.sin(2 * np.pi * df['hour'] / 24)
-df['hour_cos'] = np.cos(2 * np.pi * df['hour'] / 24)
-
-# Patterns hebdomadaires
-df['day_sin'] = np.sin(2 * np.pi * df['day_of_week'] / 7)
-df['day_cos'] = np.cos(2 * np.pi * df['day_of_week'] / 7)
-
-# Patterns mensuels
-df['month_sin'] = np.sin(2 * np.pi * df['month'] / 12)
-df['month_cos'] = np.cos(2 * np.pi * df['month'] / 12)
-
-# Sessions de trading (indicateur binaire)
-df['is_london_session'] = ((df['hour'] >= 8) & (df['hour'] < 16)).astype(int)
-df['is_us_session'] = ((df['hour'] >= 13) & (df['hour'] < 21)).astype(int)
-df['is_asia_session'] = ((df['hour'] >= 0) & (df['hour'] < 8)).astype(int)
-
-# Weekend proximity (vendredi soir, lundi matin)
-df['is_friday'] = (df['day_of_week'] == 5).astype(int)
-df['is_monday'] = (df['day_of_week'] == 1).astype(int)
+new_features += [
+    # Patterns horaires (sinus/cosinus pour capturer cyclicité)
+    'hour_sin', 'hour_cos',
+    # Patterns hebdomadaires
+    'day_sin', 'day_cos',
+    # Patterns mensuels
+    'month_sin', 'month_cos',
+    # Sessions de trading (indicateur binaire)
+    'is_london_session', 'is_us_session', 'is_asia_session',
+    # Weekend proximity (vendredi soir, lundi matin)
+    'is_friday', 'is_monday',
+]
 
-print(f"✅ 12 time-based features créées")
+print(f"✅ 12 time-based features planifiées")
 
 # ==================== MOMENTUM & TREND ====================
 print("\n" + "=" * 80)
@@ -141,18 +139,15 @@ print("📈 CRÉATION MOMENTUM & TREND FEATURES")
 print("=" * 80)
 
 # Rate of change (ROC) sur différentes périodes
-for period in [3, 7, 14]:
-    df[f'roc_{period}'] = df['close'].pct_change(period) * 100
+new_features += [f'roc_{period}' for period in [3, 7, 14]]
 
 # Distance par rapport aux moyennes mobiles
-df['dist_ema21'] = (df['close'] - df['ema21']) / df['ema21'] * 100
-df['dist_ema55'] = (df['close'] - df['ema55']) / df['ema55'] * 100
-df['dist_smma50'] = (df['close'] - df['smma50']) / df['smma50'] * 100
+new_features += ['dist_ema21', 'dist_ema55', 'dist_smma50']
 
-# Volatilité relative
-df['volatility_ratio'] = df['volatility'] / df['volatility'].rolling(20).mean()
+# Volatilité relative (volatility / moyenne mobile 20)
+new_features.append('volatility_ratio')
 
-print(f"✅ 10 momentum/trend features créées")
+print(f"✅ 10 momentum/trend features planifiées")
 
 # ==================== MARKET REGIME ====================
 print("\n" + "=" * 80)
@@ -160,20 +155,27 @@ print("🎯 CRÉATION MARKET REGIME FEATURES")
 print("=" * 80)
 
 # Tendance (basée sur EMA)
-df['trend_strength'] = (df['ema21'] - df['ema55']).abs() / df['ema55'] * 100
+new_features.append('trend_strength')
 
-# Volatilité regime (haute/basse)
-vol_median = df['volatility'].rolling(50).median()
-df['high_vol_regime'] = (df['volatility'] > vol_median).astype(int)
+# Volatilité regime (haute/basse vs médiane mobile 50)
+new_features.append('high_vol_regime')
 
 # RSI zones
-df['rsi28_oversold'] = (df['rsi28'] < 30).astype(int)
-df['rsi28_overbought'] = (df['rsi28'] > 70).astype(int)
-df['rsi28_neutral'] = ((df['rsi28'] >= 30) & (df['rsi28'] <= 70)).astype(int)
+new_features += ['rsi28_oversold', 'rsi28_overbought', 'rsi28_neutral']
+
+print(f"✅ 6 market regime features planifiées")
+
+# ==================== CALCUL ====================
+report.stage("features")
+print("\n" + "=" * 80)
+print("⚙️  CALCUL DES FEATURES (graphe de dépendances)")
+print("=" * 80)
 
-print(f"✅ 6 market regime features créées")
+df = pd.concat([df, compute_features(df, new_features)], axis=1)
+print(f"✅ {len(new_features)} features calculées")
 
 # ==================== NETTOYAGE ====================
+report.stage("nettoyage")
 print("\n" + "=" * 80)
 print("🧹 NETTOYAGE DES DONNÉES")
 print("=" * 80)
@@ -193,12 +195,13 @@ print(f"   Lignes supprimées: {len(df) - (len(df) - nan_before)}")
 print(f"   Lignes finales: {len(df)}")
 
 # ==================== EXPORT ====================
+report.stage("export")
 print("\n" + "=" * 80)
 print("💾 EXPORT FICHIER ENRICHI")
 print("=" * 80)
 
 output_path = os.path.join(os.path.dirname(csv_path), OUTPUT_CSV)
-df.to_csv(output_path, index=False)
+write_dataset(df, output_path)
 
 final_cols = len(df.columns)
 new_features = final_cols - initial_cols
@@ -228,3 +231,5 @@ print(f"   Le modèle aura {final_cols} features au lieu de {initial_cols}")
 print(f"   Performance attendue: +5-15% d'amélioration")
 
 print("\n" + "=" * 80)
+
+report.save(output_path)
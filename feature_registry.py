@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+"""
+Registre des features dérivées (graphe de dépendances, calcul à la demande)
+Version 1.0 - 2026-10-18
+
+OBJECTIF:
+- Chaque feature dérivée déclare ses entrées (colonnes de base ou autres features)
+- compute_features(df, noms) ne calcule que le sous-graphe nécessaire aux noms
+  demandés (feature_cols d'un modèle), chaque nœud une seule fois
+- Intermédiaires partagés: volatility_roll_mean_20 sert à la fois de feature
+  et au calcul de volatility_ratio, rsi_h4_lag1 à rsi_momentum, etc.
+- required_columns(noms): colonnes de base à lire (projection du store Parquet)
+
+Familles par motif de nom (toute colonne source):
+- {col}_lag{n}                        -> col.shift(n)
+- {col}_roll_{mean|std|max|min|median}_{w} -> col.rolling(w).{stat}()
+- {a}_x_{b}                           -> a * b
+- roc_{n}                             -> close.pct_change(n) * 100
+Features nommées: register(nom, entrées) (temps, distances, régimes, V6).
+
+Mêmes opérations que feature_engineering_advanced.py et create_advanced_features
+(V6): résultats identiques au calcul colonne par colonne.
+"""
+
+import re
+import numpy as np
+import pandas as pd
+
+# nom -> (entrées, fonction des Series d'entrée)
+_REGISTRY = {}
+
+
+def register(name, inputs):
+    """Déclare une feature nommée: func(*series_entrées) -> Series."""
+    def decorator(func):
+        _REGISTRY[name] = (list(inputs), func)
+        return func
+    return decorator
+
+
+def _rolling(stat, window):
+    return lambda s: getattr(s.rolling(window), stat)()
+
+
+# Ordre: le premier motif qui correspond gagne
+_PATTERNS = [
+    (re.compile(r'^(?P<src>.+)_roll_(?P<stat>mean|std|max|min|median)_(?P<w>\d+)$'),
+     lambda m: ([m['src']], _rolling(m['stat'], int(m['w'])))),
+    (re.compile(r'^(?P<src>.+)_lag(?P<n>\d+)$'),
+     lambda m: ([m['src']], lambda s, n=int(m['n']): s.shift(n))),
+    (re.compile(r'^roc_(?P<n>\d+)$'),
+     lambda m: (['close'], lambda s, n=int(m['n']): s.pct_change(n) * 100)),
+    (re.compile(r'^(?P<a>.+?)_x_(?P<b>.+)$'),
+     lambda m: ([m['a'], m['b']], lambda a, b: a * b)),
+]
+
+
+def definition(name):
+    """(entrées, fonction) d'une feature dérivée, None si nom inconnu."""
+    if name in _REGISTRY:
+        return _REGISTRY[name]
+    for pattern, build in _PATTERNS:
+        m = pattern.match(name)
+        if m:
+            return build(m)
+    return None
+
+
+def feature_plan(names, available):
+    """
+    Ordre de calcul (topologique) des features dérivées nécessaires.
+
+    Une colonne déjà présente dans `available` n'est jamais recalculée.
+
+    Raises:
+        KeyError si un nom n'est ni disponible ni dérivable
+    """
+    available = set(available)
+    order, done, visiting = [], set(), set()
+
+    def visit(name):
+        if name in available or name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Dépendance circulaire sur {name}")
+        spec = definition(name)
+        if spec is None:
+            raise KeyError(f"Feature inconnue et absente des données: {name}")
+        visiting.add(name)
+        for dep in spec[0]:
+            visit(dep)
+        visiting.discard(name)
+        done.add(name)
+        order.append(name)
+
+    for name in names:
+        visit(name)
+    return order
+
+
+def required_columns(names, available=()):
+    """Colonnes de base (non dérivables) nécessaires pour calculer `names`."""
+    available = set(available)
+    base, seen = [], set()
+
+    def visit(name):
+        if name in seen:
+            return
+        seen.add(name)
+        spec = None if name in available else definition(name)
+        if spec is None:
+            base.append(name)
+            return
+        for dep in spec[0]:
+            visit(dep)
+
+    for name in names:
+        visit(name)
+    return base
+
+
+def compute_features(df, names):
+    """
+    Calcule uniquement les features demandées (et leurs dépendances).
+
+    Args:
+        df: DataFrame des colonnes de base
+        names: features voulues (colonnes de base acceptées telles quelles)
+
+    Returns:
+        DataFrame des colonnes `names` (même index que df), intermédiaires non inclus
+    """
+    values = {}
+
+    def get(name):
+        return values[name] if name in values else df[name]
+
+    for name in feature_plan(names, df.columns):
+        inputs, func = definition(name)
+        values[name] = func(*[get(i) for i in inputs])
+
+    return pd.DataFrame({name: get(name) for name in names}, index=df.index)
+
+
+# ==================== FEATURES NOMMEES ====================
+# feature_engineering_advanced.py
+
+@register('hour_sin', ['hour'])
+def _hour_sin(hour):
+    return np.sin(2 * np.pi * hour / 24)
+
+
+@register('hour_cos', ['hour'])
+def _hour_cos(hour):
+    return np.cos(2 * np.pi * hour / 24)
+
+
+@register('day_sin', ['day_of_week'])
+def _day_sin(dow):
+    return np.sin(2 * np.pi * dow / 7)
+
+
+@register('day_cos', ['day_of_week'])
+def _day_cos(dow):
+    return np.cos(2 * np.pi * dow / 7)
+
+
+@register('month_sin', ['month'])
+def _month_sin(month):
+    return np.sin(2 * np.pi * month / 12)
+
+
+@register('month_cos', ['month'])
+def _month_cos(month):
+    return np.cos(2 * np.pi * month / 12)
+
+
+@register('is_london_session', ['hour'])
+def _is_london_session(hour):
+    return ((hour >= 8) & (hour < 16)).astype(int)
+
+
+@register('is_us_session', ['hour'])
+def _is_us_session(hour):
+    return ((hour >= 13) & (hour < 21)).astype(int)
+
+
+@register('is_asia_session', ['hour'])
+def _is_asia_session(hour):
+    return ((hour >= 0) & (hour < 8)).astype(int)
+
+
+@register('is_friday', ['day_of_week'])
+def _is_friday(dow):
+    return (dow == 5).astype(int)
+
+
+@register('is_monday', ['day_of_week'])
+def _is_monday(dow):
+    return (dow == 1).astype(int)
+
+
+@register('dist_ema21', ['close', 'ema21'])
+def _dist_ema21(close, ema21):
+    return (close - ema21) / ema21 * 100
+
+
+@register('dist_ema55', ['close', 'ema55'])
+def _dist_ema55(close, ema55):
+    return (close - ema55) / ema55 * 100
+
+
+@register('dist_smma50', ['close', 'smma50'])
+def _dist_smma50(close, smma50):
+    return (close - smma50) / smma50 * 100
+
+
+@register('volatility_ratio', ['volatility', 'volatility_roll_mean_20'])
+def _volatility_ratio(volatility, mean20):
+    return volatility / mean20
+
+
+@register('trend_strength', ['ema21', 'ema55'])
+def _trend_strength(ema21, ema55):
+    return (ema21 - ema55).abs() / ema55 * 100
+
+
+@register('high_vol_regime', ['volatility', 'volatility_roll_median_50'])
+def _high_vol_regime(volatility, median50):
+    return (volatility > median50).astype(int)
+
+
+@register('rsi28_oversold', ['rsi28'])
+def _rsi28_oversold(rsi):
+    return (rsi < 30).astype(int)
+
+
+@register('rsi28_overbought', ['rsi28'])
+def _rsi28_overbought(rsi):
+    return (rsi > 70).astype(int)
+
+
+@register('rsi28_neutral', ['rsi28'])
+def _rsi28_neutral(rsi):
+    return ((rsi >= 30) & (rsi <= 70)).astype(int)
+
+
+# create_advanced_features (V6)
+
+@register('atr_ratio_h4_h1', ['atr14', 'atr14_roll_mean_96'])
+def _atr_ratio_h4_h1(atr, mean96):
+    return atr / (mean96 + 1e-10)  # 96 bars = 4 jours H1
+
+
+@register('volume_ma20', ['volume_roll_mean_20'])
+def _volume_ma20(mean20):
+    return mean20
+
+
+@register('volume_spike', ['volume', 'volume_roll_mean_20'])
+def _volume_spike(volume, mean20):
+    return volume / (mean20 + 1e-10)
+
+
+@register('price_distance_ema21', ['close', 'ema21'])
+def _price_distance_ema21(close, ema21):
+    return (close - ema21) / close
+
+
+@register('price_distance_ema55', ['close', 'ema55'])
+def _price_distance_ema55(close, ema55):
+    return (close - ema55) / close
+
+
+@register('rsi_momentum', ['rsi_h4', 'rsi_h4_lag1'])
+def _rsi_momentum(rsi, rsi_prev):
+    return rsi - rsi_prev
+
+
+@register('macd_momentum', ['macd_hist', 'macd_hist_lag1'])
+def _macd_momentum(hist, hist_prev):
+    return hist - hist_prev
+
+
+@register('adx_strong_trend', ['adx14'])
+def _adx_strong_trend(adx):
+    return (adx > 25).astype(int)
+
+
+@register('dxy_vix_product', ['DXY', 'VIX'])
+def _dxy_vix_product(dxy, vix):
+    return dxy * vix  # Produit comme proxy de risk-off
+
+
+@register('dxy_momentum', ['DXY', 'DXY_lag1'])
+def _dxy_momentum(dxy, dxy_prev):
+    return dxy - dxy_prev
+
+
+@register('vix_momentum', ['VIX', 'VIX_lag1'])
+def _vix_momentum(vix, vix_prev):
+    return vix - vix_prev
+
+
+@register('resistance_distance', ['high_roll_max_20', 'close'])
+def _resistance_distance(high_max, close):
+    return (high_max - close) / close
+
+
+@register('support_distance', ['close', 'low_roll_min_20'])
+def _support_distance(close, low_min):
+    return (close - low_min) / close
+
+
+@register('ema_cross_strength', ['ema21', 'ema55', 'close'])
+def _ema_cross_strength(ema21, ema55, close):
+    return (ema21 - ema55) / close
+
+
+@register('smma_alignment', ['smma50', 'smma200', 'trend_h4'])
+def _smma_alignment(smma50, smma200, trend_h4):
+    return ((smma50 > smma200).astype(int) == trend_h4).astype(int)
+
+
+@register('rsi_extreme_high', ['rsi_h4'])
+def _rsi_extreme_high(rsi):
+    return (rsi > 70).astype(int)
+
+
+@register('rsi_extreme_low', ['rsi_h4'])
+def _rsi_extreme_low(rsi):
+    return (rsi < 30).astype(int)
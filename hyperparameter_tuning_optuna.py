@@ -15,8 +15,13 @@ import lightgbm as lgb
 import optuna
 from sklearn.model_selection import TimeSeriesSplit
 from sklearn.metrics import roc_auc_score
-import joblib
 import os
+from dataset_store import read_dataset, dataset_exists
+from compact_dtypes import compact_frame, clean_matrix, memory_mb
+from binned_folds import cv_folds
+from optuna_studies import run_study, study_fingerprint, report
+from model_bundle import save_model, model_size_mb
+from run_report import RunReport
 from datetime import datetime
 
 print("=" * 80)
@@ -28,17 +33,24 @@ INPUT_CSV = "XAUUSD_COMPLETE_ML_Data_20Y_ENGINEERED.csv"
 MODEL_OUTPUT = "xauusd_lightgbm_optimized_model.pkl"
 N_TRIALS = 200  # Nombre d'essais Optuna
 N_SPLITS = 3    # Cross-validation folds
+N_WORKERS = 4   # Processus Optuna en parallèle (étude SQLite partagée)
+OPTUNA_THREADS = max(1, (os.cpu_count() or 1) // N_WORKERS)  # threads LightGBM par worker
+PRUNER = 'median'  # 'median', 'hyperband' ou None
+STUDY_DIR = r"C:\Users\lbye3\AppData\Roaming\MetaQuotes\Terminal\Common\Files\optuna_studies"
+
+timer = RunReport("hyperparameter_tuning_optuna")
 
 # ==================== CHARGEMENT ====================
+timer.stage("chargement")
 print("\n📂 Chargement des données...")
 csv_path = os.path.join(r"C:\Users\lbye3\AppData\Roaming\MetaQuotes\Terminal\Common\Files", INPUT_CSV)
 
-if not os.path.exists(csv_path):
+if not dataset_exists(csv_path):
     print(f"❌ Fichier introuvable: {csv_path}")
     print(f"Lancez d'abord: python feature_engineering_advanced.py")
     exit(1)
 
-df = pd.read_csv(csv_path)
+df = read_dataset(csv_path)
 print(f"✅ {len(df)} lignes chargées")
 
 # Préparer les données
@@ -58,12 +70,14 @@ print(f"✅ Dataset équilibré: {len(df_balanced)} lignes")
 exclude_cols = ['target', 'time']
 feature_cols = [col for col in df_balanced.columns if col not in exclude_cols]
 
-X = df_balanced[feature_cols].copy()
+# Types compacts (float32 / int8) puis inf / NaN -> 0 colonne par colonne
+X = clean_matrix(compact_frame(df_balanced[feature_cols]))
 y = df_balanced['target'].copy()
 
-X = X.replace([np.inf, -np.inf], np.nan).fillna(0)
+print(f"✅ {X.shape[0]} lignes × {X.shape[1]} features ({memory_mb(X):.1f} Mo)")
 
-print(f"✅ {X.shape[0]} lignes × {X.shape[1]} features")
+# Folds temporels binnés une seule fois, partagés par tous les essais
+cv = cv_folds(X, y, TimeSeriesSplit(n_splits=N_SPLITS).split(X))
 
 # ==================== FONCTION OBJECTIF ====================
 def objective(trial):
@@ -79,6 +93,7 @@ def objective(trial):
         'boosting_type': 'gbdt',
         'verbosity': -1,
         'random_state': 42,
+        'num_threads': OPTUNA_THREADS,
 
         # Paramètres à optimiser
         'num_leaves': trial.suggest_int('num_leaves', 20, 100),
@@ -92,51 +107,49 @@ def objective(trial):
         'lambda_l2': trial.suggest_float('lambda_l2', 1e-8, 10.0, log=True),
     }
 
-    # Cross-validation temporelle
-    tscv = TimeSeriesSplit(n_splits=N_SPLITS)
+    # Cross-validation temporelle (datasets déjà binnés)
+    # AUC moyenne rapportée après chaque fold -> essai stoppé s'il est sous la médiane
     auc_scores = []
 
-    for train_idx, val_idx in tscv.split(X):
-        X_train, X_val = X.iloc[train_idx], X.iloc[val_idx]
-        y_train, y_val = y.iloc[train_idx], y.iloc[val_idx]
-
-        train_data = lgb.Dataset(X_train, label=y_train)
-        val_data = lgb.Dataset(X_val, label=y_val, reference=train_data)
-
-        model = lgb.train(
+    for step, fold in enumerate(cv.folds(params)):
+        model = cv.train(
             params,
-            train_data,
+            fold,
             num_boost_round=500,
-            valid_sets=[val_data],
             callbacks=[
                 lgb.early_stopping(stopping_rounds=50, verbose=False),
                 lgb.log_evaluation(period=0)
             ]
         )
 
-        y_pred_proba = model.predict(X_val, num_iteration=model.best_iteration)
-        auc = roc_auc_score(y_val, y_pred_proba)
+        y_pred_proba = model.predict(fold.X_val, num_iteration=model.best_iteration)
+        auc = roc_auc_score(fold.y_val, y_pred_proba)
         auc_scores.append(auc)
+        report(trial, np.mean(auc_scores), step)
 
     return np.mean(auc_scores)
 
 # ==================== OPTIMISATION ====================
+timer.stage("optuna", n_trials=N_TRIALS)
 print("\n" + "=" * 80)
 print(f"🚀 LANCEMENT OPTIMISATION ({N_TRIALS} essais)")
 print("=" * 80)
 print(f"⏱️  Temps estimé: {N_TRIALS * N_SPLITS * 10 // 60} minutes")
-print(f"💡 Vous pouvez interrompre avec CTRL+C, le meilleur modèle sera sauvegardé")
-
-study = optuna.create_study(direction='maximize', study_name='lightgbm_tuning')
+print(f"💡 Vous pouvez interrompre avec CTRL+C, la relance reprendra l'étude là où elle s'est arrêtée")
+print(f"⚙️  {N_WORKERS} workers, pruner: {PRUNER}")
 
 # Callback pour afficher la progression
 def callback(study, trial):
-    if trial.number % 10 == 0:
+    if trial.number % 10 == 0 and trial.value is not None:
         print(f"\n📊 Essai {trial.number}/{N_TRIALS}")
         print(f"   Meilleur AUC: {study.best_value:.4f}")
         print(f"   AUC actuel: {trial.value:.4f}")
 
-study.optimize(objective, n_trials=N_TRIALS, callbacks=[callback], show_progress_bar=True)
+study = run_study(objective, 'lightgbm_tuning', STUDY_DIR, N_TRIALS, n_workers=N_WORKERS,
+                  pruner=PRUNER, fingerprint=study_fingerprint(X, y),
+                  callbacks=[callback], show_progress_bar=True)
+n_pruned = sum(t.state == optuna.trial.TrialState.PRUNED for t in study.trials)
+print(f"✂️  Essais prunés: {n_pruned}/{len(study.trials)}")
 
 # ==================== RÉSULTATS ====================
 print("\n" + "=" * 80)
@@ -149,6 +162,7 @@ for key, value in study.best_params.items():
     print(f"   {key:<20} {value}")
 
 # ==================== ENTRAÎNEMENT MODÈLE FINAL ====================
+timer.stage("entrainement")
 print("\n" + "=" * 80)
 print("🏆 ENTRAÎNEMENT MODÈLE FINAL AVEC MEILLEURS PARAMÈTRES")
 print("=" * 80)
@@ -179,6 +193,7 @@ final_model = lgb.train(
 print(f"✅ Modèle final entraîné avec {final_model.best_iteration} arbres")
 
 # ==================== SAUVEGARDE ====================
+timer.stage("sauvegarde")
 print("\n" + "=" * 80)
 print("💾 SAUVEGARDE MODÈLE OPTIMISÉ")
 print("=" * 80)
@@ -197,10 +212,10 @@ model_data = {
     'optimized': True
 }
 
-joblib.dump(model_data, model_path)
-print(f"✅ Modèle sauvegardé: {model_path}")
+bundle_dir = save_model(model_data, model_path)
+print(f"✅ Modèle sauvegardé: {bundle_dir}")
 
-file_size_mb = os.path.getsize(model_path) / (1024 * 1024)
+file_size_mb = model_size_mb(model_path)
 print(f"📦 Taille: {file_size_mb:.2f} MB")
 
 # ==================== RÉSUMÉ ====================
@@ -224,3 +239,5 @@ print(f"   2. Si bon → Ensemble Methods")
 print(f"   3. Si excellent → Calibration 70%+")
 
 print("\n" + "=" * 80)
+
+timer.save(model_path)
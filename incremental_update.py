@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Mise à jour incrémentale du dataset MT5 + MACRO (sans ré-export complet 20 ans)
+Version 1.0 - 2026-10-18
+
+OBJECTIF:
+- Ajouter les nouvelles barres H1 au dataset XAUUSD_ML_Data_V3_FINAL_WITH_MACRO_20Y
+  au lieu de relancer l'export MQ5 complet puis merge_mt5_with_macro.py
+- Export MQ5 court: XAUUSD_ML_DataExport_V3_FINAL_NO_MACRO.mq5 avec InpDaysBack > 0
+  -> XAUUSD_ML_Data_V3_FINAL_UPDATE.csv (barres clôturées des N derniers jours)
+- Seules les lignes postérieures à la dernière barre stockée sont ajoutées
+- Macro (DXY/VIX/US10Y/SP500/NASDAQ/DOW): même merge par date + forward fill
+  depuis les dernières valeurs stockées
+- Labels de la queue recalculés (mq5_labels): une barre récente n'a pas encore
+  ses FORWARD_BARS barres futures, son label est provisoire
+- Seules les partitions des années touchées sont réécrites (dataset_store)
+
+NOTE:
+- Les indicateurs (RSI, MACD, ATR, ADX...) viennent de MT5 et ne dépendent que
+  du passé: les lignes déjà stockées ne changent pas, seuls les labels bougent
+- Un label résolu (TP, SL ou BE touché) est définitif; seuls les timeouts (-1)
+  des FORWARD_BARS dernières lignes stockées sont recalculés
+- Rafraîchir d'abord ALL_MACRO_INDICATORS.csv (export_macro_indicators_yahoo.py)
+- Les features avancées de V6 sont recalculées au chargement (rien à stocker)
+"""
+
+import pandas as pd
+import numpy as np
+import os
+from labeling_engine import mq5_labels
+from dataset_store import read_dataset, append_dataset, dataset_exists
+
+print("="*80)
+print("MISE A JOUR INCREMENTALE MT5 + MACRO")
+print("="*80)
+
+# ==================== CONFIGURATION ====================
+BASE_PATH = r"C:\Users\lbye3\AppData\Roaming\MetaQuotes\Terminal\Common\Files"
+UPDATE_FILE = os.path.join(BASE_PATH, "XAUUSD_ML_Data_V3_FINAL_UPDATE.csv")
+DATASET_FILE = os.path.join(BASE_PATH, "XAUUSD_ML_Data_V3_FINAL_WITH_MACRO_20Y.csv")
+MACRO_FILE = r"C:\Users\lbye3\algo-poseidon\algo-poseidon\macro_data\ALL_MACRO_INDICATORS.csv"
+
+MACRO_COLS = ['DXY', 'VIX', 'US10Y', 'SP500', 'NASDAQ', 'DOW']
+
+# Mêmes paramètres que l'export MQ5
+SL_ATR_MULTIPLIER = 1.5      # InpSL_ATR_Multiplier
+TP_ATR_MULTIPLIER = 4.0      # InpTP_ATR_Multiplier
+USE_BREAK_EVEN = True        # InpUseBreakEven
+FORWARD_BARS = 180           # InpForwardBars
+FUTURE_BARS = 24             # InpFutureBars
+DIGITS = 2                   # Décimales des prix XAUUSD dans le CSV
+
+print(f"\nUpdate MT5: {UPDATE_FILE}")
+print(f"Dataset: {DATASET_FILE}")
+print(f"Macro: {MACRO_FILE}")
+
+if not dataset_exists(DATASET_FILE):
+    print(f"\nERREUR: Dataset introuvable!")
+    print(f"Lancer d'abord l'export complet + merge_mt5_with_macro.py")
+    exit(1)
+
+if not os.path.exists(UPDATE_FILE):
+    print(f"\nERREUR: Fichier update introuvable!")
+    print(f"Executer le script MQ5 avec InpDaysBack > 0 (ex: 30)")
+    exit(1)
+
+if not os.path.exists(MACRO_FILE):
+    print(f"\nERREUR: Fichier macro introuvable!")
+    print(f"Verifie que export_macro_indicators_yahoo.py a bien fonctionne")
+    exit(1)
+
+# ==================== DERNIERE BARRE STOCKEE ====================
+print("\n" + "="*80)
+print("DATASET EXISTANT")
+print("="*80)
+
+# Lecture de la seule colonne time, puis des deux dernières années (queue)
+last_time = read_dataset(DATASET_FILE, columns=['time'])['time'].max()
+df_tail = read_dataset(DATASET_FILE, years=[last_time.year - 1, last_time.year])
+df_tail = df_tail.tail(FORWARD_BARS).reset_index(drop=True)
+
+print(f"\nDerniere barre stockee: {last_time}")
+
+# ==================== NOUVELLES BARRES ====================
+print("\n" + "="*80)
+print("NOUVELLES BARRES MT5")
+print("="*80)
+
+df_update = pd.read_csv(UPDATE_FILE)
+df_update['time'] = pd.to_datetime(df_update['time'])
+df_update = df_update.sort_values('time').reset_index(drop=True)
+
+print(f"\nLignes update: {len(df_update)}")
+print(f"Periode: {df_update['time'].min()} a {df_update['time'].max()}")
+
+if df_update['time'].min() > last_time:
+    print(f"\nERREUR: Trou entre le dataset et l'update!")
+    print(f"Augmenter InpDaysBack pour couvrir depuis {last_time}")
+    exit(1)
+
+df_new = df_update[df_update['time'] > last_time].reset_index(drop=True)
+if len(df_new) == 0:
+    print(f"\nOK: Aucune nouvelle barre, dataset deja a jour")
+    exit(0)
+
+missing_cols = [c for c in df_tail.columns if c not in df_new.columns and c not in MACRO_COLS]
+if missing_cols:
+    print(f"\nERREUR: Colonnes absentes de l'update: {missing_cols}")
+    exit(1)
+
+print(f"OK: {len(df_new)} nouvelles barres ({df_new['time'].min()} -> {df_new['time'].max()})")
+
+# ==================== MERGE MACRO ====================
+print("\n" + "="*80)
+print("MERGE MACRO")
+print("="*80)
+
+df_macro = pd.read_csv(MACRO_FILE)
+df_macro['date'] = pd.to_datetime(df_macro['Date']).dt.tz_localize(None).dt.normalize()
+df_macro_clean = df_macro[['date'] + MACRO_COLS].drop_duplicates(subset=['date'], keep='last')
+
+df_new['date'] = df_new['time'].dt.normalize()
+df_new = df_new.drop(columns=[c for c in MACRO_COLS if c in df_new.columns])
+df_new = df_new.merge(df_macro_clean, on='date', how='left').drop(columns=['date'])
+df_new = df_new[df_tail.columns]
+
+# Forward fill depuis les dernières valeurs stockées (weekends, jours fériés)
+df_work = pd.concat([df_tail, df_new], ignore_index=True)
+df_work[MACRO_COLS] = df_work[MACRO_COLS].ffill()
+
+print(f"\nValeurs macro manquantes (nouvelles barres):")
+print(df_work[MACRO_COLS].iloc[len(df_tail):].isnull().sum())
+
+# ==================== LABELS DE LA QUEUE ====================
+print("\n" + "="*80)
+print("RECALCUL DES LABELS (QUEUE)")
+print("="*80)
+
+target_binary, target_pct_change, sl_price, tp_price = mq5_labels(
+    df_work['high'].values, df_work['low'].values, df_work['close'].values,
+    df_work['atr14'].values, df_work['signal_score'].values,
+    sl_multiplier=SL_ATR_MULTIPLIER,
+    tp_multiplier=TP_ATR_MULTIPLIER,
+    use_break_even=USE_BREAK_EVEN,
+    forward_bars=FORWARD_BARS,
+    future_bars=FUTURE_BARS
+)
+
+# Lignes stockées non résolues (-1) + toutes les nouvelles lignes
+is_new = np.arange(len(df_work)) >= len(df_tail)
+relabel = is_new | (df_work['target_binary'].values == -1)
+
+old_target = df_work['target_binary'].values.copy()
+df_work.loc[relabel, 'target_binary'] = target_binary[relabel]
+df_work.loc[relabel, 'target_pct_change'] = np.round(target_pct_change[relabel], 4)
+df_work.loc[relabel, 'sl_price'] = np.round(sl_price[relabel], DIGITS)
+df_work.loc[relabel, 'tp_price'] = np.round(tp_price[relabel], DIGITS)
+
+changed = relabel & ~is_new & (df_work['target_binary'].values != old_target)
+print(f"\nLignes stockees relabellisees: {(relabel & ~is_new).sum()} ({changed.sum()} resolues depuis)")
+print(f"Nouvelles lignes labellisees: {is_new.sum()}")
+print(f"  WIN:  {(df_work.loc[is_new, 'target_binary'] == 1).sum()}")
+print(f"  LOSS: {(df_work.loc[is_new, 'target_binary'] == 0).sum()}")
+print(f"  En cours / timeout (-1): {(df_work.loc[is_new, 'target_binary'] == -1).sum()}")
+
+# ==================== SAUVEGARDE ====================
+print("\n" + "="*80)
+print("SAUVEGARDE")
+print("="*80)
+
+n_rows = append_dataset(df_work[relabel], DATASET_FILE)
+
+print(f"\nOK: {relabel.sum()} lignes ecrites (annees {sorted(int(y) for y in df_work.loc[relabel, 'time'].dt.year.unique())})")
+print(f"Dataset: {n_rows} lignes, jusqu'a {df_work['time'].max()}")
+
+print("\n" + "="*80)
+print("MISE A JOUR TERMINEE")
+print("="*80)
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+Serveur d'inférence local pour l'EA MT5 (modèle résident en mémoire)
+Version 1.0 - 2026-10-18
+
+OBJECTIF:
+- Poseidon final.mq5 ne peut pas appeler les modèles Python; recharger
+  xauusd_ensemble_v6_OPTIMIZED_model.pkl à chaque requête coûterait des secondes
+- Processus long: ensemble compilé (compiled_ensemble) + état des features
+  (streaming_features.V6FeatureStream) chargés une seule fois
+- Une barre H1 clôturée -> probabilité calibrée + décision au threshold
+- Histogramme des latences de requête (p50 / p99) consultable en direct;
+  p99 mesuré au démarrage sur l'historique rejoué (measure_latency, cible
+  LATENCY_TARGET_US)
+
+PROTOCOLE (TCP 127.0.0.1, une ligne JSON par requête / réponse, UTF-8):
+- {"op": "predict", "bar": {"time": "...", "open": ..., "high": ..., "low": ...,
+   "close": ..., "volume": ..., <indicateurs de base V6>, "DXY": ..., "VIX": ...}}
+  -> {"time": "...", "proba": 0.61, "signal": 1, "threshold": 0.58, "latency_us": 240}
+- {"op": "stats"} -> compteurs et histogramme des latences
+- {"op": "ping"} -> {"ok": true}
+- Erreur -> {"error": "..."} (la connexion reste ouverte)
+Côté MQL5: SocketCreate / SocketConnect / SocketSend / SocketRead sur le port.
+
+NOTE:
+- La barre contient les colonnes de base du modèle (OHLCV, indicateurs que l'EA
+  calcule déjà, macro); les features avancées V6 sont calculées par le flux
+- Une barre déjà vue (même time) renvoie la réponse précédente sans faire
+  avancer l'état du flux (renvois de l'EA sur plusieurs ticks)
+- Chauffe: l'historique récent est rejoué dans le flux au démarrage (warm_up)
+- Requêtes traitées dans l'ordre (un seul thread): l'état du flux est séquentiel
+- Par requête: ligne de features réutilisée (positions précalculées) et
+  CompiledEnsemble.predict_row, sans DataFrame ni dict intermédiaire
+- Objets chargés gelés (gc.freeze) avant de servir: le ramasse-miettes ne
+  reparcourt plus le modèle ni l'historique (queue de latence)
+"""
+
+import gc
+import json
+import socket
+import socketserver
+import time
+from collections import deque
+import numpy as np
+from streaming_features import V6FeatureStream, replay
+
+# Bornes des classes de l'histogramme (microsecondes)
+LATENCY_BUCKETS_US = (50, 100, 200, 300, 500, 750, 1000, 2000, 5000, 10000, 50000)
+
+# Latence visée par barre (p99, microsecondes)
+LATENCY_TARGET_US = 1000
+
+
+class LatencyHistogram:
+    """Histogramme des latences + fenêtre des dernières mesures (quantiles)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_US, window=10000):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.recent = deque(maxlen=window)
+        self.total = 0
+
+    def add(self, latency_us):
+        k = int(np.searchsorted(self.buckets, latency_us, side='left'))
+        self.counts[k] += 1
+        self.recent.append(latency_us)
+        self.total += 1
+
+    def quantile(self, q):
+        """Quantile sur la fenêtre récente (NaN si vide)."""
+        return float(np.percentile(self.recent, q * 100)) if self.recent else float('nan')
+
+    def summary(self):
+        labels = [f"<={b}us" for b in self.buckets] + [f">{self.buckets[-1]}us"]
+        return {
+            'count': self.total,
+            'p50_us': self.quantile(0.50),
+            'p99_us': self.quantile(0.99),
+            'max_us': max(self.recent) if self.recent else float('nan'),
+            'histogram': dict(zip(labels, self.counts)),
+        }
+
+    def format(self):
+        """Histogramme texte (console du serveur)."""
+        s = self.summary()
+        lines = [f"Latence: {s['count']} requêtes | p50 {s['p50_us']:.0f} us | "
+                 f"p99 {s['p99_us']:.0f} us | max {s['max_us']:.0f} us"]
+        peak = max(self.counts) or 1
+        for label, count in s['histogram'].items():
+            lines.append(f"   {label:>10} {count:>8} {'#' * int(40 * count / peak)}")
+        return "\n".join(lines)
+
+
+class InferenceService:
+    """
+    Modèle + état des features résidents; predict(bar) pour chaque barre clôturée.
+
+    Args:
+        compiled: CompiledEnsemble (load_model(...)['compiled'] ou compiled_ensemble.load_compiled)
+        threshold: seuil de décision (défaut: threshold du modèle)
+    """
+
+    def __init__(self, compiled, threshold=None):
+        self.compiled = compiled
+        self.threshold = compiled.threshold if threshold is None else threshold
+        self.stream = V6FeatureStream()
+        self.stream_features = set(V6FeatureStream.FEATURES) & set(compiled.features)
+        self.base_features = [f for f in compiled.features if f not in self.stream_features]
+        self.required = list(dict.fromkeys(self.base_features + ['high', 'low']))
+        self._required = frozenset(self.required)
+        # Ligne réutilisée à chaque barre: positions des features de base / du flux
+        self._row = np.zeros(len(compiled.features))
+        self._base_pos = np.array([j for j, f in enumerate(compiled.features) if f not in self.stream_features],
+                                  dtype=np.intp)
+        self._stream_names = [f for f in compiled.features if f in self.stream_features]
+        self._stream_pos = np.array([compiled.features.index(f) for f in self._stream_names], dtype=np.intp)
+        self.latency = LatencyHistogram()
+        self.last_time = None
+        self.last_response = None
+
+    def warm_up(self, history):
+        """Rejoue l'historique récent (DataFrame des barres) dans le flux de features."""
+        if len(history):
+            replay(self.stream, history)
+            self.last_time = str(history['time'].iloc[-1]) if 'time' in history else None
+        return len(history)
+
+    def predict(self, bar):
+        """
+        Probabilité calibrée et décision pour une barre clôturée.
+
+        Args:
+            bar: dict des colonnes de base (+ high / low, time)
+
+        Returns:
+            dict (time, proba, signal, threshold)
+        """
+        bar_time = bar.get('time')
+        if bar_time is not None and bar_time == self.last_time and self.last_response is not None:
+            return self.last_response
+
+        if not self._required <= bar.keys():
+            raise KeyError(f"Colonnes manquantes: {[f for f in self.required if f not in bar]}")
+
+        row = self._row
+        row[self._base_pos] = np.fromiter((bar[f] for f in self.base_features), dtype=np.float64,
+                                          count=len(self.base_features))
+        advanced = self.stream.update(bar)
+        row[self._stream_pos] = np.fromiter((advanced[f] for f in self._stream_names), dtype=np.float64,
+                                            count=len(self._stream_names))
+        proba = self.compiled.predict_row(row)
+
+        self.last_time = bar_time
+        self.last_response = {'time': bar_time, 'proba': proba,
+                              'signal': int(proba >= self.threshold), 'threshold': self.threshold}
+        return self.last_response
+
+    def handle(self, request):
+        """Traite une requête décodée; mesure la latence des prédictions."""
+        op = request.get('op', 'predict')
+        if op == 'ping':
+            return {'ok': True}
+        if op == 'stats':
+            return self.latency.summary()
+        if op != 'predict':
+            raise ValueError(f"Opération inconnue: {op}")
+
+        start = time.perf_counter()
+        response = dict(self.predict(request['bar']))
+        latency_us = (time.perf_counter() - start) * 1e6
+        self.latency.add(latency_us)
+        response['latency_us'] = round(latency_us, 1)
+        return response
+
+
+def measure_latency(compiled, history, n_bars=1000, threshold=None):
+    """
+    Latence mesurée de bout en bout (handle) sur un service jetable.
+
+    Args:
+        compiled: CompiledEnsemble
+        history: DataFrame des barres (time + colonnes de base), chronologique
+        n_bars: dernières barres rejouées comme requêtes (le reste chauffe le flux)
+        threshold: seuil de décision (défaut: threshold du modèle)
+
+    Returns:
+        dict LatencyHistogram.summary() (count, p50_us, p99_us, max_us, histogram)
+    """
+    service = InferenceService(compiled, threshold=threshold)
+    service.warm_up(history.iloc[:-n_bars])
+    for bar in history.iloc[-n_bars:].to_dict('records'):
+        bar['time'] = str(bar['time'])
+        service.handle({'op': 'predict', 'bar': bar})
+    return service.latency.summary()
+
+
+class _LineHandler(socketserver.StreamRequestHandler):
+    """Une connexion EA: lignes JSON jusqu'à fermeture."""
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle(self):
+        service = self.server.service
+        for line in self.rfile:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                response = service.handle(json.loads(line))
+            except Exception as e:
+                response = {'error': f"{type(e).__name__}: {e}"}
+            self.wfile.write((json.dumps(response) + "\n").encode('utf-8'))
+            self.wfile.flush()
+            self.server.report_stats()
+
+
+class InferenceServer(socketserver.TCPServer):
+    """Serveur TCP localhost (requêtes traitées séquentiellement)."""
+
+    allow_reuse_address = True
+
+    def __init__(self, service, host='127.0.0.1', port=5555, stats_every=3600):
+        self.service = service
+        self.stats_every = stats_every
+        self.last_stats = time.monotonic()
+        super().__init__((host, port), _LineHandler)
+
+    def report_stats(self):
+        """Affiche l'histogramme des latences toutes les stats_every secondes."""
+        if time.monotonic() - self.last_stats >= self.stats_every:
+            print(self.service.latency.format())
+            self.last_stats = time.monotonic()
+
+
+def serve(service, host='127.0.0.1', port=5555, stats_every=3600):
+    """
+    Lance le serveur (bloquant, CTRL+C pour arrêter).
+
+    Args:
+        service: InferenceService chauffé
+        stats_every: secondes entre deux affichages de l'histogramme des latences
+    """
+    with InferenceServer(service, host, port, stats_every) as server:
+        gc.collect()
+        gc.freeze()
+        print(f"Serveur d'inférence en écoute sur {host}:{port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\nArrêt du serveur")
+        print(service.latency.format())
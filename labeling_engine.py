@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""
+Moteur de labellisation vectorisé TP/SL (first-touch)
+Version 1.0 - 2026-10-18
+
+OBJECTIF:
+- Remplacer les boucles iterrows() de recalculate_target (O(N²))
+- Résoudre la sortie de TOUS les trades en une seule passe sur tableaux NumPy
+- Même sémantique que les scripts: barres i+1 .. i+max_bars, SL testé avant TP
+- Break Even optionnel et réplique exacte de SimulateTradeV2 (export MQ5 V3)
+
+Convention des résultats:
+    WIN = 1, LOSS = 0, TIMEOUT = -1 (ni TP ni SL touché dans l'horizon)
+"""
+
+import numpy as np
+
+WIN = 1
+LOSS = 0
+TIMEOUT = -1
+
+
+def resolve_exits(high, low, entry_idx, direction, sl_price, tp_price, max_bars,
+                  be_trigger=None, be_stop=None):
+    """
+    Cherche la première barre qui touche le SL ou le TP pour chaque trade.
+
+    Les trades sont avancés ensemble barre par barre (offset k = 1..max_bars):
+    chaque itération est une opération vectorisée sur les trades encore ouverts,
+    donc le coût total est O(N × durée moyenne) au lieu de O(N²) en Python.
+
+    Args:
+        high, low: prix des barres (tableaux de longueur n_bars)
+        entry_idx: position de la barre d'entrée de chaque trade
+        direction: +1 BUY, -1 SELL, 0 = pas de trade (reste TIMEOUT)
+        sl_price, tp_price: niveaux SL/TP de chaque trade
+        max_bars: nombre maximum de barres futures à examiner
+        be_trigger: niveau de déclenchement du Break Even (None = pas de BE)
+        be_stop: nouveau SL une fois le BE activé (prix d'entrée)
+
+    Break Even (comme le MQ5 et la V2): sur chaque barre, le BE est testé
+    AVANT le SL, puis le SL (éventuellement déplacé) avant le TP.
+
+    Returns:
+        outcome (int8): WIN / LOSS / TIMEOUT par trade
+                        (LOSS = stop touché, y compris le stop BE)
+        bars_to_exit (int32): barres jusqu'à la sortie (barres disponibles si TIMEOUT)
+        be_activated (bool): BE activé avant la sortie
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    entry_idx = np.asarray(entry_idx, dtype=np.int64)
+    direction = np.asarray(direction)
+    sl_price = np.asarray(sl_price, dtype=np.float64)
+    tp_price = np.asarray(tp_price, dtype=np.float64)
+
+    n_bars = len(high)
+    n_trades = len(entry_idx)
+
+    outcome = np.full(n_trades, TIMEOUT, dtype=np.int8)
+    bars_to_exit = np.minimum(max_bars, n_bars - 1 - entry_idx).clip(min=0).astype(np.int32)
+    be_activated = np.zeros(n_trades, dtype=bool)
+
+    # Stop courant de chaque trade (déplacé au BE le cas échéant)
+    stop = sl_price.copy()
+    use_be = be_trigger is not None
+    if use_be:
+        be_trigger = np.asarray(be_trigger, dtype=np.float64)
+        be_stop = np.asarray(be_stop, dtype=np.float64)
+
+    # Trades encore ouverts (indices dans les tableaux par trade)
+    active = np.flatnonzero(direction != 0)
+
+    for k in range(1, max_bars + 1):
+        # Plus de barre future disponible -> TIMEOUT
+        active = active[entry_idx[active] + k < n_bars]
+        if active.size == 0:
+            break
+
+        bar = entry_idx[active] + k
+        h = high[bar]
+        l = low[bar]
+        is_buy = direction[active] > 0
+
+        if use_be:
+            trigger = ~be_activated[active] & np.where(is_buy, h >= be_trigger[active],
+                                                       l <= be_trigger[active])
+            if trigger.any():
+                moved = active[trigger]
+                stop[moved] = be_stop[moved]
+                be_activated[moved] = True
+
+        # Même ordre que les boucles d'origine: SL d'abord, puis TP
+        hit_sl = np.where(is_buy, l <= stop[active], h >= stop[active])
+        hit_tp = np.where(is_buy, h >= tp_price[active], l <= tp_price[active])
+        done = hit_sl | hit_tp
+
+        if done.any():
+            closed = active[done]
+            outcome[closed] = np.where(hit_sl[done], LOSS, WIN)
+            bars_to_exit[closed] = k
+            active = active[~done]
+
+    return outcome, bars_to_exit, be_activated
+
+
+def first_touch_labels(high, low, close, sl_price, tp_price, direction, max_bars=240):
+    """
+    Labellise chaque barre comme une entrée potentielle (entrée au close).
+
+    Équivalent vectorisé de recalculate_target(row, df_full) de la V4:
+    les barres sans direction (signal_score entre -2 et 2) restent TIMEOUT.
+
+    Returns:
+        outcome (int8): WIN / LOSS / TIMEOUT par barre
+        bars_to_exit (int32): barres jusqu'à la sortie
+        exit_price (float64): TP, SL, ou close de la dernière barre si TIMEOUT
+                              (NaN si aucune barre future)
+    """
+    close = np.asarray(close, dtype=np.float64)
+    sl_price = np.asarray(sl_price, dtype=np.float64)
+    tp_price = np.asarray(tp_price, dtype=np.float64)
+    entry_idx = np.arange(len(close))
+
+    outcome, bars_to_exit, _ = resolve_exits(high, low, entry_idx, direction,
+                                             sl_price, tp_price, max_bars)
+
+    exit_price = np.where(outcome == WIN, tp_price, sl_price)
+    timeout = outcome == TIMEOUT
+    exit_price[timeout] = np.where(bars_to_exit[timeout] > 0,
+                                   close[entry_idx[timeout] + bars_to_exit[timeout]],
+                                   np.nan)
+
+    return outcome, bars_to_exit, exit_price
+
+
+def mq5_labels(high, low, close, atr, signal_score, sl_multiplier=1.5, tp_multiplier=4.0,
+               use_break_even=True, forward_bars=180, future_bars=24, timeout_policy='ignore'):
+    """
+    Réplique SimulateTradeV2 de XAUUSD_ML_DataExport_V3_FINAL_NO_MACRO.mq5.
+
+    Mêmes paramètres que l'export (InpSL_ATR_Multiplier, InpTP_ATR_Multiplier,
+    InpUseBreakEven, InpForwardBars, InpFutureBars) et mêmes opérations
+    flottantes, donc labels identiques au bit près à partir des mêmes prix/ATR.
+    Attention: le CSV arrondit atr14 à `digits` décimales, relabelliser depuis
+    le CSV peut donc différer sur les touches à moins d'un tick du niveau.
+
+    timeout_policy (ni TP ni SL dans forward_bars):
+        'ignore': target_binary = -1 (comportement MQ5)
+        'close':  WIN si le close de la dernière barre examinée est favorable, sinon LOSS
+
+    Les barres en fin d'historique (moins de forward_bars barres futures) sont
+    évaluées sur les barres disponibles; le MQ5 ne les exporte pas.
+
+    Returns:
+        target_binary (int8), target_pct_change, sl_price, tp_price (float64)
+    """
+    close = np.asarray(close, dtype=np.float64)
+    atr = np.asarray(atr, dtype=np.float64)
+    signal_score = np.asarray(signal_score)
+    n_bars = len(close)
+
+    # Seulement si signal fort (score >= 2 ou <= -2) - comme Poseidon
+    has_signal = (signal_score >= 2) | (signal_score <= -2)
+    direction = np.where(signal_score >= 2, 1, -1) * has_signal
+
+    entry = close
+    sl_distance = atr * sl_multiplier
+    tp_distance = atr * tp_multiplier
+    sl = np.where(direction > 0, entry - sl_distance, entry + sl_distance)
+    tp = np.where(direction > 0, entry + tp_distance, entry - tp_distance)
+    be_level = np.where(direction > 0, entry + sl_distance, entry - sl_distance)
+
+    outcome, bars_to_exit, be_activated = resolve_exits(
+        high, low, np.arange(n_bars), direction, sl, tp, forward_bars,
+        be_trigger=be_level if use_break_even else None, be_stop=entry
+    )
+
+    target_binary = np.full(n_bars, TIMEOUT, dtype=np.int8)
+    target_pct_change = np.zeros(n_bars, dtype=np.float64)
+
+    stopped = outcome == LOSS
+    target_binary[stopped] = np.where(be_activated[stopped], WIN, LOSS)
+    target_pct_change[stopped] = np.where(be_activated[stopped], 0.0,
+                                          -100.0 * sl_distance[stopped] / entry[stopped])
+
+    won = outcome == WIN
+    target_binary[won] = WIN
+    target_pct_change[won] = 100.0 * tp_distance[won] / entry[won]
+
+    # Ni TP ni SL touché
+    timeout = (outcome == TIMEOUT) & has_signal
+    idx = np.flatnonzero(timeout)
+    future_close = close[np.minimum(idx + future_bars, n_bars - 1)]
+    target_pct_change[idx] = 100.0 * (future_close - entry[idx]) / entry[idx]
+
+    if timeout_policy == 'close':
+        last_close = close[idx + bars_to_exit[idx]]
+        favorable = (last_close - entry[idx]) * direction[idx] > 0
+        target_binary[idx] = np.where(favorable, WIN, LOSS)
+    elif timeout_policy != 'ignore':
+        raise ValueError(f"timeout_policy inconnue: {timeout_policy}")
+
+    # Pas de signal: mêmes valeurs que l'export
+    sl = np.where(has_signal, sl, 0.0)
+    tp = np.where(has_signal, tp, 0.0)
+
+    return target_binary, target_pct_change, sl, tp
+
+
+def build_label_grid(high, low, close, atr, direction, sl_multipliers, tp_multipliers, max_bars=240):
+    """
+    Calcule target_binary pour toute une grille SL × TP (multiplicateurs ATR) en un seul passage.
+
+    Le scan des barres futures est partagé: à chaque offset k on teste les
+    S niveaux SL et les T niveaux TP de chaque trade ouvert (coût S + T par
+    barre au lieu de S × T relabellisations complètes). Pour une paire
+    (SL, TP), le premier touché l'emporte, SL prioritaire sur la même barre.
+
+    Returns:
+        labels (int8, n_barres × n_configs): WIN / LOSS / TIMEOUT
+        configs: liste des paires (sl_mult, tp_mult) dans l'ordre des colonnes
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    atr = np.asarray(atr, dtype=np.float64)
+    direction = np.asarray(direction)
+    sl_mult = np.asarray(sl_multipliers, dtype=np.float64)
+    tp_mult = np.asarray(tp_multipliers, dtype=np.float64)
+
+    n_bars = len(close)
+    never = max_bars + 1
+    is_buy = direction > 0
+
+    # Niveaux de prix par multiplicateur (même formule que recalculate_tpsl)
+    sl_dist = atr[:, None] * sl_mult[None, :]
+    tp_dist = atr[:, None] * tp_mult[None, :]
+    sl_level = np.where(is_buy[:, None], close[:, None] - sl_dist, close[:, None] + sl_dist)
+    tp_level = np.where(is_buy[:, None], close[:, None] + tp_dist, close[:, None] - tp_dist)
+
+    # Offset de la première barre qui touche chaque niveau (never = jamais)
+    first_sl = np.full((n_bars, len(sl_mult)), never, dtype=np.int32)
+    first_tp = np.full((n_bars, len(tp_mult)), never, dtype=np.int32)
+
+    active = np.flatnonzero(direction != 0)
+
+    for k in range(1, max_bars + 1):
+        active = active[active + k < n_bars]
+        if active.size == 0:
+            break
+
+        bar = active + k
+        h = high[bar][:, None]
+        l = low[bar][:, None]
+        buy = is_buy[active][:, None]
+
+        hit_sl = np.where(buy, l <= sl_level[active], h >= sl_level[active])
+        hit_tp = np.where(buy, h >= tp_level[active], l <= tp_level[active])
+
+        sl_k = first_sl[active]
+        tp_k = first_tp[active]
+        sl_k[hit_sl & (sl_k == never)] = k
+        tp_k[hit_tp & (tp_k == never)] = k
+        first_sl[active] = sl_k
+        first_tp[active] = tp_k
+
+        # Toutes les paires sont résolues dès que tous les SL ou tous les TP sont touchés
+        resolved = (sl_k < never).all(axis=1) | (tp_k < never).all(axis=1)
+        active = active[~resolved]
+
+    configs = [(float(s), float(t)) for s in sl_mult for t in tp_mult]
+    labels = np.empty((n_bars, len(configs)), dtype=np.int8)
+
+    col = 0
+    for a in range(len(sl_mult)):
+        for b in range(len(tp_mult)):
+            sl_k = first_sl[:, a]
+            tp_k = first_tp[:, b]
+            labels[:, col] = np.where((sl_k == never) & (tp_k == never), TIMEOUT,
+                                      np.where(sl_k <= tp_k, LOSS, WIN))
+            col += 1
+
+    return labels, configs
+
+
+def label_grid_columns(configs):
+    """Noms de colonnes pour la grille: target_binary_sl1.5_tp6, ..."""
+    return [f"target_binary_sl{sl:g}_tp{tp:g}" for sl, tp in configs]
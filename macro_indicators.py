@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Indicateurs macro (Yahoo Finance) et merge avec l'export MT5
+Version 1.0 - 2026-10-18
+
+OBJECTIF:
+- Sortir le téléchargement de export_macro_indicators_yahoo.py et le merge de
+  merge_mt5_with_macro.py en fonctions DataFrame -> DataFrame
+- Les scripts et le pipeline (run_pipeline.py) partagent le même code; le
+  pipeline se passe les DataFrames en mémoire sans relire les CSV
+
+NOTE:
+- yfinance importé seulement au téléchargement
+- Merge par date (jour normalisé, sans timezone) + forward / backward fill
+"""
+
+import os
+import pandas as pd
+
+# Symboles Yahoo Finance
+MACRO_SYMBOLS = {
+    "DXY": "DX-Y.NYB",      # Dollar Index
+    "VIX": "^VIX",          # Volatilité
+    "US10Y": "^TNX",        # Taux 10 ans US (en %)
+    "SP500": "^GSPC",       # S&P 500
+    "NASDAQ": "^IXIC",      # NASDAQ Composite
+    "DOW": "^DJI"           # Dow Jones Industrial Average
+}
+MACRO_COLUMNS = list(MACRO_SYMBOLS)
+
+
+def download_macro(start, end, symbols=MACRO_SYMBOLS, output_dir=None, verbose=True):
+    """
+    Clôtures journalières des indicateurs macro, mergées et forward fill.
+
+    Args:
+        start, end: période ("YYYY-MM-DD")
+        symbols: nom -> symbole Yahoo
+        output_dir: dossier où écrire un CSV par indicateur (None: aucun)
+        verbose: afficher la progression
+
+    Returns:
+        DataFrame indexé par date (une colonne par indicateur), vide si rien téléchargé
+    """
+    import yfinance as yf
+
+    all_data = {}
+    for name, symbol in symbols.items():
+        if verbose:
+            print(f"\nTéléchargement {name} ({symbol})...")
+        try:
+            df = yf.Ticker(symbol).history(start=start, end=end, interval="1d")
+            if df.empty:
+                print(f"   ERREUR: Aucune donnée pour {name}")
+                continue
+
+            # Garder uniquement Close et renommer
+            df = df[['Close']].rename(columns={'Close': name})
+            if output_dir is not None:
+                df.to_csv(os.path.join(output_dir, f"{name}.csv"))
+            if verbose:
+                print(f"   OK: {len(df)} lignes téléchargées")
+                print(f"   Période: {df.index.min().date()} à {df.index.max().date()}")
+            all_data[name] = df
+        except Exception as e:
+            print(f"   ERREUR: {e}")
+
+    if not all_data:
+        return pd.DataFrame()
+
+    # Forward fill pour remplir les valeurs manquantes (jours non-ouvrés)
+    df_merged = pd.concat(all_data.values(), axis=1, join='outer').sort_index()
+    df_merged.index.name = 'Date'
+    return df_merged.ffill()
+
+
+def read_macro(path):
+    """Relit ALL_MACRO_INDICATORS.csv au format de download_macro (dates en UTC)."""
+    df = pd.read_csv(path, index_col='Date')
+    df.index = pd.to_datetime(df.index, utc=True)
+    return df
+
+
+def merge_macro(df_mt5, df_macro, columns=MACRO_COLUMNS, verbose=True):
+    """
+    Ajoute les indicateurs macro du jour à chaque barre MT5.
+
+    Args:
+        df_mt5: barres MT5 (colonne time)
+        df_macro: sortie de download_macro / read_macro (index Date)
+        columns: indicateurs à ajouter
+        verbose: afficher les valeurs manquantes avant / après fill
+
+    Returns:
+        DataFrame MT5 (toutes les lignes) + colonnes macro
+    """
+    columns = list(columns)
+    df_macro = df_macro.reset_index().rename(columns={'Date': 'date'})
+
+    # Normaliser les dates à minuit et retirer les timezones
+    df_macro['date'] = pd.to_datetime(df_macro['date'], utc=True).dt.tz_localize(None).dt.normalize()
+    df_mt5 = df_mt5.drop(columns=[c for c in columns if c in df_mt5.columns])
+    df_mt5['date'] = df_mt5['time'].dt.normalize()
+
+    # Supprimer les doublons de dates dans macro (garder la dernière valeur du jour)
+    df_macro_clean = df_macro[['date'] + list(columns)].drop_duplicates(subset=['date'], keep='last')
+
+    # Merge par date (left join pour garder toutes les lignes MT5)
+    df_merged = df_mt5.merge(df_macro_clean, on='date', how='left')
+    if verbose:
+        print(f"\nValeurs manquantes AVANT forward fill:")
+        print(df_merged[columns].isnull().sum())
+
+    # Forward fill (weekends, jours fériés) puis backward fill pour les premières lignes
+    df_merged[columns] = df_merged[columns].ffill().bfill()
+    if verbose:
+        print(f"\nValeurs manquantes APRES forward/backward fill:")
+        print(df_merged[columns].isnull().sum())
+
+    return df_merged.drop(columns=['date'])
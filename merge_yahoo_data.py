@@ -14,6 +14,7 @@ import numpy as np
 import yfinance as yf
 from datetime import datetime, timedelta
 import os
+from dataset_store import write_dataset
 
 print("=" * 80)
 print("🚀 ENRICHISSEMENT DONNÉES ML - XAUUSD + DXY/VIX/US10Y")
@@ -304,7 +305,7 @@ print("💾 EXPORT FICHIER FINAL")
 print("=" * 80)
 
 output_path = os.path.join(r"C:\Users\lbye3\AppData\Roaming\MetaQuotes\Terminal\Common\Files", OUTPUT_CSV)
-df_final.to_csv(output_path, index=False)
+write_dataset(df_final, output_path)
 
 print(f"✅ Fichier exporté: {output_path}")
 print(f"📊 Nombre de colonnes: {len(df_final.columns)}")
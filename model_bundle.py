@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+Format de modèle compact à chargement paresseux (remplace les pickles joblib)
+Version 1.0 - 2026-10-18
+
+OBJECTIF:
+- joblib.dump(model_data) mettait dans un seul blob les 5 modèles calibrés,
+  les DataFrames de résultats et les métadonnées: lire 'threshold' ou
+  'features' coûtait le dépickle complet
+- Bundle = dossier: en-tête JSON (features, threshold, poids, fenêtre
+  d'entraînement, config...) + un fichier par objet lourd (modèle, ensemble
+  compilé, DataFrame), chargé seulement quand on y accède
+- Blobs joblib non compressés -> tableaux NumPy mappés en mémoire (mmap_mode='r'):
+  arbres RF / ET et ensemble compilé sans copie au chargement
+
+Organisation: "xauusd_..._model.pkl" -> dossier "xauusd_..._model.bundle/"
+contenant "<clé>.joblib" pour chaque objet lourd et "header.json" (écrit en dernier).
+
+NOTE:
+- ModelBundle se lit comme le dict model_data (bundle['threshold'], 'lgbm' in bundle...)
+- load_model() lit le bundle s'il existe, sinon l'ancien .pkl (compatibilité)
+- Empreinte du bundle (header['fingerprint']): sha256 des blobs + en-tête,
+  utilisée par prediction_store
+"""
+
+import os
+import json
+import shutil
+import hashlib
+from datetime import datetime
+import numpy as np
+import joblib
+
+HEADER_FILE = "header.json"
+FORMAT_VERSION = 1
+
+
+def bundle_path(path):
+    """Dossier bundle associé à un chemin de modèle .pkl."""
+    return os.path.splitext(path)[0] + ".bundle"
+
+
+def bundle_exists(path):
+    """Bundle complet (en-tête écrit) pour ce chemin."""
+    return os.path.exists(os.path.join(bundle_path(path), HEADER_FILE))
+
+
+def _json_value(value):
+    """Valeur convertie en JSON natif (scalaires NumPy, dates...), TypeError sinon."""
+    if isinstance(value, (str, bool, int, float)) or value is None:
+        return value
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return [_json_value(v) for v in value]
+    if isinstance(value, dict) and all(isinstance(k, str) for k in value):
+        return {k: _json_value(v) for k, v in value.items()}
+    raise TypeError(type(value).__name__)
+
+
+def _sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def save_model(model_data, path):
+    """
+    Sauvegarde un model_data en bundle (remplace joblib.dump(model_data, path)).
+
+    Args:
+        model_data: dict du trainer
+        path: chemin .pkl de référence (le bundle est écrit à côté)
+
+    Returns:
+        dossier du bundle
+    """
+    directory = bundle_path(path)
+    tmp_dir = directory + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    meta, blobs = {}, {}
+    for key, value in model_data.items():
+        try:
+            meta[key] = _json_value(value)
+        except TypeError:
+            filename = f"{key}.joblib"
+            joblib.dump(value, os.path.join(tmp_dir, filename))
+            blobs[key] = {'file': filename, 'type': type(value).__name__,
+                          'bytes': os.path.getsize(os.path.join(tmp_dir, filename)),
+                          'sha256': _sha256(os.path.join(tmp_dir, filename))}
+
+    header = {'format_version': FORMAT_VERSION, 'keys': list(model_data), 'meta': meta, 'blobs': blobs}
+    header['fingerprint'] = hashlib.sha256(json.dumps(header, sort_keys=True).encode()).hexdigest()[:32]
+    with open(os.path.join(tmp_dir, HEADER_FILE), 'w', encoding='utf-8') as f:
+        json.dump(header, f, indent=2, ensure_ascii=False)
+
+    # Remplacement du bundle précédent seulement une fois le nouveau complet
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_dir, directory)
+    return directory
+
+
+class ModelBundle:
+    """
+    Bundle ouvert: en-tête lu, blobs chargés à la première lecture de leur clé.
+
+    Args:
+        directory: dossier du bundle
+        mmap: mapper les tableaux NumPy des blobs en mémoire (lecture seule)
+    """
+
+    def __init__(self, directory, mmap=True):
+        self.directory = directory
+        self.mmap_mode = 'r' if mmap else None
+        with open(os.path.join(directory, HEADER_FILE), encoding='utf-8') as f:
+            self.header = json.load(f)
+        self._loaded = {}
+
+    @property
+    def fingerprint(self):
+        return self.header['fingerprint']
+
+    @property
+    def meta(self):
+        return self.header['meta']
+
+    def keys(self):
+        return list(self.header['keys'])
+
+    def __contains__(self, key):
+        return key in self.header['keys']
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.header['keys'])
+
+    def __getitem__(self, key):
+        if key in self.header['meta']:
+            return self.header['meta'][key]
+        if key not in self.header['blobs']:
+            raise KeyError(key)
+        if key not in self._loaded:
+            path = os.path.join(self.directory, self.header['blobs'][key]['file'])
+            self._loaded[key] = joblib.load(path, mmap_mode=self.mmap_mode)
+        return self._loaded[key]
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def copy(self):
+        """model_data complet (charge tous les blobs)."""
+        return {key: self[key] for key in self.keys()}
+
+    def size_mb(self):
+        """Taille totale des blobs (Mo)."""
+        return sum(b['bytes'] for b in self.header['blobs'].values()) / 1024**2
+
+
+def model_exists(path):
+    """Modèle enregistré (bundle ou .pkl) présent."""
+    return bundle_exists(path) or os.path.exists(path)
+
+
+def load_model(path, mmap=True):
+    """
+    Ouvre un modèle: bundle s'il existe (paresseux), sinon joblib.load du .pkl.
+
+    Args:
+        path: chemin .pkl de référence (ou dossier .bundle)
+        mmap: mapper les tableaux des blobs en mémoire
+
+    Returns:
+        ModelBundle ou dict
+    """
+    if os.path.isdir(path) and os.path.exists(os.path.join(path, HEADER_FILE)):
+        return ModelBundle(path, mmap=mmap)
+    if bundle_exists(path):
+        return ModelBundle(bundle_path(path), mmap=mmap)
+    return joblib.load(path)
+
+
+def saved_fingerprint(path):
+    """Empreinte du modèle enregistré (bundle: en-tête, .pkl: contenu du fichier)."""
+    model = bundle_path(path) if bundle_exists(path) else path
+    if os.path.isdir(model):
+        return ModelBundle(model).fingerprint
+    return _sha256(model)[:32]
+
+
+def model_size_mb(path):
+    """Taille sur disque du modèle enregistré (Mo)."""
+    if bundle_exists(path):
+        directory = bundle_path(path)
+        return sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory)) / 1024**2
+    return os.path.getsize(path) / 1024**2
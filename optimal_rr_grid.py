@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Recherche du meilleur couple SL/TP (multiplicateurs ATR) - grille complète
+Version 1.0 - 2026-10-18
+
+OBJECTIF:
+- Labelliser toutes les combinaisons SL × TP en UN seul passage (build_label_grid)
+- Comparer Win Rate / Expectancy (en R) de chaque couple sans relabel + retrain
+- Remplace les relances de test_optimal_rr.py pour chaque couple SL/TP
+"""
+
+import pandas as pd
+import numpy as np
+import os
+from labeling_engine import build_label_grid, label_grid_columns, WIN, LOSS
+
+print("="*80)
+print("TEST RR OPTIMAL - GRILLE SL x TP")
+print("="*80)
+
+# ==================== CONFIGURATION ====================
+DATA_CSV = "XAUUSD_ML_Data_V2_ATR_20Y.csv"
+OUTPUT_CSV = "optimal_rr_grid_results.csv"
+
+SL_MULTIPLIERS = [1.0, 1.5, 2.0, 2.5]
+TP_MULTIPLIERS = [2.0, 3.0, 4.0, 5.0, 6.0, 8.0]
+MAX_BARS = 240           # Horizon (identique à la V4)
+MIN_TRADES = 100         # Minimum de trades pour un résultat significatif
+
+print(f"\nGrille: {len(SL_MULTIPLIERS)} SL x {len(TP_MULTIPLIERS)} TP = "
+      f"{len(SL_MULTIPLIERS) * len(TP_MULTIPLIERS)} configurations")
+print(f"Horizon: {MAX_BARS} barres")
+
+# ==================== CHARGEMENT ====================
+print("\n" + "="*80)
+print("CHARGEMENT DONNEES")
+print("="*80)
+
+base_path = r"C:\Users\lbye3\AppData\Roaming\MetaQuotes\Terminal\Common\Files"
+csv_path = os.path.join(base_path, DATA_CSV)
+
+if not os.path.exists(csv_path):
+    print(f"ERREUR: Fichier introuvable: {csv_path}")
+    exit(1)
+
+df = pd.read_csv(csv_path)
+df['time'] = pd.to_datetime(df['time'])
+df = df.sort_values('time').reset_index(drop=True)
+
+print(f"OK: {len(df)} lignes chargées")
+
+# ==================== LABELLISATION GRILLE ====================
+print("\n" + "="*80)
+print("LABELLISATION GRILLE (UN SEUL PASSAGE)")
+print("="*80)
+
+direction = np.where(df['signal_score'] >= 2, 1, np.where(df['signal_score'] <= -2, -1, 0))
+
+labels, configs = build_label_grid(
+    df['high'].values, df['low'].values, df['close'].values, df['atr14'].values,
+    direction, SL_MULTIPLIERS, TP_MULTIPLIERS, max_bars=MAX_BARS
+)
+
+print(f"OK: matrice {labels.shape[0]} barres x {labels.shape[1]} configs "
+      f"({labels.nbytes / (1024 * 1024):.1f} MB)")
+
+# ==================== RESULTATS ====================
+results = []
+for col, (sl_mult, tp_mult), name in zip(range(len(configs)), configs, label_grid_columns(configs)):
+    wins = int((labels[:, col] == WIN).sum())
+    losses = int((labels[:, col] == LOSS).sum())
+    n_trades = wins + losses
+
+    if n_trades == 0:
+        continue
+
+    rr = tp_mult / sl_mult
+    win_rate = wins / n_trades
+    expectancy_r = win_rate * rr - (1 - win_rate)
+
+    results.append({
+        'config': name,
+        'sl_mult': sl_mult,
+        'tp_mult': tp_mult,
+        'rr': rr,
+        'n_trades': n_trades,
+        'win_rate': win_rate,
+        'breakeven_wr': 1 / (1 + rr),
+        'expectancy_r': expectancy_r
+    })
+
+df_results = pd.DataFrame(results).sort_values('expectancy_r', ascending=False)
+df_valid = df_results[df_results['n_trades'] >= MIN_TRADES]
+
+print(f"\n{'SL':<6} {'TP':<6} {'RR':<6} {'Trades':<9} {'Win Rate':<10} {'BE WR':<9} {'Exp (R)':<8}")
+print("-" * 60)
+for _, row in df_valid.iterrows():
+    print(f"{row['sl_mult']:<6.1f} {row['tp_mult']:<6.1f} {row['rr']:<6.2f} {int(row['n_trades']):<9} "
+          f"{row['win_rate']*100:<9.2f}% {row['breakeven_wr']*100:<8.2f}% {row['expectancy_r']:+.3f}")
+
+if len(df_valid) > 0:
+    best = df_valid.iloc[0]
+    print(f"\nMEILLEUR COUPLE: SL {best['sl_mult']}xATR / TP {best['tp_mult']}xATR "
+          f"(RR {best['rr']:.2f}:1, Expectancy {best['expectancy_r']:+.3f}R)")
+
+output_path = os.path.join(base_path, OUTPUT_CSV)
+df_results.to_csv(output_path, index=False)
+print(f"\nOK: Résultats sauvegardés: {output_path}")
+
+print("\n" + "="*80)
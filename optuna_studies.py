@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+Études Optuna avec pruning, workers parallèles et reprise après interruption
+Version 1.0 - 2026-10-18
+
+OBJECTIF:
+- hyperparameter_tuning_optuna.py (200 trials), V5 (50) et V6 (30 par fenêtre)
+  tournaient sans pruner, en un seul processus et en mémoire
+- Pruning (median / hyperband) sur valeurs intermédiaires: AUC moyenne après
+  chaque fold, ou AUC validation toutes les N itérations LightGBM (holdout)
+- Stockage SQLite local: plusieurs processus workers partagent la même étude
+- Une étude interrompue (CTRL+C, crash) reprend là où elle s'était arrêtée:
+  seuls les trials manquants sont relancés
+
+NOTE:
+- Trials interrompus en cours d'exécution: détectés par heartbeat au redémarrage,
+  marqués FAIL puis relancés une fois (RetryFailedTrialCallback)
+- Empreinte des données (fingerprint): si elle change, l'étude existante est
+  supprimée et recommencée (les anciens scores ne sont plus comparables)
+- Workers = processus loky: l'objectif est envoyé par cloudpickle, chaque worker
+  reconstruit ses propres datasets binnés (binned_folds) au premier trial
+"""
+
+import os
+import hashlib
+import pandas as pd
+import optuna
+from optuna.storages import RDBStorage, RetryFailedTrialCallback
+from optuna.trial import TrialState
+from joblib import Parallel, delayed
+from feature_cache import data_fingerprint
+
+HEARTBEAT_INTERVAL = 60  # secondes
+GRACE_PERIOD = 180       # trial sans heartbeat depuis 3 min -> considéré interrompu
+
+FINISHED_STATES = (TrialState.COMPLETE, TrialState.PRUNED)
+
+
+def study_fingerprint(*frames):
+    """Empreinte des données d'une étude (DataFrames / Series: train, validation...)."""
+    h = hashlib.sha256()
+    for frame in frames:
+        if isinstance(frame, pd.Series):
+            frame = frame.to_frame()
+        h.update(data_fingerprint(frame).encode())
+    return h.hexdigest()
+
+
+def make_pruner(pruner='median', n_startup_trials=5, n_warmup_steps=0):
+    """
+    Pruner Optuna par nom.
+
+    Args:
+        pruner: 'median', 'hyperband' ou None (pas de pruning)
+        n_startup_trials: trials complets avant de commencer à pruner (median)
+        n_warmup_steps: étapes intermédiaires jamais prunées (median)
+    """
+    if pruner is None or pruner == 'none':
+        return optuna.pruners.NopPruner()
+    if pruner == 'median':
+        return optuna.pruners.MedianPruner(n_startup_trials=n_startup_trials,
+                                           n_warmup_steps=n_warmup_steps)
+    if pruner == 'hyperband':
+        return optuna.pruners.HyperbandPruner()
+    raise ValueError(f"Pruner inconnu: {pruner} (median, hyperband, none)")
+
+
+def sqlite_storage(storage_dir, study_name):
+    """Stockage SQLite de l'étude (un fichier par étude, partagé par les workers)."""
+    os.makedirs(storage_dir, exist_ok=True)
+    path = os.path.abspath(os.path.join(storage_dir, f"{study_name}.db"))
+    return RDBStorage(
+        url=f"sqlite:///{path}",
+        engine_kwargs={'connect_args': {'timeout': 60}},
+        heartbeat_interval=HEARTBEAT_INTERVAL,
+        grace_period=GRACE_PERIOD,
+        failed_trial_callback=RetryFailedTrialCallback(max_retry=1),
+    )
+
+
+def open_study(study_name, storage_dir, direction='maximize', pruner='median', seed=None,
+               fingerprint=None, **pruner_kwargs):
+    """
+    Crée l'étude ou la recharge depuis le stockage SQLite (reprise).
+
+    Args:
+        storage_dir: dossier des fichiers SQLite (None: étude en mémoire, sans reprise)
+        fingerprint: empreinte des données / de la config; étude recommencée si différente
+
+    Returns:
+        optuna.Study
+    """
+    storage = sqlite_storage(storage_dir, study_name) if storage_dir else None
+    study = optuna.create_study(study_name=study_name, storage=storage, direction=direction,
+                                pruner=make_pruner(pruner, **pruner_kwargs),
+                                sampler=optuna.samplers.TPESampler(seed=seed),
+                                load_if_exists=True)
+
+    if fingerprint is not None:
+        previous = study.user_attrs.get('fingerprint')
+        if previous is not None and previous != fingerprint:
+            print(f"Étude {study_name}: données modifiées, redémarrage")
+            optuna.delete_study(study_name=study_name, storage=storage)
+            return open_study(study_name, storage_dir, direction, pruner, seed,
+                              fingerprint, **pruner_kwargs)
+        study.set_user_attr('fingerprint', fingerprint)
+    return study
+
+
+def n_finished(study):
+    """Nombre de trials terminés (complets ou prunés)."""
+    return len(study.get_trials(deepcopy=False, states=FINISHED_STATES))
+
+
+def report(trial, value, step):
+    """Rapporte une valeur intermédiaire et lève TrialPruned si le pruner le demande."""
+    trial.report(value, step)
+    if trial.should_prune():
+        raise optuna.TrialPruned()
+
+
+def lgb_pruning_callback(trial, metric='auc', period=10):
+    """
+    Callback lgb.train: rapporte la métrique de validation toutes les `period`
+    itérations (step = itération) et interrompt le trial si pruné.
+
+    La métrique doit être calculée sur valid_sets (params 'metric') et orientée
+    dans le sens de l'étude (auc pour direction='maximize').
+    """
+    def _callback(env):
+        if (env.iteration + 1) % period != 0:
+            return
+        for _, name, value, _ in env.evaluation_result_list:
+            if name == metric:
+                report(trial, value, env.iteration + 1)
+                return
+    _callback.order = 30
+    return _callback
+
+
+def _optimize(objective, study_name, storage_dir, n_trials, direction, pruner, seed,
+              callbacks, show_progress_bar, pruner_kwargs):
+    """Exécute n_trials trials sur l'étude partagée (worker)."""
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    study = open_study(study_name, storage_dir, direction, pruner, seed, **pruner_kwargs)
+    study.optimize(objective, n_trials=n_trials, callbacks=callbacks,
+                   show_progress_bar=show_progress_bar)
+    return n_trials
+
+
+def run_study(objective, study_name, storage_dir, n_trials, n_workers=1, direction='maximize',
+              pruner='median', seed=42, fingerprint=None, callbacks=None,
+              show_progress_bar=False, **pruner_kwargs):
+    """
+    Lance (ou reprend) une étude jusqu'à n_trials trials terminés.
+
+    Args:
+        objective: fonction trial -> score (picklable si n_workers > 1)
+        study_name: nom de l'étude (et du fichier SQLite)
+        storage_dir: dossier des fichiers SQLite (None: en mémoire, un seul worker)
+        n_trials: nombre total de trials visé (complets + prunés, reprise incluse)
+        n_workers: processus workers en parallèle sur la même étude
+        direction: 'maximize' / 'minimize'
+        pruner: 'median', 'hyperband' ou None
+        seed: graine du sampler TPE (seed + k pour le worker k)
+        fingerprint: empreinte des données (étude recommencée si elle change)
+        callbacks: callbacks Optuna (exécutés dans chaque worker)
+        show_progress_bar: barre de progression (mode mono-processus seulement)
+
+    Returns:
+        optuna.Study rechargée avec tous les trials
+    """
+    study = open_study(study_name, storage_dir, direction, pruner, seed, fingerprint, **pruner_kwargs)
+
+    done = n_finished(study)
+    remaining = max(0, n_trials - done)
+    if done:
+        print(f"Étude {study_name}: reprise ({done}/{n_trials} trials déjà terminés)")
+    if remaining == 0:
+        return study
+
+    n_workers = max(1, min(n_workers, remaining)) if storage_dir else 1
+    if n_workers == 1:
+        study.optimize(objective, n_trials=remaining, callbacks=callbacks,
+                       show_progress_bar=show_progress_bar)
+        return study
+
+    # Répartition des trials restants entre workers (graines distinctes)
+    shares = [remaining // n_workers + (k < remaining % n_workers) for k in range(n_workers)]
+    print(f"Étude {study_name}: {remaining} trials sur {n_workers} workers")
+    Parallel(n_jobs=n_workers, backend='loky')(
+        delayed(_optimize)(objective, study_name, storage_dir, share, direction, pruner,
+                           None if seed is None else seed + k, callbacks, False, pruner_kwargs)
+        for k, share in enumerate(shares)
+    )
+
+    return open_study(study_name, storage_dir, direction, pruner, seed, **pruner_kwargs)
@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""
+Pipeline en graphe d'étapes (DAG) avec cache par étape
+Version 1.0 - 2026-10-18
+
+OBJECTIF:
+- export macro -> merge -> features -> entraînement -> calibration: une suite
+  de scripts lancés à la main, chacun relisant le CSV du précédent
+- Ici: chaque étape déclare ses entrées (étapes amont) et le type de sa sortie;
+  les DataFrames passent d'une étape à l'autre en mémoire
+- Étape ignorée si son code, ses paramètres, ses fichiers sources et le contenu
+  de ses entrées n'ont pas changé (sortie relue depuis le cache, seulement si
+  une étape aval doit tourner)
+- Branches indépendantes exécutées en parallèle (threads: pas de copie des DataFrames)
+
+Organisation du cache: <cache_dir>/<étape>/<clé>.(parquet|pkl|joblib) + <clé>.json
+(empreinte du contenu de la sortie, durée). Les `keep` dernières clés sont conservées.
+
+NOTE:
+- Clé d'une étape = code (func + modules de `code`) + params + sources
+  (taille / date des fichiers) + empreintes du CONTENU des entrées: une étape
+  amont recalculée avec le même résultat (ex: macro sans nouvelle journée)
+  n'invalide pas l'aval
+- Les étapes à effets de bord (écriture du store, du bundle) les refont
+  seulement quand elles tournent
+- Étapes sans cache (cache=False): toujours exécutées
+- run(report=RunReport): durée / CPU / mémoire de chaque étape exécutée
+"""
+
+import os
+import glob
+import json
+import time
+import hashlib
+import inspect
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import joblib
+import pandas as pd
+from feature_cache import data_fingerprint, code_fingerprint
+
+try:
+    import pyarrow  # noqa: F401
+    USE_PARQUET = True
+except ImportError:
+    USE_PARQUET = False
+
+
+class Stage:
+    """
+    Étape du pipeline: func(**entrées, **params) -> sortie de type `output`.
+
+    Args:
+        name: nom unique de l'étape
+        func: fonction de calcul
+        inputs: dict argument de func -> nom de l'étape amont
+        output: type attendu de la sortie (vérifié à l'exécution)
+        params: paramètres passés à func (entrent dans la clé)
+        sources: fichiers / dossiers lus par func (taille et date dans la clé)
+        code: fonctions / modules utilisés par func (leur code entre dans la clé)
+        cache: False = toujours exécutée
+    """
+
+    def __init__(self, name, func, inputs=None, output=pd.DataFrame, params=None, sources=(), code=(),
+                 cache=True):
+        self.name = name
+        self.func = func
+        self.inputs = dict(inputs or {})
+        self.output = output
+        self.params = dict(params or {})
+        self.sources = list(sources)
+        self.code = list(code)
+        self.cache = cache
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, inputs={list(self.inputs.values())}, output={self.output.__name__})"
+
+
+def content_fingerprint(value):
+    """Empreinte du contenu d'une sortie (DataFrame: hash pandas, sinon joblib.hash)."""
+    if isinstance(value, pd.DataFrame):
+        return data_fingerprint(value)
+    return joblib.hash(value)
+
+
+def source_fingerprint(paths):
+    """Empreinte (chemin, taille, date) des fichiers sources (dossiers parcourus)."""
+    entries = []
+    for path in paths:
+        files = sorted(glob.glob(os.path.join(path, '**', '*'), recursive=True)) if os.path.isdir(path) else [path]
+        for f in files:
+            if os.path.isfile(f):
+                st = os.stat(f)
+                entries.append((f, st.st_size, st.st_mtime_ns))
+            elif not os.path.exists(f):
+                entries.append((f, None, None))
+    return hashlib.sha256(repr(entries).encode()).hexdigest()
+
+
+class StageResult:
+    """Sortie d'une étape: empreinte connue, valeur chargée depuis le cache à la demande."""
+
+    def __init__(self, stage, key, fingerprint, status, seconds, value=None, path=None):
+        self.stage = stage
+        self.key = key
+        self.fingerprint = fingerprint
+        self.status = status
+        self.seconds = seconds
+        self._value = value
+        self._path = path
+        self._loaded = value is not None or path is None
+        self._lock = threading.Lock()
+
+    def value(self):
+        with self._lock:
+            if not self._loaded:
+                self._value = _read_artifact(self._path)
+                self._loaded = True
+            return self._value
+
+
+def _artifact_path(stage_dir, key, value_type):
+    if issubclass(value_type, pd.DataFrame):
+        return os.path.join(stage_dir, key + (".parquet" if USE_PARQUET else ".pkl"))
+    return os.path.join(stage_dir, key + ".joblib")
+
+
+def _read_artifact(path):
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path, engine='pyarrow')
+    if path.endswith(".pkl"):
+        return pd.read_pickle(path)
+    return joblib.load(path)
+
+
+def _write_artifact(value, path):
+    # Écriture atomique (pas d'entrée partielle si interruption)
+    tmp_path = path + ".tmp"
+    if path.endswith(".parquet"):
+        value.to_parquet(tmp_path, engine='pyarrow', compression='zstd')
+    elif path.endswith(".pkl"):
+        value.to_pickle(tmp_path)
+    else:
+        joblib.dump(value, tmp_path)
+    os.replace(tmp_path, path)
+
+
+class Pipeline:
+    """
+    DAG d'étapes avec cache disque par étape.
+
+    Args:
+        stages: liste de Stage
+        cache_dir: dossier du cache des sorties
+        max_workers: étapes indépendantes exécutées en même temps
+        keep: sorties conservées par étape (les plus récentes)
+    """
+
+    def __init__(self, stages, cache_dir, max_workers=2, keep=2):
+        self.stages = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Étape en double: {stage.name}")
+            self.stages[stage.name] = stage
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.keep = keep
+        self._check()
+
+    def _check(self):
+        """Entrées connues, types compatibles, pas de cycle."""
+        for stage in self.stages.values():
+            params = inspect.signature(stage.func).parameters
+            for arg, upstream in stage.inputs.items():
+                if upstream not in self.stages:
+                    raise ValueError(f"{stage.name}: étape amont inconnue '{upstream}'")
+                expected = params[arg].annotation if arg in params else inspect.Parameter.empty
+                produced = self.stages[upstream].output
+                if isinstance(expected, type) and not issubclass(produced, expected):
+                    raise TypeError(f"{stage.name}.{arg} attend {expected.__name__}, "
+                                    f"{upstream} produit {produced.__name__}")
+        self.order()
+
+    def order(self, targets=None):
+        """Ordre topologique des étapes nécessaires aux cibles (toutes par défaut)."""
+        order, state = [], {}
+
+        def visit(name):
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise ValueError(f"Cycle dans le pipeline: {name}")
+            state[name] = 'visiting'
+            for upstream in self.stages[name].inputs.values():
+                visit(upstream)
+            state[name] = 'done'
+            order.append(name)
+
+        for name in (targets or self.stages):
+            if name not in self.stages:
+                raise ValueError(f"Étape inconnue: {name}")
+            visit(name)
+        return order
+
+    def _key(self, stage, results):
+        h = hashlib.sha256()
+        h.update(code_fingerprint(stage.func, *stage.code).encode())
+        h.update(repr(sorted(stage.params.items())).encode())
+        h.update(source_fingerprint(stage.sources).encode())
+        for arg, upstream in sorted(stage.inputs.items()):
+            h.update(f"{arg}={results[upstream].fingerprint}".encode())
+        return h.hexdigest()[:32]
+
+    def _evict(self, stage_dir):
+        metas = sorted(glob.glob(os.path.join(stage_dir, "*.json")), key=os.path.getmtime, reverse=True)
+        for meta in metas[self.keep:]:
+            key = os.path.splitext(meta)[0]
+            for path in glob.glob(key + ".*"):
+                os.remove(path)
+
+    def _run_stage(self, stage, results, force, report=None):
+        key = self._key(stage, results)
+        stage_dir = os.path.join(self.cache_dir, stage.name)
+        path = _artifact_path(stage_dir, key, stage.output)
+        meta_path = os.path.join(stage_dir, key + ".json")
+
+        if stage.cache and not force and os.path.exists(meta_path) and os.path.exists(path):
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            os.utime(meta_path)  # conservée par _evict
+            return StageResult(stage.name, key, meta['fingerprint'], 'cache', 0.0, path=path)
+
+        # Entrées: valeurs en mémoire, ou relues du cache si l'étape amont a été ignorée
+        kwargs = {arg: results[upstream].value() for arg, upstream in stage.inputs.items()}
+        start = time.perf_counter()
+        if report is not None:
+            with report.span(stage.name):
+                value = stage.func(**kwargs, **stage.params)
+        else:
+            value = stage.func(**kwargs, **stage.params)
+        seconds = time.perf_counter() - start
+        if not isinstance(value, stage.output):
+            raise TypeError(f"{stage.name} doit produire {stage.output.__name__}, "
+                            f"pas {type(value).__name__}")
+
+        fingerprint = content_fingerprint(value)
+        if stage.cache:
+            os.makedirs(stage_dir, exist_ok=True)
+            _write_artifact(value, path)
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump({'stage': stage.name, 'fingerprint': fingerprint, 'seconds': seconds,
+                           'created': time.strftime('%Y-%m-%d %H:%M:%S')}, f, indent=2)
+            self._evict(stage_dir)
+        return StageResult(stage.name, key, fingerprint, 'exécutée', seconds, value=value)
+
+    def run(self, targets=None, force=(), verbose=True, report=None):
+        """
+        Exécute les étapes nécessaires aux cibles.
+
+        Args:
+            targets: étapes voulues (défaut: toutes)
+            force: étapes à recalculer même si leur clé est en cache
+            verbose: afficher le résumé
+            report: RunReport recevant un span par étape exécutée (optionnel)
+
+        Returns:
+            dict nom -> StageResult (value() pour la sortie)
+        """
+        pending = self.order(targets)
+        force = set(force)
+        results, running = {}, {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                # Lancer toutes les étapes dont les entrées sont prêtes
+                for name in list(pending):
+                    if all(upstream in results for upstream in self.stages[name].inputs.values()):
+                        pending.remove(name)
+                        running[executor.submit(self._run_stage, self.stages[name], results,
+                                                name in force, report)] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception:
+                        for other in running:
+                            other.cancel()
+                        raise
+
+        if verbose:
+            print(f"\n{'Étape':<16} {'Statut':<10} {'Durée':>9}  Clé")
+            for name in self.order(targets):
+                r = results[name]
+                print(f"{name:<16} {r.status:<10} {r.seconds:>8.1f}s  {r.key[:12]}")
+        return results
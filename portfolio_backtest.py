@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Backtest portefeuille avec les règles de risque de l'EA Poseidon
+Version 1.0 - 2026-10-18
+
+OBJECTIF:
+- Rejouer les trades du backtest (simulate_trades) avec les contraintes de
+  "Poseidon final.mq5" au lieu de prendre chaque signal indépendamment
+- InpMaxTradesPerDay, fenêtre de session, filtre des mois
+- Positions simultanées (limite optionnelle)
+- Réduction du risque après série de pertes (LossStreakTrigger / LossStreakFactor /
+  ReducedRiskMoney), comptée sur les trades clôturés des 30 derniers jours
+- Boucle d'état compilée avec numba si disponible (sinon Python pur)
+
+NOTE:
+- CountConsecutiveLosses du MQ5 parcourt aussi les deals d'entrée (profit = 0),
+  ce qui coupe la série; ici la série compte les trades clôturés perdants
+  consécutifs (comportement voulu par l'EA)
+- Le risque en % utilise la balance (trades clôturés), pas l'equity flottante
+"""
+
+import numpy as np
+import pandas as pd
+
+try:
+    from numba import njit
+    USE_NUMBA = True
+except ImportError:
+    USE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        # Fallback sans numba: la fonction reste en Python pur
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# Paramètres par défaut de "Poseidon final.mq5"
+POSEIDON_RULES = {
+    'max_trades_per_day': 2,             # InpMaxTradesPerDay
+    'session_start_hour': 6,             # InpSessionStartHour
+    'session_end_hour': 15,              # InpSessionEndHour (pas de nouvelles entrées après)
+    'trading_months': {1: True, 2: True, 3: False, 4: True, 5: True, 6: True,
+                       7: True, 8: True, 9: True, 10: True, 11: True, 12: True},
+    'max_open_positions': 0,             # 0 = illimité (l'EA ne limite pas)
+    'risk_percent': 1.0,                 # InpRiskPercent
+    'use_fixed_risk_money': True,        # UseFixedRiskMoney
+    'fixed_risk_money': 100.0,           # FixedRiskMoney
+    'reduced_risk_money': 50.0,          # ReducedRiskMoney
+    'use_loss_streak_reduction': True,   # UseLossStreakReduction
+    'loss_streak_trigger': 7,            # LossStreakTrigger
+    'loss_streak_factor': 0.5,           # LossStreakFactor
+    'loss_streak_lookback_days': 30,     # CountConsecutiveLosses (30 derniers jours)
+}
+
+NS_PER_DAY = 86400 * 10**9
+
+
+@njit(cache=True)
+def _portfolio_loop(entry_ns, exit_ns, day_id, allowed, r_multiple, initial_capital,
+                    max_trades_per_day, max_open_positions, risk_percent, use_fixed_risk_money,
+                    fixed_risk_money, reduced_risk_money, use_loss_streak_reduction,
+                    loss_streak_trigger, loss_streak_factor, lookback_ns):
+    n = len(entry_ns)
+    taken = np.zeros(n, dtype=np.bool_)
+    risk_money = np.zeros(n, dtype=np.float64)
+    loss_streak = np.zeros(n, dtype=np.int64)
+
+    # Positions ouvertes (indices de trades) et historique des clôtures
+    open_idx = np.empty(n, dtype=np.int64)
+    n_open = 0
+    closed_exit = np.empty(n, dtype=np.int64)
+    closed_pnl = np.empty(n, dtype=np.float64)
+    n_closed = 0
+
+    balance = initial_capital
+    current_day = -1
+    trades_today = 0
+
+    for i in range(n):
+        # Clôturer les positions sorties avant cette entrée (ordre des sorties)
+        while n_open > 0:
+            best = -1
+            for j in range(n_open):
+                k = open_idx[j]
+                if exit_ns[k] <= entry_ns[i]:
+                    if (best < 0 or exit_ns[k] < exit_ns[open_idx[best]]
+                            or (exit_ns[k] == exit_ns[open_idx[best]] and k < open_idx[best])):
+                        best = j
+            if best < 0:
+                break
+            k = open_idx[best]
+            pnl = risk_money[k] * r_multiple[k]
+            balance += pnl
+            closed_exit[n_closed] = exit_ns[k]
+            closed_pnl[n_closed] = pnl
+            n_closed += 1
+            n_open -= 1
+            open_idx[best] = open_idx[n_open]
+
+        if not allowed[i]:
+            continue
+
+        # ResetDayIfNeeded / CanOpenToday
+        if day_id[i] != current_day:
+            current_day = day_id[i]
+            trades_today = 0
+        if trades_today >= max_trades_per_day:
+            continue
+        if max_open_positions > 0 and n_open >= max_open_positions:
+            continue
+
+        # LotsFromRisk
+        risk = balance * (risk_percent / 100.0)
+        if use_fixed_risk_money:
+            risk = fixed_risk_money
+
+        if use_loss_streak_reduction:
+            streak = 0
+            c = n_closed - 1
+            while c >= 0 and closed_exit[c] >= entry_ns[i] - lookback_ns:
+                if closed_pnl[c] < 0:
+                    streak += 1
+                else:
+                    break  # Arrêter au premier trade gagnant
+                c -= 1
+            loss_streak[i] = streak
+            if streak >= loss_streak_trigger:
+                if use_fixed_risk_money:
+                    risk = reduced_risk_money
+                else:
+                    risk *= loss_streak_factor
+
+        taken[i] = True
+        risk_money[i] = risk
+        trades_today += 1
+        open_idx[n_open] = i
+        n_open += 1
+
+    return taken, risk_money, loss_streak
+
+
+def simulate_portfolio(df_trades, bar_times, rules=None, initial_capital=10000.0):
+    """
+    Applique les règles Poseidon au journal de trades de simulate_trades.
+
+    Args:
+        df_trades: journal de backtest_engine.simulate_trades
+        bar_times: colonne 'time' des barres utilisées pour le backtest (triée)
+        rules: dict de règles (défaut POSEIDON_RULES, clés manquantes = défaut)
+        initial_capital: capital de départ (risque en % de la balance)
+
+    Returns:
+        DataFrame des trades pris (exit_time, risk_money, loss_streak,
+        risk_reduced, pnl_money, balance)
+    """
+    cfg = dict(POSEIDON_RULES)
+    if rules:
+        cfg.update(rules)
+
+    df = df_trades.sort_values('entry_time', kind='stable').reset_index(drop=True)
+    entry_time = pd.to_datetime(df['entry_time'])
+    entry_ns = entry_time.values.astype('datetime64[ns]')
+
+    # Heure de sortie = barre entry + bars_held
+    times = pd.to_datetime(pd.Series(bar_times)).values.astype('datetime64[ns]')
+    entry_pos = np.searchsorted(times, entry_ns, side='right') - 1
+    exit_pos = np.minimum(entry_pos + df['bars_held'].values, len(times) - 1)
+    df['exit_time'] = times[exit_pos]
+
+    # Filtres session / mois (vectorisés)
+    hour = entry_time.dt.hour.values
+    start, end = cfg['session_start_hour'], cfg['session_end_hour']
+    if start <= end:
+        in_session = (hour >= start) & (hour < end)
+    else:
+        in_session = (hour >= start) | (hour < end)
+    month_ok = entry_time.dt.month.map(cfg['trading_months']).fillna(False).values.astype(bool)
+
+    # P&L en multiples de R (1R = distance SL initiale)
+    sl_pct = np.abs(df['sl_price_initial'].values - df['entry_price'].values) / df['entry_price'].values * 100
+    r_multiple = df['pnl_pct'].values / sl_pct
+
+    taken, risk_money, loss_streak = _portfolio_loop(
+        entry_ns.astype(np.int64),
+        times[exit_pos].astype(np.int64),
+        entry_ns.astype('datetime64[D]').astype(np.int64),
+        in_session & month_ok,
+        r_multiple.astype(np.float64),
+        float(initial_capital),
+        int(cfg['max_trades_per_day']),
+        int(cfg['max_open_positions']),
+        float(cfg['risk_percent']),
+        bool(cfg['use_fixed_risk_money']),
+        float(cfg['fixed_risk_money']),
+        float(cfg['reduced_risk_money']),
+        bool(cfg['use_loss_streak_reduction']),
+        int(cfg['loss_streak_trigger']),
+        float(cfg['loss_streak_factor']),
+        int(cfg['loss_streak_lookback_days']) * NS_PER_DAY
+    )
+
+    df['risk_money'] = risk_money
+    df['loss_streak'] = loss_streak
+    df['risk_reduced'] = cfg['use_loss_streak_reduction'] & (loss_streak >= cfg['loss_streak_trigger'])
+    df['pnl_money'] = risk_money * r_multiple
+    df = df[taken].reset_index(drop=True)
+
+    # Balance dans l'ordre des clôtures
+    df = df.sort_values(['exit_time', 'entry_time'], kind='stable').reset_index(drop=True)
+    df['balance'] = initial_capital + df['pnl_money'].cumsum()
+    return df
@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""
+Point d'entrée unique des scripts Poseidon (chargement paresseux)
+Version 1.0 - 2026-10-18
+
+OBJECTIF:
+- Chaque script importait lightgbm, xgboost, catboost, optuna, sklearn,
+  matplotlib... en tête de module: plusieurs secondes avant le premier print,
+  même pour un backtest ou une recherche de threshold
+- Ici: une sous-commande par étape; ce module n'importe que la bibliothèque
+  standard, le script de l'étape n'est exécuté (et ses imports chargés)
+  qu'une fois la sous-commande choisie
+- Rapport de démarrage: temps d'import par bibliothèque, pour l'étape lancée
+  (--startup-report) ou pour toutes les étapes (sous-commande startup)
+
+UTILISATION:
+    python poseidon.py list
+    python poseidon.py backtest --startup-report
+    python poseidon.py calibrate
+    python poseidon.py startup                 # imports de chaque étape
+    python poseidon.py startup backtest train-v6
+
+NOTE:
+- Les scripts restent exécutables directement (python backtest_lightgbm.py)
+- Le rapport startup mesure les imports de tête de chaque script dans un
+  interpréteur neuf (sans exécuter l'étape): c'est le coût payé avant tout travail
+"""
+
+import argparse
+import ast
+import builtins
+import json
+import os
+import runpy
+import subprocess
+import sys
+import time
+
+START = time.perf_counter()
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Bibliothèques lourdes suivies dans les rapports
+HEAVY = ('lightgbm', 'xgboost', 'catboost', 'optuna', 'sklearn', 'matplotlib',
+         'seaborn', 'tqdm', 'yfinance', 'pandas', 'numpy', 'scipy', 'joblib', 'pyarrow')
+
+# sous-commande -> (script, description)
+COMMANDS = {
+    'export-macro': ('export_macro_indicators_yahoo.py', "Téléchargement DXY / VIX / US10Y (Yahoo)"),
+    'merge': ('merge_mt5_with_macro.py', "Fusion export MT5 + macro"),
+    'merge-yahoo': ('merge_yahoo_data.py', "Enrichissement export MT5 (Yahoo)"),
+    'features': ('feature_engineering_advanced.py', "Feature engineering avancé"),
+    'relabel': ('relabel_mq5_export.py', "Ré-étiquetage de l'export MQ5"),
+    'update': ('incremental_update.py', "Mise à jour incrémentale du dataset"),
+    'rr-grid': ('optimal_rr_grid.py', "Grille SL / TP optimale"),
+    'tune': ('hyperparameter_tuning_optuna.py', "Optimisation Optuna LightGBM"),
+    'train-lgbm': ('train_lightgbm_model.py', "LightGBM simple"),
+    'train-lgbm-balanced': ('train_lightgbm_balanced.py', "LightGBM dataset équilibré"),
+    'train-ensemble': ('ensemble_methods.py', "Ensembles voting / stacking"),
+    'train-v2': ('train_ensemble_v2_atr.py', "Ensemble V2 (ATR)"),
+    'train-v3': ('train_ensemble_v3_CALIBRATED.py', "Ensemble V3 calibré"),
+    'train-v4': ('train_ensemble_v4_FINAL.py', "Ensemble V4"),
+    'train-v5': ('train_ensemble_v5_FINAL_RR4.py', "Ensemble V5 RR4"),
+    'train-v6': ('train_ensemble_v6_OPTIMIZED.py', "Ensemble V6 walk-forward"),
+    'calibrate': ('calibration_70_percent.py', "Threshold 70%+ win rate"),
+    'backtest': ('backtest_lightgbm.py', "Backtest du modèle LightGBM"),
+    'pipeline': ('run_pipeline.py', "Pipeline macro -> merge -> features -> V6 (cache par étape)"),
+    'serve': ('run_inference_server.py', "Serveur d'inférence pour l'EA"),
+    'check-compiled': ('check_compiled_parity.py', "Parité ensemble compilé / model_data"),
+}
+
+
+class ImportTimer:
+    """
+    Temps d'import par paquet de premier niveau (inclusif, premier import seulement).
+
+    Remplace builtins.__import__ le temps de la mesure: seul l'import le plus
+    externe d'un paquet est chronométré, ses dépendances y sont incluses.
+    """
+
+    def __init__(self):
+        self.times = {}
+        self._depth = 0
+        self._original = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        top = name.partition('.')[0]
+        if level or self._depth or top in sys.modules:
+            self._depth += 1
+            try:
+                return self._original(name, globals, locals, fromlist, level)
+            finally:
+                self._depth -= 1
+        start = time.perf_counter()
+        self._depth += 1
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            self._depth -= 1
+            self.times[top] = self.times.get(top, 0.0) + time.perf_counter() - start
+
+    def __enter__(self):
+        self._original = builtins.__import__
+        builtins.__import__ = self._import
+        return self
+
+    def __exit__(self, *exc):
+        builtins.__import__ = self._original
+
+    @property
+    def total(self):
+        return sum(self.times.values())
+
+    def report(self, top=12):
+        """Lignes texte: imports les plus coûteux (lourds marqués *)."""
+        lines = [f"Imports: {self.total:.2f}s ({len(self.times)} paquets)"]
+        for name, seconds in sorted(self.times.items(), key=lambda kv: -kv[1])[:top]:
+            mark = '*' if name in HEAVY else ' '
+            lines.append(f"   {mark} {name:<28} {seconds:6.2f}s")
+        return lines
+
+
+def script_path(command):
+    return os.path.join(ROOT, COMMANDS[command][0])
+
+
+def _import_block(node):
+    """
+    Imports d'un bloc try / if de tête (drapeaux USE_*, stubs de repli tolérés),
+    None si le bloc contient du code exécutable.
+    """
+    imports = []
+    for child in ast.iter_child_nodes(node):
+        if isinstance(child, ast.ExceptHandler):
+            block = _import_block(child)
+        elif isinstance(child, (ast.Import, ast.ImportFrom)):
+            block = [child]
+        elif isinstance(child, (ast.Try, ast.If)):
+            block = _import_block(child)
+        elif isinstance(child, (ast.Pass, ast.FunctionDef)) or (
+                isinstance(child, ast.Assign) and isinstance(child.value, (ast.Constant, ast.Name))):
+            block = []
+        elif isinstance(child, ast.stmt):
+            return None
+        else:
+            # Condition du if, type de l'except
+            block = []
+        if block is None:
+            return None
+        imports.extend(block)
+    return imports
+
+
+def header_imports(path):
+    """
+    Instructions import de tête d'un script: imports de premier niveau et blocs
+    try / if faits d'imports, jusqu'à la première instruction exécutable
+    (imports différés, ex: matplotlib au moment du graphique, non comptés).
+    """
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    nodes = []
+    for k, node in enumerate(tree.body):
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            nodes.append(node)
+        elif k == 0 and isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant):
+            continue  # docstring du module
+        elif isinstance(node, (ast.Try, ast.If)) and _import_block(node):
+            nodes.extend(_import_block(node))
+        else:
+            break
+    return nodes
+
+
+def measure_imports(command):
+    """
+    Importe les en-têtes du script d'une étape sans l'exécuter.
+
+    Returns:
+        dict (command, imports_s, packages {nom: s}, errors)
+    """
+    errors = []
+    with ImportTimer() as timer:
+        for node in header_imports(script_path(command)):
+            try:
+                exec(compile(ast.Module(body=[node], type_ignores=[]), command, 'exec'), {})
+            except Exception as e:
+                errors.append(f"{ast.unparse(node)}: {type(e).__name__}")
+    return {'command': command, 'imports_s': timer.total,
+            'packages': timer.times, 'errors': errors}
+
+
+def startup_report(commands):
+    """Temps d'import de chaque étape, chacune dans un interpréteur neuf."""
+    rows = []
+    for command in commands:
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, __file__, '_measure', command],
+                              capture_output=True, text=True, cwd=ROOT)
+        wall = time.perf_counter() - start
+        if proc.returncode != 0:
+            rows.append({'command': command, 'wall_s': wall, 'imports_s': float('nan'),
+                         'packages': {}, 'errors': proc.stderr.strip().splitlines()[-1:]})
+            continue
+        row = json.loads(proc.stdout.strip().splitlines()[-1])
+        row['wall_s'] = wall
+        rows.append(row)
+
+    print(f"{'Étape':<22} {'Démarrage':>10} {'Imports':>9}  Plus lourds")
+    print("-" * 80)
+    for row in rows:
+        heaviest = sorted(row['packages'].items(), key=lambda kv: -kv[1])[:3]
+        detail = ", ".join(f"{name} {s:.2f}s" for name, s in heaviest)
+        if row['errors']:
+            detail += f"  ({len(row['errors'])} import(s) en échec)"
+        print(f"{row['command']:<22} {row['wall_s']:>9.2f}s {row['imports_s']:>8.2f}s  {detail}")
+    return rows
+
+
+def run_command(command, script_args, report=False):
+    """Exécute le script d'une étape comme __main__ (imports chronométrés si report)."""
+    path = script_path(command)
+    sys.argv = [path] + list(script_args)
+    sys.path.insert(0, ROOT)
+
+    timer = ImportTimer()
+    dispatch = time.perf_counter() - START
+    start = time.perf_counter()
+    try:
+        if report:
+            with timer:
+                runpy.run_path(path, run_name='__main__')
+        else:
+            runpy.run_path(path, run_name='__main__')
+    finally:
+        if report:
+            total = time.perf_counter() - start
+            print("\n" + "=" * 80)
+            print(f"RAPPORT DE DÉMARRAGE: {command}")
+            print("=" * 80)
+            print(f"Dispatch poseidon: {dispatch * 1000:.0f} ms")
+            for line in timer.report():
+                print(line)
+            print(f"Étape complète: {total:.2f}s (dont {timer.total / max(total, 1e-9) * 100:.0f}% d'imports)")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+
+    # Mesure interne (sous-processus de startup_report)
+    if argv[:1] == ['_measure']:
+        print(json.dumps(measure_imports(argv[1])))
+        return 0
+
+    parser = argparse.ArgumentParser(prog='poseidon', description="Étapes du pipeline Poseidon")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list', help="Étapes disponibles")
+    p_startup = sub.add_parser('startup', help="Temps d'import de chaque étape")
+    p_startup.add_argument('commands', nargs='*', metavar='étape', help="Étapes (défaut: toutes)")
+    for command, (script, description) in COMMANDS.items():
+        p = sub.add_parser(command, help=f"{description} ({script})")
+        p.add_argument('--startup-report', action='store_true',
+                       help="Afficher les temps d'import à la fin de l'étape")
+        p.add_argument('args', nargs=argparse.REMAINDER, help="Arguments passés au script")
+
+    args = parser.parse_args(argv)
+    if args.command == 'list':
+        for command, (script, description) in COMMANDS.items():
+            print(f"{command:<22} {script:<36} {description}")
+        return 0
+    if args.command == 'startup':
+        unknown = [c for c in args.commands if c not in COMMANDS]
+        if unknown:
+            parser.error(f"Étapes inconnues: {unknown}")
+        startup_report(args.commands or list(COMMANDS))
+        return 0
+
+    run_command(args.command, args.args, report=args.startup_report)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Cache des prédictions par barre, indexé par (empreinte du modèle, time)
+Version 1.0 - 2026-10-18
+
+OBJECTIF:
+- L'analyse de threshold, le backtest final et calibration_70_percent.py
+  rappelaient predict_proba sur les mêmes barres de test avec le même modèle
+- Un backtest relancé avec d'autres paramètres de risque re-scorait toutes les barres
+- Ici: probabilités (ensemble + chaque modèle) stockées en colonnes sur disque,
+  un fichier par modèle; seules les barres jamais scorées passent dans le modèle
+
+Organisation: <store_dir>/<empreinte>.parquet, colonnes time + une colonne par
+probabilité (ex: proba, lgbm, xgb, catboost, rf, et), trié par time.
+
+NOTE:
+- Empreinte du modèle: modèle enregistré (model_bundle.saved_fingerprint) ou
+  objet en mémoire (model_fingerprint, joblib.hash); un réentraînement -> nouvelle table
+- Une barre clôturée ne change plus: la clé ne contient pas les features.
+  Après une correction des données historiques, vider le dossier
+- Parquet (pyarrow), sinon pickle
+"""
+
+import os
+import joblib
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    USE_PARQUET = True
+except ImportError:
+    USE_PARQUET = False
+
+
+def model_fingerprint(*models):
+    """Empreinte d'objets modèles en mémoire (contenu picklé)."""
+    return joblib.hash(models)
+
+
+class PredictionStore:
+    """
+    Probabilités par barre sur disque, une table par empreinte de modèle.
+
+    Args:
+        store_dir: dossier du cache
+        time_col: colonne temps (clé des barres)
+    """
+
+    def __init__(self, store_dir, time_col='time'):
+        self.store_dir = store_dir
+        self.time_col = time_col
+        os.makedirs(store_dir, exist_ok=True)
+
+    def _path(self, fingerprint):
+        return os.path.join(self.store_dir, fingerprint + (".parquet" if USE_PARQUET else ".pkl"))
+
+    def load(self, fingerprint):
+        """Table stockée pour ce modèle (None si absente)."""
+        path = self._path(fingerprint)
+        if not os.path.exists(path):
+            return None
+        return pd.read_parquet(path, engine='pyarrow') if USE_PARQUET else pd.read_pickle(path)
+
+    def put(self, fingerprint, times, probas):
+        """
+        Ajoute / remplace les probabilités de barres.
+
+        Args:
+            times: temps des barres
+            probas: dict colonne -> tableau (même longueur que times) ou DataFrame
+        """
+        df_new = pd.DataFrame(probas).reset_index(drop=True)
+        df_new.insert(0, self.time_col, pd.to_datetime(pd.Series(times)).reset_index(drop=True))
+
+        df_old = self.load(fingerprint)
+        df = df_new if df_old is None else pd.concat([df_old, df_new], ignore_index=True)
+        df = (df.drop_duplicates(subset=self.time_col, keep='last')
+                .sort_values(self.time_col, kind='stable').reset_index(drop=True))
+
+        # Écriture atomique
+        path = self._path(fingerprint)
+        tmp_path = path + ".tmp"
+        if USE_PARQUET:
+            df.to_parquet(tmp_path, engine='pyarrow', compression='zstd', index=False)
+        else:
+            df.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+        return len(df)
+
+    def get(self, fingerprint, times, columns=None):
+        """
+        Probabilités stockées pour ces barres (NaN pour les barres absentes).
+
+        Returns:
+            DataFrame aligné sur times (index 0..n-1), ou None si rien n'est stocké
+        """
+        df = self.load(fingerprint)
+        if df is None:
+            return None
+        df = df.set_index(self.time_col)
+        if columns is not None:
+            df = df.reindex(columns=columns)
+        return df.reindex(pd.to_datetime(pd.Series(times)).values).reset_index(drop=True)
+
+
+def cached_predict(store, fingerprint, df, predict_fn, time_col='time', verbose=True):
+    """
+    Probabilités des barres de df depuis le cache, calculées pour les barres manquantes.
+
+    Args:
+        store: PredictionStore
+        fingerprint: empreinte du modèle (model_bundle.saved_fingerprint / model_fingerprint)
+        df: barres à scorer (doit contenir time_col et les features)
+        predict_fn: fonction df -> dict colonne -> tableau (ex: {'proba': ...})
+            appelée uniquement sur les barres absentes du cache
+        verbose: afficher le nombre de barres réutilisées
+
+    Returns:
+        DataFrame des probabilités, aligné sur df (même index)
+    """
+    times = df[time_col]
+    cached = store.get(fingerprint, times)
+
+    if cached is None:
+        missing = pd.Series(True, index=range(len(df)))
+    else:
+        missing = cached.isna().any(axis=1)
+
+    if missing.any():
+        df_missing = df[missing.values]
+        probas = pd.DataFrame(predict_fn(df_missing))
+        store.put(fingerprint, df_missing[time_col], probas)
+        cached = store.get(fingerprint, times, columns=list(probas.columns))
+
+    if verbose:
+        n_hit = len(df) - int(missing.sum())
+        print(f"OK: prédictions {fingerprint[:12]}: {n_hit}/{len(df)} barres depuis le cache, "
+              f"{int(missing.sum())} calculées")
+    cached.index = df.index
+    return cached
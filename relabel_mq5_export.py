@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Relabellisation locale de l'export MQ5 V3 (sans relancer MetaTrader)
+Version 1.0 - 2026-10-18
+
+OBJECTIF:
+- Recalculer target_binary / target_pct_change / sl_price / tp_price avec
+  mq5_labels (même logique que SimulateTradeV2: SL/TP ATR + Break Even)
+- Tester d'autres multiplicateurs / horizons / gestion des timeouts en Python
+- Vérifier le taux d'accord avec les labels exportés par le MQ5
+
+NOTE:
+- Le CSV arrondit atr14 et les prix à `digits` décimales: une touche à moins
+  d'un tick d'un niveau peut donner un label différent (accord ~100%, pas 100%)
+- Le MQ5 n'exporte pas les FORWARD_BARS dernières barres: les dernières lignes
+  du CSV ont moins de barres futures disponibles -> exclues de la comparaison
+"""
+
+import pandas as pd
+import numpy as np
+import os
+from labeling_engine import mq5_labels
+
+print("="*80)
+print("RELABELLISATION EXPORT MQ5 V3")
+print("="*80)
+
+# ==================== CONFIGURATION ====================
+DATA_CSV = "XAUUSD_ML_Data_V3_FINAL_20Y.csv"
+OUTPUT_CSV = "XAUUSD_ML_Data_V3_FINAL_20Y_relabeled.csv"
+
+SL_ATR_MULTIPLIER = 1.5      # InpSL_ATR_Multiplier
+TP_ATR_MULTIPLIER = 4.0      # InpTP_ATR_Multiplier
+USE_BREAK_EVEN = True        # InpUseBreakEven
+FORWARD_BARS = 180           # InpForwardBars
+FUTURE_BARS = 24             # InpFutureBars
+TIMEOUT_POLICY = 'ignore'    # 'ignore' (MQ5: -1) ou 'close' (WIN/LOSS au dernier close)
+
+print(f"\nSL: {SL_ATR_MULTIPLIER}x ATR | TP: {TP_ATR_MULTIPLIER}x ATR | "
+      f"BE: {USE_BREAK_EVEN} | Horizon: {FORWARD_BARS} barres | Timeout: {TIMEOUT_POLICY}")
+
+# ==================== CHARGEMENT ====================
+print("\n" + "="*80)
+print("CHARGEMENT DONNEES")
+print("="*80)
+
+base_path = r"C:\Users\lbye3\AppData\Roaming\MetaQuotes\Terminal\Common\Files"
+csv_path = os.path.join(base_path, DATA_CSV)
+
+if not os.path.exists(csv_path):
+    print(f"ERREUR: Fichier introuvable: {csv_path}")
+    exit(1)
+
+df = pd.read_csv(csv_path)
+df['time'] = pd.to_datetime(df['time'])
+df = df.sort_values('time').reset_index(drop=True)
+
+print(f"OK: {len(df)} lignes chargées")
+print(f"Période: {df['time'].min()} -> {df['time'].max()}")
+
+# ==================== RELABELLISATION ====================
+print("\n" + "="*80)
+print("RELABELLISATION")
+print("="*80)
+
+target_binary, target_pct_change, sl_price, tp_price = mq5_labels(
+    df['high'].values, df['low'].values, df['close'].values,
+    df['atr14'].values, df['signal_score'].values,
+    sl_multiplier=SL_ATR_MULTIPLIER,
+    tp_multiplier=TP_ATR_MULTIPLIER,
+    use_break_even=USE_BREAK_EVEN,
+    forward_bars=FORWARD_BARS,
+    future_bars=FUTURE_BARS,
+    timeout_policy=TIMEOUT_POLICY
+)
+
+signals = target_binary != -1
+print(f"OK: {signals.sum()} trades labellisés")
+print(f"  WIN:  {(target_binary == 1).sum()}")
+print(f"  LOSS: {(target_binary == 0).sum()}")
+if signals.sum() > 0:
+    print(f"  Win Rate: {(target_binary[signals] == 1).mean()*100:.2f}%")
+
+# ==================== COMPARAISON AVEC LE MQ5 ====================
+print("\n" + "="*80)
+print("COMPARAISON AVEC L'EXPORT MQ5")
+print("="*80)
+
+# Lignes avec l'horizon complet disponible dans le CSV
+comparable = np.arange(len(df)) < len(df) - FORWARD_BARS
+
+exported = df['target_binary'].values
+agree = (target_binary == exported)[comparable]
+print(f"Lignes comparées: {comparable.sum()} (dernières {FORWARD_BARS} exclues)")
+print(f"Accord target_binary: {agree.mean()*100:.4f}% ({(~agree).sum()} différences)")
+
+pct_agree = np.isclose(np.round(target_pct_change, 4), df['target_pct_change'].values)[comparable]
+print(f"Accord target_pct_change (4 décimales): {pct_agree.mean()*100:.4f}%")
+
+if TIMEOUT_POLICY != 'ignore' or SL_ATR_MULTIPLIER != 1.5 or TP_ATR_MULTIPLIER != 4.0:
+    print("NOTE: paramètres différents de l'export -> écarts attendus")
+
+# ==================== SAUVEGARDE ====================
+df['target_binary'] = target_binary
+df['target_pct_change'] = target_pct_change
+df['sl_price'] = sl_price
+df['tp_price'] = tp_price
+
+output_path = os.path.join(base_path, OUTPUT_CSV)
+df.to_csv(output_path, index=False)
+print(f"\nOK: Sauvegardé: {output_path}")
+
+print("\n" + "="*80)
+print("RELABELLISATION TERMINEE")
+print("="*80)
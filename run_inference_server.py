@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Lancement du serveur d'inférence V6 pour l'EA (localhost)
+Version 1.0 - 2026-10-18
+
+OBJECTIF:
+- Charger une seule fois l'ensemble compilé V6 depuis le bundle du modèle
+  (train_ensemble_v6_OPTIMIZED.py); les modèles natifs du bundle ne sont pas lus
+- Chauffer le flux de features avec les dernières barres du dataset
+- Mesurer la latence d'une requête (p50 / p99) en rejouant l'historique récent
+  avant d'ouvrir le port
+- Servir les prédictions barre par barre à Poseidon final.mq5 (inference_server)
+"""
+
+import time
+from dataset_store import read_dataset
+from model_bundle import load_model
+from inference_server import InferenceService, serve, measure_latency, LATENCY_TARGET_US
+
+print("="*80)
+print("SERVEUR D'INFERENCE V6")
+print("="*80)
+
+# ==================== CONFIGURATION ====================
+MODEL = r"C:\Users\lbye3\AppData\Roaming\MetaQuotes\Terminal\Common\Files\xauusd_ensemble_v6_OPTIMIZED_model.pkl"
+HISTORY_CSV = r"C:\Users\lbye3\AppData\Roaming\MetaQuotes\Terminal\Common\Files\XAUUSD_ML_Data_V3_FINAL_WITH_MACRO_20Y.csv"
+HOST = "127.0.0.1"
+PORT = 5555
+WARMUP_BARS = 500            # > plus longue fenêtre du flux (96 barres)
+LATENCY_BARS = 2000          # barres rejouées pour mesurer la latence au démarrage
+THRESHOLD = None             # None = threshold optimisé du modèle
+STATS_EVERY = 3600           # secondes entre deux histogrammes de latence
+
+# ==================== CHARGEMENT ====================
+start = time.perf_counter()
+bundle = load_model(MODEL)
+if 'compiled' not in bundle:
+    # Ensemble compilé écarté à l'entraînement (écart > PARITY_TOLERANCE vs model_data)
+    raise SystemExit("ERREUR: pas d'ensemble compilé dans le bundle (python check_compiled_parity.py)")
+compiled = bundle['compiled']
+service = InferenceService(compiled, threshold=THRESHOLD)
+print(f"OK: ensemble compilé chargé ({compiled.n_trees} arbres, {len(compiled.features)} features) "
+      f"en {time.perf_counter() - start:.2f}s")
+print(f"Threshold: {service.threshold:.2f}")
+
+# ==================== CHAUFFE ====================
+history_columns = ['time'] + service.required
+history = read_dataset(HISTORY_CSV, columns=history_columns).tail(WARMUP_BARS + LATENCY_BARS)
+n = service.warm_up(history)
+print(f"OK: flux de features chauffé sur {n} barres (dernière: {history['time'].iloc[-1]})")
+
+# ==================== LATENCE ====================
+latency = measure_latency(compiled, history, n_bars=LATENCY_BARS, threshold=THRESHOLD)
+status = "✅" if latency['p99_us'] <= LATENCY_TARGET_US else "⚠️ au-dessus de la cible"
+print(f"Latence mesurée ({latency['count']} barres): p50 {latency['p50_us']:.0f} us | "
+      f"p99 {latency['p99_us']:.0f} us | max {latency['max_us']:.0f} us "
+      f"(cible p99 {LATENCY_TARGET_US} us) {status}")
+
+# ==================== SERVICE ====================
+serve(service, HOST, PORT, stats_every=STATS_EVERY)
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Pipeline complet V6: macro -> merge -> features -> walk-forward -> calibration
+Version 1.0 - 2026-10-18
+
+OBJECTIF:
+- Remplacer la suite export_macro_indicators_yahoo.py -> merge_mt5_with_macro.py
+  -> features -> train_ensemble_v6_OPTIMIZED.py par un seul lancement (pipeline.py)
+- DataFrames passés en mémoire entre les étapes (plus de relecture de CSV)
+- Relance: seules les étapes dont les entrées ont changé sont recalculées
+  (ex: nouvelle barre MT5 -> merge + aval; macro identique -> rien)
+- Téléchargement macro et lecture de l'export MT5 en parallèle
+
+GRAPHE:
+    macro ─┐
+           ├─> merge ─> engineer ─> train ─> calibrate
+    mt5 ───┘
+
+UTILISATION:
+    python run_pipeline.py                     # tout (étapes inchangées ignorées)
+    python run_pipeline.py engineer            # jusqu'aux features seulement
+    python run_pipeline.py --force macro       # re-télécharger la macro
+
+NOTE:
+- Sorties conservées comme avant: ALL_MACRO_INDICATORS.csv, store du dataset
+  mergé, bundle du modèle V6 + tables de calibration (les scripts seuls restent utilisables)
+- macro: clé = date du jour -> au plus un téléchargement par jour
+"""
+
+import os
+import argparse
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from pipeline import Stage, Pipeline
+from run_report import RunReport
+from dataset_store import read_dataset, write_dataset, store_path
+from macro_indicators import download_macro, merge_macro, MACRO_SYMBOLS
+from compact_dtypes import compact_frame
+import feature_registry
+import trade_levels
+import v6_dataset
+from v6_dataset import FEATURES, TARGET, LOAD_COLUMNS, WINDOWS, prepare_dataset
+
+print("="*80)
+print("PIPELINE V6")
+print("="*80)
+
+# ==================== CONFIGURATION ====================
+BASE_PATH = r"C:\Users\lbye3\AppData\Roaming\MetaQuotes\Terminal\Common\Files"
+MT5_FILE = os.path.join(BASE_PATH, "XAUUSD_ML_Data_V3_FINAL_20Y.csv")
+MACRO_FILE = r"C:\Users\lbye3\algo-poseidon\algo-poseidon\macro_data\ALL_MACRO_INDICATORS.csv"
+DATASET_FILE = os.path.join(BASE_PATH, "XAUUSD_ML_Data_V3_FINAL_WITH_MACRO_20Y.csv")
+OUTPUT_MODEL = os.path.join(BASE_PATH, "xauusd_ensemble_v6_OPTIMIZED_model.pkl")
+OUTPUT_CALIBRATION = os.path.join(BASE_PATH, "xauusd_ensemble_v6_OPTIMIZED_calibration.npz")
+PIPELINE_DIR = os.path.join(BASE_PATH, "pipeline_cache")
+STUDY_DIR = os.path.join(BASE_PATH, "optuna_studies")
+
+MACRO_START = "2008-01-01"
+
+# Mêmes paramètres que train_ensemble_v6_OPTIMIZED.py
+SL_ATR_MULTIPLIER = 1.5
+TP_ATR_MULTIPLIER = 6.0
+MIN_RR = 4.0
+INITIAL_CAPITAL = 10000
+RISK_PERCENT = 1.0
+N_PARALLEL_WINDOWS = 3
+CORES_PER_WINDOW = max(1, (os.cpu_count() or 1) // N_PARALLEL_WINDOWS)
+N_TRIALS = 30
+OPTUNA_PRUNER = 'median'
+CATEGORICAL_FEATURES = ['hour', 'day_of_week']
+
+MAX_PARALLEL_STAGES = 2      # branches indépendantes (macro || mt5)
+
+# Modules importés seulement dans leur étape (bibliothèques lourdes): leurs
+# fichiers entrent dans la clé comme sources
+HERE = os.path.dirname(os.path.abspath(__file__))
+TRAIN_CODE = [os.path.join(HERE, f) for f in ('walk_forward.py', 'ensemble_scheduler.py', 'binned_folds.py',
+                                              'optuna_studies.py', 'calibration_table.py')]
+CALIBRATE_CODE = [os.path.join(HERE, f) for f in ('walk_forward.py', 'threshold_curve.py',
+                                                  'compiled_ensemble.py', 'model_bundle.py')]
+
+
+# ==================== ÉTAPES ====================
+def macro(start, end):
+    """Indicateurs macro Yahoo (+ ALL_MACRO_INDICATORS.csv pour les scripts)."""
+    df_macro = download_macro(start, end, MACRO_SYMBOLS)
+    if df_macro.empty:
+        raise RuntimeError("Aucun indicateur macro téléchargé")
+    os.makedirs(os.path.dirname(MACRO_FILE), exist_ok=True)
+    df_macro.to_csv(MACRO_FILE)
+    return df_macro
+
+
+def mt5(path):
+    """Export MT5 (store Parquet, fallback CSV)."""
+    return read_dataset(path)
+
+
+def merge(df_mt5: pd.DataFrame, df_macro: pd.DataFrame, output):
+    """Barres MT5 + macro du jour (+ store du dataset mergé pour les scripts)."""
+    df = merge_macro(df_mt5, df_macro)
+    write_dataset(df, output)
+    return df
+
+
+def engineer(df: pd.DataFrame, sl, tp, min_rr, features, categorical):
+    """Features avancées V6 + target RR4, types compacts, barres labellisées.
+
+    sl / tp / min_rr n'entrent que dans la clé (comme le cache du trainer V6).
+    """
+    df = prepare_dataset(df[LOAD_COLUMNS])
+    df = compact_frame(df, columns=features, categorical=categorical)
+    return df[df[TARGET] != -1].reset_index(drop=True)
+
+
+def train(df_valid: pd.DataFrame, features, n_trials, n_parallel, cores_per_window, categorical):
+    """Walk-forward (fenêtres en processus loky): modèles + prédictions de test."""
+    from walk_forward import train_windows
+
+    all_models, all_test_results = train_windows(df_valid, WINDOWS, features, TARGET,
+                                                 n_parallel=n_parallel, cores_per_window=cores_per_window,
+                                                 n_trials=n_trials, categorical=categorical,
+                                                 study_dir=STUDY_DIR, pruner=OPTUNA_PRUNER)
+    return {'models': all_models, 'test_results': all_test_results}
+
+
+def calibrate(windows: dict, features, min_rr, risk_amount):
+    """Threshold (Sharpe) + ensemble compilé + bundle du modèle de la dernière fenêtre."""
+    from walk_forward import optimize_threshold, ENSEMBLE_WEIGHTS
+    from compiled_ensemble import compile_ensemble, compare_with_model_data, PARITY_TOLERANCE
+    from model_bundle import save_model
+
+    _, _, best = optimize_threshold(windows['test_results'], TARGET,
+                                    win_pnl=risk_amount * min_rr, loss_pnl=-risk_amount,
+                                    thresholds=np.arange(0.50, 0.71, 0.01))
+    print(f"\nMeilleur threshold: {best['threshold']:.2f} (Sharpe {best['sharpe']:.4f}, "
+          f"WR {best['win_rate']*100:.2f}%, {best['total_trades']:.0f} trades)")
+
+    final_model = windows['models'][-1]
+    model_data = {name: final_model[name] for name in ENSEMBLE_WEIGHTS}
+    model_data.update({
+        'features': features,
+        'threshold': best['threshold'],
+        'weights': ENSEMBLE_WEIGHTS,
+        'training_window': WINDOWS[final_model['window'] - 1],
+        'training_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'config': {'sl_atr_mult': SL_ATR_MULTIPLIER, 'tp_atr_mult': TP_ATR_MULTIPLIER,
+                   'min_rr': MIN_RR, 'risk_percent': RISK_PERCENT},
+    })
+    compiled = compile_ensemble(model_data, weights=ENSEMBLE_WEIGHTS)
+    check = compare_with_model_data(compiled, model_data, windows['test_results'][-1]['df_test'][features])
+    if check['ok']:
+        model_data['compiled'] = compiled
+    else:
+        print(f"❌ Ensemble compilé NON sauvegardé (écart ensemble {check['ensemble']:.1e}, "
+              f"barre unique {check['row']:.1e} > {PARITY_TOLERANCE:.0e})")
+
+    print(f"✅ Modèle sauvegardé: {save_model(model_data, OUTPUT_MODEL)}")
+    compiled.calibration.save(OUTPUT_CALIBRATION)
+    print(f"✅ Tables de calibration sauvegardées: {OUTPUT_CALIBRATION}")
+    return model_data
+
+
+STAGES = [
+    Stage('macro', macro, output=pd.DataFrame,
+          params={'start': MACRO_START, 'end': datetime.now().strftime("%Y-%m-%d")}, code=[download_macro]),
+    Stage('mt5', mt5, output=pd.DataFrame, params={'path': MT5_FILE},
+          sources=[MT5_FILE, store_path(MT5_FILE)]),
+    Stage('merge', merge, inputs={'df_mt5': 'mt5', 'df_macro': 'macro'}, output=pd.DataFrame,
+          params={'output': DATASET_FILE}, code=[merge_macro]),
+    Stage('engineer', engineer, inputs={'df': 'merge'}, output=pd.DataFrame,
+          params={'sl': SL_ATR_MULTIPLIER, 'tp': TP_ATR_MULTIPLIER, 'min_rr': MIN_RR,
+                  'features': FEATURES, 'categorical': CATEGORICAL_FEATURES},
+          code=[v6_dataset, trade_levels, feature_registry, compact_frame]),
+    Stage('train', train, inputs={'df_valid': 'engineer'}, output=dict,
+          params={'features': FEATURES, 'n_trials': N_TRIALS, 'n_parallel': N_PARALLEL_WINDOWS,
+                  'cores_per_window': CORES_PER_WINDOW, 'categorical': CATEGORICAL_FEATURES},
+          sources=TRAIN_CODE),
+    Stage('calibrate', calibrate, inputs={'windows': 'train'}, output=dict,
+          params={'features': FEATURES, 'min_rr': MIN_RR,
+                  'risk_amount': INITIAL_CAPITAL * (RISK_PERCENT / 100)},
+          sources=CALIBRATE_CODE),
+]
+
+# ==================== EXÉCUTION ====================
+parser = argparse.ArgumentParser(description="Pipeline V6")
+parser.add_argument('targets', nargs='*', help="Étapes cibles (défaut: toutes)")
+parser.add_argument('--force', nargs='*', default=[], help="Étapes à recalculer")
+args = parser.parse_args()
+
+report = RunReport("run_pipeline")
+pipeline = Pipeline(STAGES, PIPELINE_DIR, max_workers=MAX_PARALLEL_STAGES)
+print(f"\nÉtapes: {' -> '.join(pipeline.order(args.targets or None))}")
+results = pipeline.run(args.targets or None, force=args.force, report=report)
+
+# Étapes des fenêtres (workers loky) sous le span de l'étape train
+if 'train' in results and results['train'].status == 'exécutée':
+    for r in results['train'].value()['test_results']:
+        report.add_spans(r.get('spans', []), parent=f"train/window {r['window']}")
+report.save(OUTPUT_MODEL)
+
+print("\n" + "="*80)
+print("PIPELINE TERMINE")
+print("="*80)
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+Instrumentation des scripts: durée, CPU et mémoire par étape + rapport JSON
+Version 1.0 - 2026-10-18
+
+OBJECTIF:
+- Les scripts n'affichaient que des print: impossible de voir qu'un chargement,
+  un Optuna ou un backtest est devenu plus lent d'une version à l'autre
+- Étapes mesurées: temps réel, temps CPU du processus, RSS début / fin et pic
+- Rapport JSON écrit à côté de l'artefact (modèle, trades...) + historique
+  JSONL dans le même dossier; comparaison avec le rapport précédent
+
+UTILISATION:
+    report = RunReport("train_ensemble_v6")
+    report.stage("chargement")          # scripts à plat: termine l'étape précédente
+    ...
+    with report.span("optuna"):         # bloc / fonction
+        ...
+    report.save(OUTPUT_MODEL)           # -> xauusd_..._model_run_report.json
+
+NOTE:
+- Pic RSS par étape: échantillonné (psutil, thread toutes les 50 ms); sans
+  psutil, pic du processus depuis son démarrage (resource, Unix)
+- CPU = process_time du processus (tous threads); les workers loky ont leur
+  propre rapport, rattaché via add_spans
+- Imbrication des span par thread (étapes parallèles du pipeline: une racine
+  chacune)
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import psutil
+    USE_PSUTIL = True
+except ImportError:
+    USE_PSUTIL = False
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+HISTORY_FILE = "run_reports.jsonl"
+
+
+def rss_mb():
+    """RSS courant du processus (Mo), None si non mesurable."""
+    if USE_PSUTIL:
+        return psutil.Process().memory_info().rss / 1024**2
+    return None
+
+
+def peak_rss_mb():
+    """Pic RSS du processus depuis son démarrage (Mo), None si non mesurable."""
+    if USE_PSUTIL:
+        info = psutil.Process().memory_info()
+        if hasattr(info, 'peak_wset'):  # Windows
+            return info.peak_wset / 1024**2
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024**2 if sys.platform == 'darwin' else peak / 1024
+    return None
+
+
+class _MemorySampler:
+    """Thread d'échantillonnage du RSS: pic de chaque étape ouverte."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.peaks = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def open(self, token):
+        with self._lock:
+            self.peaks[token] = rss_mb()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def close(self, token):
+        with self._lock:
+            rss = rss_mb()
+            return max(self.peaks.pop(token), rss)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            rss = rss_mb()
+            with self._lock:
+                for token, peak in self.peaks.items():
+                    if rss > peak:
+                        self.peaks[token] = rss
+
+
+class RunReport:
+    """
+    Étapes mesurées d'un lancement de script.
+
+    Args:
+        name: nom du script / run
+        sample_interval: période d'échantillonnage du RSS (secondes)
+    """
+
+    def __init__(self, name, sample_interval=0.05):
+        self.name = name
+        self.started = datetime.now()
+        self.spans = []
+        self._t0 = time.perf_counter()
+        self._cpu0 = time.process_time()
+        self._local = threading.local()
+        self._stage = None
+        self._sampler = _MemorySampler(sample_interval) if USE_PSUTIL else None
+
+    @property
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def _open(self, name, meta):
+        path = "/".join([s['path'] for s in self._stack[-1:]] + [name])
+        span = {'name': name, 'path': path, 'start_s': time.perf_counter() - self._t0,
+                'wall_s': None, 'cpu_s': None, 'rss_start_mb': rss_mb(), 'rss_end_mb': None,
+                'peak_rss_mb': None, **meta,
+                '_t': time.perf_counter(), '_cpu': time.process_time()}
+        if self._sampler is not None:
+            self._sampler.open(id(span))
+        self._stack.append(span)
+        return span
+
+    def _close(self, span):
+        span['wall_s'] = time.perf_counter() - span.pop('_t')
+        span['cpu_s'] = time.process_time() - span.pop('_cpu')
+        span['rss_end_mb'] = rss_mb()
+        span['peak_rss_mb'] = (self._sampler.close(id(span)) if self._sampler is not None
+                               else peak_rss_mb())
+        self._stack.remove(span)
+        self.spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name, **meta):
+        """Mesure un bloc (imbricable: chemin parent/enfant)."""
+        span = self._open(name, meta)
+        try:
+            yield span
+        finally:
+            self._close(span)
+
+    def stage(self, name, **meta):
+        """Termine l'étape à plat en cours et en commence une nouvelle."""
+        if self._stage is not None:
+            self._close(self._stage)
+        self._stage = self._open(name, meta)
+        return self._stage
+
+    def finish(self):
+        """Termine l'étape à plat en cours."""
+        if self._stage is not None:
+            self._close(self._stage)
+            self._stage = None
+
+    def add_spans(self, spans, parent=None):
+        """
+        Rattache les étapes mesurées ailleurs (worker, fenêtre) sous `parent`.
+
+        Leurs débuts sont recalés pour que la dernière se termine à la fin du
+        span `parent` s'il est déjà mesuré, sinon maintenant.
+        """
+        end = max((s['start_s'] + s['wall_s'] for s in spans), default=0.0)
+        closed = [s for s in self.spans if parent and s['path'] == parent]
+        now = (closed[-1]['start_s'] + closed[-1]['wall_s'] if closed
+               else time.perf_counter() - self._t0)
+        offset = now - end
+        for span in spans:
+            span = dict(span, start_s=span['start_s'] + offset)
+            if parent:
+                span['path'] = f"{parent}/{span['path']}"
+            self.spans.append(span)
+
+    def summary(self):
+        """Rapport complet (dict JSON)."""
+        self.finish()
+        return {
+            'name': self.name,
+            'started': self.started.strftime('%Y-%m-%d %H:%M:%S'),
+            'wall_s': time.perf_counter() - self._t0,
+            'cpu_s': time.process_time() - self._cpu0,
+            'peak_rss_mb': peak_rss_mb(),
+            'host': {'platform': platform.platform(), 'python': platform.python_version(),
+                     'cpu_count': os.cpu_count()},
+            'spans': sorted(self.spans, key=lambda s: s['start_s']),
+        }
+
+    def format(self, previous=None):
+        """Tableau texte des étapes (+ écart de durée vs rapport précédent)."""
+        before = {s['path']: s['wall_s'] for s in (previous or {}).get('spans', [])}
+        lines = [f"{'Étape':<36} {'Réel':>9} {'CPU':>9} {'Pic RSS':>10}" + ("  vs précédent" if before else "")]
+        for s in sorted(self.spans, key=lambda s: s['start_s']):
+            peak = f"{s['peak_rss_mb']:.0f} Mo" if s.get('peak_rss_mb') is not None else "-"
+            line = f"{s['path']:<36} {s['wall_s']:>8.1f}s {s['cpu_s']:>8.1f}s {peak:>10}"
+            if before.get(s['path']):
+                line += f"  {(s['wall_s'] / before[s['path']] - 1) * 100:+.0f}%"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def save(self, artifact_path, tag=None, verbose=True):
+        """
+        Écrit le rapport à côté d'un artefact et l'ajoute à l'historique du dossier.
+
+        Args:
+            artifact_path: modèle / fichier produit (ou utilisé) par le run
+            tag: suffixe du rapport quand le run ne produit pas l'artefact
+                 (ex: backtest d'un modèle -> modele_backtest_run_report.json)
+            verbose: afficher le tableau (comparé au rapport précédent)
+
+        Returns:
+            chemin du rapport JSON
+        """
+        summary = self.summary()
+        path = report_path(artifact_path, tag)
+        previous = load_report(path)
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+
+        history = os.path.join(os.path.dirname(os.path.abspath(path)), HISTORY_FILE)
+        with open(history, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({**summary, 'artifact': os.path.basename(artifact_path)},
+                               ensure_ascii=False, default=str) + "\n")
+
+        if verbose:
+            print(f"\nInstrumentation ({summary['wall_s']:.1f}s, CPU {summary['cpu_s']:.1f}s):")
+            print(self.format(previous))
+            print(f"✅ Rapport d'exécution: {path}")
+        return path
+
+
+def report_path(artifact_path, tag=None):
+    """Chemin du rapport associé à un artefact (modele.pkl -> modele_run_report.json)."""
+    base = os.path.splitext(artifact_path)[0]
+    return f"{base}_{tag}_run_report.json" if tag else base + "_run_report.json"
+
+
+def load_report(path):
+    """Rapport JSON existant (None si absent)."""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
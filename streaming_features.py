@@ -0,0 +1,781 @@
+# -*- coding: utf-8 -*-
+"""
+Calcul incrémental des indicateurs et features (O(1) par barre, temps réel)
+Version 1.0 - 2026-10-18
+
+OBJECTIF:
+- Éviter de recalculer EMA/RSI/ATR/ADX/MACD/Bollinger/rolling/lags sur tout
+  l'historique à chaque nouvelle barre H1
+- Un état par indicateur (récurrence EMA, lissage de Wilder, sommes glissantes,
+  buffers circulaires); update(bar) renvoie le vecteur de features de la barre
+- Mêmes résultats que le calcul batch:
+  * IndicatorStream        -> merge_yahoo_data.calculate_indicators (branche TA-Lib)
+  * EngineeredFeatureStream -> feature_engineering_advanced.py
+  * V6FeatureStream        -> create_advanced_features de train_ensemble_v6_OPTIMIZED.py
+
+Les primitives reproduisent les récurrences de TA-Lib (TA_SMA, TA_EMA, TA_RSI,
+TA_ATR, TA_ADX, TA_PLUS_DI/MINUS_DI, TA_STOCH, TA_BBANDS, TA_CCI) et les
+noyaux des fenêtres pandas (rolling mean/std compensés, max/min, median,
+shift, pct_change).
+
+NOTE:
+- Identique au bit près: fenêtres pandas, SMA/MACD, ADX/DI, CCI et donc
+  feature_engineering_advanced / V6 à partir des mêmes colonnes de base
+- EMA/RSI/ATR/STOCH/BBANDS: écart relatif <= 1e-12 avec le binaire TA-Lib
+  (contraction FMA du compilateur C, dépend de la compilation de TA-Lib)
+- Valeurs NaN en début de flux exactement comme le batch (périodes de chauffe)
+- CCI: écart moyen absolu recalculé sur la fenêtre (O(période), comme TA-Lib)
+- V6FeatureStream: le batch fait ffill puis bfill; en flux seul le ffill est
+  possible, les toutes premières barres (avant la 1re valeur) valent 0
+- Pour démarrer en live: rejouer l'historique récent (replay) puis update()
+"""
+
+import math
+from collections import deque
+from bisect import insort, bisect_left
+
+import numpy as np
+import pandas as pd
+
+NAN = float('nan')
+
+
+def _is_zero(v):
+    """TA_IS_ZERO de TA-Lib."""
+    return -0.00000001 < v < 0.00000001
+
+
+def _signal(a, b):
+    """np.where(a > b, 1, np.where(a < b, -1, 0)) (NaN -> 0)."""
+    return 1 if a > b else (-1 if a < b else 0)
+
+
+# ==================== FENETRES PANDAS ====================
+
+class Lag:
+    """Series.shift(n)."""
+    __slots__ = ('buf',)
+
+    def __init__(self, n):
+        self.buf = deque([NAN] * n, maxlen=n)
+
+    def update(self, x):
+        out = self.buf[0]
+        self.buf.append(x)
+        return out
+
+
+class RollingMean:
+    """Series.rolling(window).mean() (somme compensée de pandas)."""
+    __slots__ = ('window', 'buf', 'nobs', 'sum_x', 'comp_add', 'comp_remove',
+                 'neg_ct', 'n_same', 'prev_value')
+
+    def __init__(self, window):
+        self.window = window
+        self.buf = deque()
+        self.nobs = 0
+        self.sum_x = 0.0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.neg_ct = 0
+        self.n_same = 0
+        self.prev_value = NAN
+
+    def update(self, x):
+        # Retrait de la valeur sortante puis ajout (ordre de roll_mean)
+        if len(self.buf) == self.window:
+            old = self.buf.popleft()
+            if old == old:
+                self.nobs -= 1
+                y = -old - self.comp_remove
+                t = self.sum_x + y
+                self.comp_remove = t - self.sum_x - y
+                self.sum_x = t
+                if math.copysign(1.0, old) < 0:
+                    self.neg_ct -= 1
+        self.buf.append(x)
+        if x == x:
+            self.nobs += 1
+            y = x - self.comp_add
+            t = self.sum_x + y
+            self.comp_add = t - self.sum_x - y
+            self.sum_x = t
+            if math.copysign(1.0, x) < 0:
+                self.neg_ct += 1
+            self.n_same = self.n_same + 1 if x == self.prev_value else 1
+            self.prev_value = x
+
+        if self.nobs < self.window:
+            return NAN
+        result = self.sum_x / self.nobs
+        if self.n_same >= self.nobs:
+            result = self.prev_value
+        elif self.neg_ct == 0 and result < 0:
+            result = 0.0
+        elif self.neg_ct == self.nobs and result > 0:
+            result = 0.0
+        return result
+
+
+class RollingStd:
+    """Series.rolling(window).std() (Welford compensé de pandas, ddof=1)."""
+    __slots__ = ('window', 'buf', 'nobs', 'mean_x', 'ssqdm_x', 'comp_add', 'comp_remove',
+                 'unstable')
+
+    # Recalcul complet si l'annulation catastrophique menace (roll_var de pandas)
+    INV_COND_TOL = np.finfo(np.float64).eps * 1e3
+
+    def __init__(self, window):
+        self.window = window
+        self.buf = deque()
+        self.nobs = 0
+        self.mean_x = 0.0
+        self.ssqdm_x = 0.0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.unstable = False
+
+    def _add(self, x):
+        if x != x:
+            return
+        prev_m2 = self.ssqdm_x
+        self.nobs += 1
+        prev_mean = self.mean_x - self.comp_add
+        y = x - self.comp_add
+        t = y - self.mean_x
+        self.comp_add = t + self.mean_x - y
+        self.mean_x = self.mean_x + t / self.nobs
+        self.ssqdm_x = self.ssqdm_x + (x - prev_mean) * (x - self.mean_x)
+        if prev_m2 * self.INV_COND_TOL > self.ssqdm_x:
+            self.unstable = True
+
+    def _remove(self, x):
+        if x != x:
+            return
+        prev_m2 = self.ssqdm_x
+        self.nobs -= 1
+        if self.nobs:
+            prev_mean = self.mean_x - self.comp_remove
+            y = x - self.comp_remove
+            t = y - self.mean_x
+            self.comp_remove = t + self.mean_x - y
+            self.mean_x = self.mean_x - t / self.nobs
+            self.ssqdm_x = self.ssqdm_x - (x - prev_mean) * (x - self.mean_x)
+            if prev_m2 * self.INV_COND_TOL > self.ssqdm_x:
+                self.unstable = True
+        else:
+            self.mean_x = 0.0
+            self.ssqdm_x = 0.0
+            self.unstable = False
+
+    def update(self, x):
+        if len(self.buf) == self.window:
+            self._remove(self.buf.popleft())
+        self.buf.append(x)
+        self._add(x)
+
+        if self.unstable:
+            self.nobs = 0
+            self.mean_x = self.ssqdm_x = self.comp_add = self.comp_remove = 0.0
+            for v in self.buf:
+                self._add(v)
+            self.unstable = False
+
+        if self.nobs < self.window or self.nobs <= 1:
+            return NAN
+        var = self.ssqdm_x / (self.nobs - 1)
+        return math.sqrt(var) if var >= 0 else 0.0
+
+
+class RollingMax:
+    """Series.rolling(window).max() (deque monotone)."""
+    __slots__ = ('window', 'count', 'nobs', 'buf', 'candidates', 'sign')
+
+    def __init__(self, window, sign=1.0):
+        self.window = window
+        self.count = 0
+        self.nobs = 0
+        self.buf = deque()
+        self.candidates = deque()   # (index, sign * valeur) décroissants
+        self.sign = sign
+
+    def update(self, x):
+        i = self.count
+        self.count += 1
+        if len(self.buf) == self.window:
+            old = self.buf.popleft()
+            if old == old:
+                self.nobs -= 1
+        self.buf.append(x)
+        while self.candidates and self.candidates[0][0] <= i - self.window:
+            self.candidates.popleft()
+        if x == x:
+            self.nobs += 1
+            v = self.sign * x
+            while self.candidates and self.candidates[-1][1] <= v:
+                self.candidates.pop()
+            self.candidates.append((i, v))
+        if self.nobs < self.window:
+            return NAN
+        return self.sign * self.candidates[0][1]
+
+
+class RollingMin(RollingMax):
+    """Series.rolling(window).min()."""
+    __slots__ = ()
+
+    def __init__(self, window):
+        super().__init__(window, sign=-1.0)
+
+
+class RollingMedian:
+    """Series.rolling(window).median() (liste triée)."""
+    __slots__ = ('window', 'buf', 'sorted_values')
+
+    def __init__(self, window):
+        self.window = window
+        self.buf = deque()
+        self.sorted_values = []
+
+    def update(self, x):
+        if len(self.buf) == self.window:
+            old = self.buf.popleft()
+            if old == old:
+                del self.sorted_values[bisect_left(self.sorted_values, old)]
+        self.buf.append(x)
+        if x == x:
+            insort(self.sorted_values, x)
+        nobs = len(self.sorted_values)
+        if nobs < self.window:
+            return NAN
+        mid = nobs // 2
+        if nobs % 2 == 1:
+            return self.sorted_values[mid]
+        return (self.sorted_values[mid] + self.sorted_values[mid - 1]) / 2
+
+
+# ==================== INDICATEURS TA-LIB ====================
+
+class TaSMA:
+    """ta.SMA: somme glissante (ajout, sortie, retrait) comme TA_INT_SMA."""
+    __slots__ = ('period', 'buf', 'total')
+
+    def __init__(self, period):
+        self.period = period
+        self.buf = deque()
+        self.total = 0.0
+
+    def update(self, x):
+        # NaN de tête ignorés (talib démarre au 1er indice valide)
+        if x != x and not self.buf:
+            return NAN
+        self.buf.append(x)
+        self.total += x
+        if len(self.buf) < self.period:
+            return NAN
+        out = self.total / self.period
+        self.total -= self.buf.popleft()
+        return out
+
+
+class TaEMA:
+    """ta.EMA: amorçage par la moyenne simple des `period` premières valeurs."""
+    __slots__ = ('period', 'k', 'count', 'seed', 'prev')
+
+    def __init__(self, period):
+        self.period = period
+        self.k = 2.0 / (period + 1)
+        self.count = 0
+        self.seed = 0.0
+        self.prev = NAN
+
+    def update(self, x):
+        if x != x and self.count == 0:
+            return NAN
+        self.count += 1
+        if self.count < self.period:
+            self.seed += x
+            return NAN
+        if self.count == self.period:
+            self.seed += x
+            self.prev = self.seed / self.period
+        else:
+            self.prev = ((x - self.prev) * self.k) + self.prev
+        return self.prev
+
+
+class TaRSI:
+    """ta.RSI: lissage de Wilder, 100 * gain / (gain + perte)."""
+    __slots__ = ('period', 'count', 'prev_value', 'prev_gain', 'prev_loss')
+
+    def __init__(self, period):
+        self.period = period
+        self.count = 0
+        self.prev_value = NAN
+        self.prev_gain = 0.0
+        self.prev_loss = 0.0
+
+    def update(self, x):
+        if x != x and self.count == 0:
+            return NAN
+        self.count += 1
+        if self.count == 1:
+            self.prev_value = x
+            return NAN
+        diff = x - self.prev_value
+        self.prev_value = x
+        n = self.period
+        if self.count <= n + 1:
+            if diff < 0:
+                self.prev_loss -= diff
+            else:
+                self.prev_gain += diff
+            if self.count < n + 1:
+                return NAN
+        else:
+            self.prev_loss *= (n - 1)
+            self.prev_gain *= (n - 1)
+            if diff < 0:
+                self.prev_loss -= diff
+            else:
+                self.prev_gain += diff
+        self.prev_loss /= n
+        self.prev_gain /= n
+        total = self.prev_gain + self.prev_loss
+        return 100.0 * (self.prev_gain / total) if not _is_zero(total) else 0.0
+
+
+def _true_range(high, low, prev_close):
+    """TRUE_RANGE de TA-Lib."""
+    out = high - low
+    v = abs(prev_close - high)
+    if v > out:
+        out = v
+    v = abs(low - prev_close)
+    if v > out:
+        out = v
+    return out
+
+
+class TaATR:
+    """ta.ATR: moyenne simple des `period` premiers TR puis lissage de Wilder."""
+    __slots__ = ('period', 'count', 'prev_close', 'tr_sum', 'prev_atr')
+
+    def __init__(self, period):
+        self.period = period
+        self.count = 0
+        self.prev_close = NAN
+        self.tr_sum = 0.0
+        self.prev_atr = NAN
+
+    def update(self, high, low, close):
+        self.count += 1
+        if self.count == 1:
+            self.prev_close = close
+            return NAN
+        tr = _true_range(high, low, self.prev_close)
+        self.prev_close = close
+        n = self.period
+        if self.count <= n + 1:
+            self.tr_sum += tr
+            if self.count < n + 1:
+                return NAN
+            self.prev_atr = self.tr_sum / n
+        else:
+            self.prev_atr *= n - 1
+            self.prev_atr += tr
+            self.prev_atr /= n
+        return self.prev_atr
+
+
+class TaDMI:
+    """ta.ADX + ta.PLUS_DI + ta.MINUS_DI (mêmes récurrences que TA-Lib)."""
+    __slots__ = ('period', 'count', 'prev_high', 'prev_low', 'prev_close',
+                 'plus_dm', 'minus_dm', 'tr', 'sum_dx', 'adx')
+
+    def __init__(self, period):
+        self.period = period
+        self.count = 0
+        self.prev_high = NAN
+        self.prev_low = NAN
+        self.prev_close = NAN
+        self.plus_dm = 0.0
+        self.minus_dm = 0.0
+        self.tr = 0.0
+        self.sum_dx = 0.0
+        self.adx = NAN
+
+    def update(self, high, low, close):
+        """Returns: (adx, di_plus, di_minus)"""
+        self.count += 1
+        n = self.period
+        if self.count == 1:
+            self.prev_high, self.prev_low, self.prev_close = high, low, close
+            return NAN, NAN, NAN
+
+        diff_p = high - self.prev_high
+        diff_m = self.prev_low - low
+        self.prev_high, self.prev_low = high, low
+        tr = _true_range(high, low, self.prev_close)
+        self.prev_close = close
+
+        bar = self.count - 1    # indice de la barre (0 = première)
+        if bar < n:
+            # Accumulation initiale (n-1 barres)
+            if diff_m > 0 and diff_p < diff_m:
+                self.minus_dm += diff_m
+            elif diff_p > 0 and diff_p > diff_m:
+                self.plus_dm += diff_p
+            self.tr += tr
+            return NAN, NAN, NAN
+
+        self.minus_dm -= self.minus_dm / n
+        self.plus_dm -= self.plus_dm / n
+        if diff_m > 0 and diff_p < diff_m:
+            self.minus_dm += diff_m
+        elif diff_p > 0 and diff_p > diff_m:
+            self.plus_dm += diff_p
+        self.tr = self.tr - (self.tr / n) + tr
+
+        dx = NAN
+        if not _is_zero(self.tr):
+            minus_di = 100.0 * (self.minus_dm / self.tr)
+            plus_di = 100.0 * (self.plus_dm / self.tr)
+            total = minus_di + plus_di
+            if not _is_zero(total):
+                dx = 100.0 * (abs(minus_di - plus_di) / total)
+        else:
+            minus_di = plus_di = 0.0
+
+        if bar < 2 * n - 1:
+            if dx == dx:
+                self.sum_dx += dx
+            return NAN, plus_di, minus_di
+        if bar == 2 * n - 1:
+            if dx == dx:
+                self.sum_dx += dx
+            self.adx = self.sum_dx / n
+        elif dx == dx:
+            self.adx = ((self.adx * (n - 1)) + dx) / n
+        return self.adx, plus_di, minus_di
+
+
+class TaStoch:
+    """ta.STOCH (fastk, slowk SMA, slowd SMA)."""
+    __slots__ = ('highs', 'lows', 'slow_k', 'slow_d', 'count', 'lookback')
+
+    def __init__(self, fastk_period=14, slowk_period=3, slowd_period=3):
+        self.highs = RollingMax(fastk_period)
+        self.lows = RollingMin(fastk_period)
+        self.slow_k = TaSMA(slowk_period)
+        self.slow_d = TaSMA(slowd_period)
+        self.count = 0
+        self.lookback = (fastk_period - 1) + (slowk_period - 1) + (slowd_period - 1)
+
+    def update(self, high, low, close):
+        """Returns: (slowk, slowd)"""
+        highest = self.highs.update(high)
+        lowest = self.lows.update(low)
+        self.count += 1
+        if highest != highest:
+            return NAN, NAN
+        diff = (highest - lowest) / 100.0
+        fast_k = (close - lowest) / diff if diff != 0.0 else 0.0
+        k = self.slow_k.update(fast_k)
+        d = self.slow_d.update(k) if k == k else NAN
+        if self.count <= self.lookback:
+            return NAN, NAN
+        return k, d
+
+
+class TaBBands:
+    """ta.BBANDS (SMA, écart-type population à partir des sommes de carrés)."""
+    __slots__ = ('period', 'nbdev', 'buf', 'total', 'total2')
+
+    def __init__(self, period=20, nbdev=2.0):
+        self.period = period
+        self.nbdev = nbdev
+        self.buf = deque()
+        self.total = 0.0
+        self.total2 = 0.0
+
+    def update(self, x):
+        """Returns: (upper, middle, lower)"""
+        if x != x and not self.buf:
+            return NAN, NAN, NAN
+        self.buf.append(x)
+        self.total += x
+        self.total2 += x * x
+        if len(self.buf) < self.period:
+            return NAN, NAN, NAN
+        middle = self.total / self.period
+        mean2 = self.total2 / self.period
+        old = self.buf.popleft()
+        self.total -= old
+        self.total2 -= old * old
+        mean2 -= middle * middle
+        std = math.sqrt(mean2) if not mean2 < 0.00000001 else 0.0
+        dev = std * self.nbdev
+        return middle + dev, middle, middle - dev
+
+
+class TaCCI:
+    """ta.CCI (buffer circulaire des prix typiques)."""
+    __slots__ = ('period', 'circ', 'count')
+
+    def __init__(self, period=20):
+        self.period = period
+        self.circ = [0.0] * period
+        self.count = 0
+
+    def update(self, high, low, close):
+        n = self.period
+        last = (high + low + close) / 3
+        self.circ[self.count % n] = last
+        self.count += 1
+        if self.count < n:
+            return NAN
+        average = 0.0
+        for v in self.circ:
+            average += v
+        average /= n
+        mad = 0.0
+        for v in self.circ:
+            mad += abs(v - average)
+        dev = last - average
+        if dev != 0.0 and mad != 0.0:
+            return dev / (0.015 * (mad / n))
+        return 0.0
+
+
+# ==================== FLUX DE FEATURES ====================
+
+class IndicatorStream:
+    """
+    Indicateurs de merge_yahoo_data.calculate_indicators (branche TA-Lib), barre par barre.
+
+    update(bar) avec bar['high'], bar['low'], bar['close'] -> dict {prefix+colonne: valeur}
+    """
+
+    def __init__(self, prefix=''):
+        self.prefix = prefix
+        self.ema21, self.ema55 = TaEMA(21), TaEMA(55)
+        self.sma20, self.sma35 = TaSMA(20), TaSMA(35)
+        self.rsi14, self.rsi28 = TaRSI(14), TaRSI(28)
+        self.atr14, self.atr28 = TaATR(14), TaATR(28)
+        self.macd_signal = TaSMA(15)
+        self.dmi = TaDMI(14)
+        self.stoch = TaStoch(14, 3, 3)
+        self.bbands = TaBBands(20, 2.0)
+        self.cci = TaCCI(20)
+        self.prev_close = Lag(1)
+        self.volatility = RollingStd(20)
+
+    def update(self, bar):
+        high, low, close = float(bar['high']), float(bar['low']), float(bar['close'])
+        p = self.prefix
+
+        ema21 = self.ema21.update(close)
+        ema55 = self.ema55.update(close)
+        sma20 = self.sma20.update(close)
+        sma35 = self.sma35.update(close)
+        # MACD custom (SMA-based): fast = SMA20, slow = SMA35
+        macd = sma20 - sma35
+        signal = self.macd_signal.update(macd)
+        adx, di_plus, di_minus = self.dmi.update(high, low, close)
+        stoch_k, stoch_d = self.stoch.update(high, low, close)
+        upper, middle, lower = self.bbands.update(close)
+        returns = close / self.prev_close.update(close) - 1
+
+        out = {
+            f'{p}ema21': ema21,
+            f'{p}ema55': ema55,
+            f'{p}sma20': sma20,
+            f'{p}sma35': sma35,
+            f'{p}rsi14': self.rsi14.update(close),
+            f'{p}rsi28': self.rsi28.update(close),
+            f'{p}atr14': self.atr14.update(high, low, close),
+            f'{p}atr28': self.atr28.update(high, low, close),
+            f'{p}macd': macd,
+            f'{p}macd_signal': signal,
+            f'{p}macd_hist': macd - signal,
+            f'{p}adx14': adx,
+            f'{p}di_plus': di_plus,
+            f'{p}di_minus': di_minus,
+            f'{p}stoch_k': stoch_k,
+            f'{p}stoch_d': stoch_d,
+            f'{p}bb_upper': upper,
+            f'{p}bb_middle': middle,
+            f'{p}bb_lower': lower,
+            f'{p}bb_width': upper - lower,
+            f'{p}cci20': self.cci.update(high, low, close),
+            f'{p}volatility': self.volatility.update(returns) * np.sqrt(24 * 365),
+        }
+        out[f'{p}signal_ema'] = _signal(ema21, ema55)
+        out[f'{p}signal_macd'] = _signal(out[f'{p}macd_hist'], 0)
+        out[f'{p}signal_price'] = _signal(close, ema21)
+        return out
+
+
+# Mêmes listes que feature_engineering_advanced.py
+IMPORTANT_FEATURES = [
+    'rsi28', 'rsi14', 'volatility', 'macd', 'macd_hist',
+    'vix_macd_signal', 'vix_atr28', 'dxy_volatility', 'dxy_macd_hist',
+    'us10y_volatility', 'atr14', 'atr28'
+]
+LAGS = [1, 3, 7, 24]
+ROLL_WINDOWS = [5, 10, 20]
+INTERACTIONS = [
+    ('rsi28', 'volatility'),
+    ('rsi28', 'vix_macd_signal'),
+    ('macd_hist', 'dxy_macd_hist'),
+    ('volatility', 'vix_atr28'),
+    ('atr14', 'volatility'),
+    ('rsi28', 'macd_hist')
+]
+
+
+class EngineeredFeatureStream:
+    """
+    Features de feature_engineering_advanced.py, barre par barre.
+
+    update(bar) avec les colonnes du dataset COMPLETE -> dict des nouvelles features
+    (inf remplacé par NaN; le batch supprime les lignes contenant un NaN).
+    Les features dont la colonne source est absente de la 1re barre sont ignorées.
+    """
+
+    def __init__(self):
+        self.columns = None
+
+    def _setup(self, bar):
+        self.columns = set(bar)
+        present = [f for f in IMPORTANT_FEATURES if f in self.columns]
+        self.lags = [(f, lag, Lag(lag)) for f in present for lag in LAGS]
+        self.rolls = [(f, w, RollingMean(w), RollingStd(w))
+                      for f in IMPORTANT_FEATURES[:8] if f in self.columns for w in ROLL_WINDOWS]
+        self.interactions = [(a, b) for a, b in INTERACTIONS if a in self.columns and b in self.columns]
+        self.roc = [(period, Lag(period)) for period in [3, 7, 14]]
+        self.vol_mean = RollingMean(20)
+        self.vol_median = RollingMedian(50)
+
+    def update(self, bar):
+        if self.columns is None:
+            self._setup(bar)
+        out = {}
+
+        for f, lag, state in self.lags:
+            out[f"{f}_lag{lag}"] = state.update(float(bar[f]))
+        for f, w, mean, std in self.rolls:
+            x = float(bar[f])
+            out[f"{f}_roll_mean_{w}"] = mean.update(x)
+            out[f"{f}_roll_std_{w}"] = std.update(x)
+        for a, b in self.interactions:
+            out[f"{a}_x_{b}"] = float(bar[a]) * float(bar[b])
+
+        hour, dow, month = bar['hour'], bar['day_of_week'], bar['month']
+        out['hour_sin'] = np.sin(2 * np.pi * hour / 24)
+        out['hour_cos'] = np.cos(2 * np.pi * hour / 24)
+        out['day_sin'] = np.sin(2 * np.pi * dow / 7)
+        out['day_cos'] = np.cos(2 * np.pi * dow / 7)
+        out['month_sin'] = np.sin(2 * np.pi * month / 12)
+        out['month_cos'] = np.cos(2 * np.pi * month / 12)
+        out['is_london_session'] = int(8 <= hour < 16)
+        out['is_us_session'] = int(13 <= hour < 21)
+        out['is_asia_session'] = int(0 <= hour < 8)
+        out['is_friday'] = int(dow == 5)
+        out['is_monday'] = int(dow == 1)
+
+        close = float(bar['close'])
+        ema21, ema55, smma50 = float(bar['ema21']), float(bar['ema55']), float(bar['smma50'])
+        for period, state in self.roc:
+            out[f'roc_{period}'] = (close / state.update(close) - 1) * 100
+        out['dist_ema21'] = (close - ema21) / ema21 * 100
+        out['dist_ema55'] = (close - ema55) / ema55 * 100
+        out['dist_smma50'] = (close - smma50) / smma50 * 100
+        volatility = float(bar['volatility'])
+        out['volatility_ratio'] = volatility / self.vol_mean.update(volatility)
+
+        out['trend_strength'] = abs(ema21 - ema55) / ema55 * 100
+        out['high_vol_regime'] = int(volatility > self.vol_median.update(volatility))
+        rsi28 = float(bar['rsi28'])
+        out['rsi28_oversold'] = int(rsi28 < 30)
+        out['rsi28_overbought'] = int(rsi28 > 70)
+        out['rsi28_neutral'] = int(30 <= rsi28 <= 70)
+
+        for k, v in out.items():
+            if v in (np.inf, -np.inf):
+                out[k] = NAN
+        return out
+
+
+class V6FeatureStream:
+    """
+    Features avancées de train_ensemble_v6_OPTIMIZED.create_advanced_features, barre par barre.
+
+    update(bar) avec les colonnes de base V6 (+ high/low) -> dict des features avancées.
+    fill=True: NaN remplacés par la dernière valeur connue, sinon 0 (ffill + fillna(0)).
+    """
+
+    # Features du modèle produites par le flux (FEATURES_ADVANCED de V6)
+    FEATURES = (
+        'atr_ratio_h4_h1', 'volume_spike', 'price_distance_ema21', 'price_distance_ema55',
+        'rsi_momentum', 'macd_momentum', 'adx_strong_trend', 'dxy_vix_product',
+        'dxy_momentum', 'vix_momentum', 'resistance_distance', 'support_distance',
+        'ema_cross_strength', 'smma_alignment', 'rsi_extreme_high', 'rsi_extreme_low',
+    )
+
+    def __init__(self, fill=True):
+        self.fill = fill
+        self.atr_mean = RollingMean(96)
+        self.volume_mean = RollingMean(20)
+        self.prev_rsi = Lag(1)
+        self.prev_macd = Lag(1)
+        self.prev_dxy = Lag(1)
+        self.prev_vix = Lag(1)
+        self.high_max = RollingMax(20)
+        self.low_min = RollingMin(20)
+        self.last = {}
+
+    def update(self, bar):
+        g = lambda col: float(bar[col])
+        close, atr14, volume = g('close'), g('atr14'), g('volume')
+        ema21, ema55 = g('ema21'), g('ema55')
+        rsi_h4, macd_hist, dxy, vix = g('rsi_h4'), g('macd_hist'), g('DXY'), g('VIX')
+
+        out = {}
+        out['atr_ratio_h4_h1'] = atr14 / (self.atr_mean.update(atr14) + 1e-10)
+        out['volume_ma20'] = self.volume_mean.update(volume)
+        out['volume_spike'] = volume / (out['volume_ma20'] + 1e-10)
+        out['price_distance_ema21'] = (close - ema21) / close
+        out['price_distance_ema55'] = (close - ema55) / close
+        out['rsi_momentum'] = rsi_h4 - self.prev_rsi.update(rsi_h4)
+        out['macd_momentum'] = macd_hist - self.prev_macd.update(macd_hist)
+        out['adx_strong_trend'] = int(g('adx14') > 25)
+        out['dxy_vix_product'] = dxy * vix
+        out['dxy_momentum'] = dxy - self.prev_dxy.update(dxy)
+        out['vix_momentum'] = vix - self.prev_vix.update(vix)
+        out['resistance_distance'] = (self.high_max.update(g('high')) - close) / close
+        out['support_distance'] = (close - self.low_min.update(g('low'))) / close
+        out['ema_cross_strength'] = (ema21 - ema55) / close
+        out['smma_alignment'] = int(int(g('smma50') > g('smma200')) == g('trend_h4'))
+        out['rsi_extreme_high'] = int(rsi_h4 > 70)
+        out['rsi_extreme_low'] = int(rsi_h4 < 30)
+
+        if self.fill:
+            for k, v in out.items():
+                if v != v:
+                    out[k] = self.last.get(k, 0.0)
+                else:
+                    self.last[k] = v
+        return out
+
+
+def replay(stream, df):
+    """
+    Passe un historique dans un flux (chauffe avant le live, ou comparaison au batch).
+
+    Returns:
+        DataFrame des sorties, même index que df
+    """
+    rows = [stream.update(bar) for bar in df.to_dict('records')]
+    return pd.DataFrame(rows, index=df.index)
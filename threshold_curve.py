@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Courbe de threshold en O(N log N) (tri unique + sommes cumulées)
+Version 1.0 - 2026-10-18
+
+OBJECTIF:
+- Remplacer les boucles "for threshold in np.arange(...)" qui refiltrent les
+  données et recalculent les métriques à chaque seuil
+- Trades, win rate, expectancy, Sharpe, precision, recall, F1 pour TOUS les
+  seuils distincts en un seul passage
+- Seuil optimal sous contraintes (win rate minimum, trades minimum)
+
+Convention: un signal est pris si proba >= threshold.
+P&L par trade: win_pnl si y == 1, sinon loss_pnl (Sharpe = moyenne / (écart-type + 1e-10),
+écart-type population comme np.std).
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def threshold_curve(y_proba, y_true, win_pnl=1.0, loss_pnl=-1.0):
+    """
+    Métriques pour chaque seuil distinct (probabilités prédites).
+
+    Args:
+        y_proba: probabilités prédites
+        y_true: labels réels (1 = WIN, autre = LOSS)
+        win_pnl: P&L d'un trade gagnant (ex: risk * RR)
+        loss_pnl: P&L d'un trade perdant (ex: -risk)
+
+    Returns:
+        DataFrame trié par threshold croissant (threshold, n_trades, wins, losses,
+        win_rate, precision, recall, f1, expectancy, sharpe, total_pnl)
+    """
+    y_proba = np.asarray(y_proba, dtype=np.float64)
+    y_true = np.asarray(y_true) == 1
+
+    # Tri décroissant: les k premiers = signaux au seuil proba[k-1]
+    order = np.argsort(-y_proba, kind='stable')
+    proba_sorted = y_proba[order]
+    wins_cum = np.cumsum(y_true[order])
+
+    # Dernière position de chaque valeur distincte
+    last = np.flatnonzero(np.diff(proba_sorted, append=-np.inf) != 0)
+
+    n_trades = last + 1
+    wins = wins_cum[last]
+    losses = n_trades - wins
+    total_positives = y_true.sum()
+
+    win_rate = wins / n_trades
+    recall = wins / total_positives if total_positives > 0 else np.zeros(len(last))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        f1 = np.where(win_rate + recall > 0, 2 * win_rate * recall / (win_rate + recall), 0.0)
+
+    total_pnl = wins * win_pnl + losses * loss_pnl
+    expectancy = total_pnl / n_trades
+    # Variable à deux valeurs: std = |win - loss| * sqrt(p * (1 - p))
+    std = abs(win_pnl - loss_pnl) * np.sqrt(win_rate * (1 - win_rate))
+    sharpe = expectancy / (std + 1e-10)
+
+    curve = pd.DataFrame({
+        'threshold': proba_sorted[last],
+        'n_trades': n_trades,
+        'wins': wins,
+        'losses': losses,
+        'win_rate': win_rate,
+        'precision': win_rate,
+        'recall': recall,
+        'f1': f1,
+        'expectancy': expectancy,
+        'sharpe': sharpe,
+        'total_pnl': total_pnl
+    })
+    return curve.iloc[::-1].reset_index(drop=True)
+
+
+def sample_curve(curve, thresholds):
+    """
+    Métriques de la courbe sur une grille de seuils (ex: np.arange(0.50, 0.71, 0.01)).
+
+    Seuil t -> premier seuil distinct >= t (mêmes signaux que proba >= t).
+    Les seuils sans aucun trade sont ignorés.
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    pos = np.searchsorted(curve['threshold'].values, thresholds, side='left')
+    valid = pos < len(curve)
+
+    sampled = curve.iloc[pos[valid]].reset_index(drop=True)
+    sampled['threshold'] = thresholds[valid]
+    return sampled
+
+
+def find_optimal_threshold(curve, metric='sharpe', min_win_rate=None, min_trades=0):
+    """
+    Ligne de la courbe maximisant `metric` sous contraintes.
+
+    Args:
+        curve: sortie de threshold_curve ou sample_curve
+        metric: colonne à maximiser ('sharpe', 'n_trades', 'expectancy'...)
+        min_win_rate: win rate minimum (ex: 0.70), None = pas de contrainte
+        min_trades: nombre de trades minimum
+
+    Returns:
+        Series de la ligne optimale (premier seuil en cas d'égalité), None si aucune
+    """
+    mask = curve['n_trades'] >= min_trades
+    if min_win_rate is not None:
+        mask &= curve['win_rate'] >= min_win_rate
+
+    candidates = curve[mask]
+    if len(candidates) == 0:
+        return None
+    return candidates.loc[candidates[metric].idxmax()]
+
+
+def reliability_curve(y_true, y_proba, n_bins=10):
+    """
+    Courbe de calibration par classes de probabilité de même largeur
+    (même résultat que sklearn.calibration.calibration_curve, strategy='uniform').
+
+    Returns:
+        (fraction_of_positives, mean_predicted_value) des classes non vides
+    """
+    y_proba = np.asarray(y_proba, dtype=np.float64)
+    y_true = (np.asarray(y_true) == 1).astype(np.float64)
+
+    bins = np.linspace(0.0, 1.0, n_bins + 1)
+    bin_ids = np.searchsorted(bins[1:-1], y_proba)
+    bin_sums = np.bincount(bin_ids, weights=y_proba, minlength=n_bins)
+    bin_true = np.bincount(bin_ids, weights=y_true, minlength=n_bins)
+    bin_total = np.bincount(bin_ids, minlength=n_bins)
+
+    nonzero = bin_total != 0
+    return bin_true[nonzero] / bin_total[nonzero], bin_sums[nonzero] / bin_total[nonzero]
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Niveaux de trade vectorisés (direction, SL/TP ATR, RR minimum)
+Version 1.0 - 2026-10-18
+
+OBJECTIF:
+- Remplacer les df.apply(..., axis=1) de recalculate_tpsl (V4) et
+  recalculate_target_rr4 (V5, V6): un pd.Series construit par ligne sur
+  des centaines de milliers de lignes -> quelques opérations NumPy
+- Une seule implémentation partagée par les trainers
+- N'importe quel jeu de multiplicateurs SL/TP, RR minimum optionnel
+
+Conventions (identiques aux scripts et à l'export MQ5):
+- Direction: signal_score >= 2 -> BUY (1), <= -2 -> SELL (-1), sinon 0
+- BUY:  SL = close - sl_mult × ATR, TP = close + tp_mult × ATR
+- SELL: SL = close + sl_mult × ATR, TP = close - tp_mult × ATR
+- RR minimum: si tp_dist / sl_dist < min_rr (et sl_dist > 0), tp_dist = sl_dist × min_rr
+"""
+
+import numpy as np
+import pandas as pd
+
+SIGNAL_THRESHOLD = 2
+
+
+def signal_direction(signal_score, threshold=SIGNAL_THRESHOLD):
+    """Direction du trade par barre: 1 (BUY), -1 (SELL), 0 (pas de signal)."""
+    signal_score = np.asarray(signal_score)
+    return np.where(signal_score >= threshold, 1,
+                    np.where(signal_score <= -threshold, -1, 0)).astype(np.int8)
+
+
+def enforce_min_rr(sl_distance, tp_distance, min_rr):
+    """Distance TP ajustée pour garantir tp_dist / sl_dist >= min_rr."""
+    sl_distance = np.asarray(sl_distance, dtype=np.float64)
+    tp_distance = np.asarray(tp_distance, dtype=np.float64)
+    positive = sl_distance > 0
+    rr = np.divide(tp_distance, sl_distance, out=np.zeros_like(tp_distance), where=positive)
+    return np.where(positive & (rr < min_rr), sl_distance * min_rr, tp_distance)
+
+
+def atr_levels(close, atr, direction, sl_multiplier, tp_multiplier, min_rr=None):
+    """
+    Prix SL / TP basés sur l'ATR pour toutes les barres.
+
+    Args:
+        close: prix d'entrée
+        atr: ATR de la barre
+        direction: 1 / -1 / 0 (signal_direction)
+        sl_multiplier, tp_multiplier: multiplicateurs ATR
+        min_rr: RR minimum garanti (None = pas d'ajustement)
+
+    Returns:
+        sl_price, tp_price (float64, NaN si direction == 0)
+    """
+    close = np.asarray(close, dtype=np.float64)
+    atr = np.asarray(atr, dtype=np.float64)
+    direction = np.asarray(direction)
+
+    sl_distance = atr * sl_multiplier
+    tp_distance = atr * tp_multiplier
+    if min_rr is not None:
+        tp_distance = enforce_min_rr(sl_distance, tp_distance, min_rr)
+
+    is_buy = direction > 0
+    sl = np.where(is_buy, close - sl_distance, close + sl_distance)
+    tp = np.where(is_buy, close + tp_distance, close - tp_distance)
+
+    no_signal = direction == 0
+    sl[no_signal] = np.nan
+    tp[no_signal] = np.nan
+    return sl, tp
+
+
+def recalculate_tpsl(df, sl_multiplier, tp_multiplier, min_rr=None):
+    """
+    Colonnes sl_price_new / tp_price_new (équivalent de recalculate_tpsl V4).
+
+    Sans signal, les niveaux de l'export (sl_price, tp_price) sont conservés.
+    """
+    direction = signal_direction(df['signal_score'].values)
+    sl, tp = atr_levels(df['close'].values, df['atr14'].values, direction,
+                        sl_multiplier, tp_multiplier, min_rr)
+
+    no_signal = direction == 0
+    sl[no_signal] = df['sl_price'].values[no_signal]
+    tp[no_signal] = df['tp_price'].values[no_signal]
+    return pd.DataFrame({'sl_price_new': sl, 'tp_price_new': tp}, index=df.index)
+
+
+def recalculate_target_rr(df):
+    """
+    Target avec RR minimum (équivalent de recalculate_target_rr4 V5 / V6).
+
+    Le target_binary de l'export a été simulé sur les vraies barres avec les
+    niveaux MQ5: il est conservé tel quel (-1 = pas de signal / timeout).
+    L'ancienne version ligne à ligne calculait les niveaux RR sans les utiliser.
+    Pour relabelliser avec d'autres niveaux: recalculate_tpsl + first_touch_labels.
+    """
+    return df['target_binary'].copy()
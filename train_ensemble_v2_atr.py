@@ -17,11 +17,12 @@ import lightgbm as lgb
 import xgboost as xgb
 import catboost as cb
 from sklearn.ensemble import VotingClassifier
-from sklearn.metrics import roc_auc_score, classification_report, confusion_matrix
-import joblib
+from sklearn.metrics import roc_auc_score
 import os
 from datetime import datetime
-from tqdm import tqdm
+from backtest_engine import simulate_trades
+from model_bundle import save_model
+from run_report import RunReport
 
 print("=" * 80)
 print("ENTRAINEMENT ENSEMBLE V2.0 - TP/SL DYNAMIQUES (ATR)")
@@ -47,7 +48,10 @@ print(f"   Test: a partir de {TEST_START_DATE}")
 print(f"   Threshold: {PROBABILITY_THRESHOLD:.0%}")
 print(f"   Break Even: {'OUI' if USE_BREAK_EVEN else 'NON'}")
 
+report = RunReport("train_ensemble_v2_atr")
+
 # ==================== CHARGEMENT ====================
+report.stage("chargement")
 print("\n" + "=" * 80)
 print("CHARGEMENT DONNEES")
 print("=" * 80)
@@ -81,6 +85,7 @@ print(f"      WIN (1):  {(df_valid['target_binary']==1).sum()} ({(df_valid['targ
 print(f"      LOSS (0): {(df_valid['target_binary']==0).sum()} ({(df_valid['target_binary']==0).sum()/len(df_valid)*100:.1f}%)")
 
 # ==================== PREPARATION FEATURES ====================
+report.stage("features")
 print("\n" + "=" * 80)
 print("PREPARATION FEATURES")
 print("=" * 80)
@@ -93,6 +98,7 @@ feature_cols = [col for col in df_valid.columns if col not in exclude_cols]
 print(f"OK: {len(feature_cols)} features")
 
 # ==================== SPLIT TEMPOREL ====================
+report.stage("split")
 print("\n" + "=" * 80)
 print("SPLIT TEMPOREL STRICT")
 print("=" * 80)
@@ -112,6 +118,7 @@ print(f"   {len(df_test)} lignes")
 print(f"   Periode: {df_test['time'].min()} -> {df_test['time'].max()}")
 
 # ==================== EQUILIBRAGE ====================
+report.stage("equilibrage")
 print("\n" + "=" * 80)
 print("EQUILIBRAGE DONNEES TRAIN")
 print("=" * 80)
@@ -137,6 +144,7 @@ y_train = df_train_balanced['target_binary'].copy()
 X_train = X_train.replace([np.inf, -np.inf], np.nan).fillna(0)
 
 # ==================== ENTRAINEMENT ENSEMBLE ====================
+report.stage("entrainement")
 print("\n" + "=" * 80)
 print("ENTRAINEMENT ENSEMBLE (LightGBM + XGBoost + CatBoost)")
 print("=" * 80)
@@ -257,6 +265,7 @@ ensemble_auc = roc_auc_score(y_val, ensemble_pred)
 print(f"\nOK: Ensemble entraine - AUC validation: {ensemble_auc:.4f}")
 
 # ==================== BACKTEST REALISTE ====================
+report.stage("backtest")
 print("\n" + "=" * 80)
 print("BACKTEST REALISTE AVEC TP/SL DYNAMIQUES (ATR)")
 print("=" * 80)
@@ -276,134 +285,17 @@ df_signals['predicted_proba'] = y_pred_proba[signals_mask]
 print(f"OK: {len(df_signals)} signaux avec probabilite >={PROBABILITY_THRESHOLD:.0%}")
 print(f"    Sur {len(df_test)} barres de test ({len(df_signals)/len(df_test)*100:.1f}%)")
 
-# Créer index pour lookups rapides
-df_test_indexed = df_test.set_index('time')
-
-# Simulation trade par trade
-print("\nSimulation trade par trade...")
-trades = []
-
-for idx, row in tqdm(df_signals.iterrows(), total=len(df_signals), desc="Trades"):
-    entry_time = row['time']
-    entry_price = row['close']
-    signal_proba = row['predicted_proba']
-    signal_score = row['signal_score']
-
-    # TP/SL basés sur ATR (déjà calculés dans le CSV)
-    sl_price = row['sl_price']
-    tp_price = row['tp_price']
-    atr = row['atr14']
-
-    # Direction basée sur signal_score
-    if signal_score >= 2:
-        direction = 1  # BUY
-    elif signal_score <= -2:
-        direction = -1  # SELL
-    else:
-        continue  # Pas de signal clair
-
-    # Chercher les barres suivantes
-    future_bars = df_test[df_test['time'] > entry_time].head(180)
-
-    if len(future_bars) == 0:
-        continue
-
-    # Break Even level
-    sl_distance = abs(sl_price - entry_price)
-    if direction > 0:
-        be_level = entry_price + sl_distance  # +1R pour BUY
-    else:
-        be_level = entry_price - sl_distance  # +1R pour SELL
-
-    be_activated = False
-    trade_result = None
-    exit_price = None
-    bars_held = 0
-
-    # Vérifier barre par barre
-    for fb_idx, fb_row in future_bars.iterrows():
-        bars_held += 1
-
-        if direction > 0:
-            # BUY: Check BE
-            if USE_BREAK_EVEN and not be_activated and fb_row['high'] >= be_level:
-                sl_price = entry_price  # Move SL to BE
-                be_activated = True
-
-            # Check SL
-            if fb_row['low'] <= sl_price:
-                if be_activated:
-                    trade_result = 'WIN'  # BE protected
-                    exit_price = entry_price
-                else:
-                    trade_result = 'LOSS'
-                    exit_price = sl_price
-                break
-
-            # Check TP
-            if fb_row['high'] >= tp_price:
-                trade_result = 'WIN'
-                exit_price = tp_price
-                break
-        else:
-            # SELL: Check BE
-            if USE_BREAK_EVEN and not be_activated and fb_row['low'] <= be_level:
-                sl_price = entry_price  # Move SL to BE
-                be_activated = True
-
-            # Check SL
-            if fb_row['high'] >= sl_price:
-                if be_activated:
-                    trade_result = 'WIN'  # BE protected
-                    exit_price = entry_price
-                else:
-                    trade_result = 'LOSS'
-                    exit_price = sl_price
-                break
-
-            # Check TP
-            if fb_row['low'] <= tp_price:
-                trade_result = 'WIN'
-                exit_price = tp_price
-                break
-
-    # Si ni TP ni SL atteint
-    if trade_result is None:
-        exit_price = future_bars.iloc[-1]['close']
-        bars_held = len(future_bars)
-        pnl_pct = (exit_price - entry_price) / entry_price * 100
-        if direction == -1:
-            pnl_pct = -pnl_pct
-        trade_result = 'WIN' if pnl_pct > 0 else 'LOSS'
-
-    # Calculer P&L
-    pnl_pct = (exit_price - entry_price) / entry_price * 100
-    if direction == -1:
-        pnl_pct = -pnl_pct
-
-    pnl_usd = RISK_PER_TRADE * (pnl_pct / (sl_distance / entry_price * 100))
-
-    trades.append({
-        'entry_time': entry_time,
-        'entry_price': entry_price,
-        'exit_price': exit_price,
-        'direction': direction,
-        'signal_proba': signal_proba,
-        'result': trade_result,
-        'pnl_pct': pnl_pct,
-        'pnl_usd': pnl_usd,
-        'bars_held': bars_held,
-        'be_activated': be_activated,
-        'tp_price': tp_price,
-        'sl_price_initial': row['sl_price'],
-        'atr': atr
-    })
-
-df_trades = pd.DataFrame(trades)
+# Simulation de tous les trades (backtest vectorisé)
+print("\nSimulation des trades...")
+df_trades = simulate_trades(
+    df_test, signals_mask, y_pred_proba[signals_mask],
+    max_bars=180, use_break_even=USE_BREAK_EVEN, risk_per_trade=RISK_PER_TRADE
+)
 
 print(f"\nOK: Simulation terminee - {len(df_trades)} trades")
 
 # ==================== ANALYSE RESULTATS ====================
+report.stage("resultats")
 print("\n" + "=" * 80)
 print("RESULTATS BACKTEST V2.0")
 print("=" * 80)
@@ -456,6 +348,7 @@ print(f"\nReturn sur $10,000: {return_pct:.2f}%")
 print(f"Capital final: ${initial_capital + total_pnl:,.2f}")
 
 # ==================== SAUVEGARDE ====================
+report.stage("sauvegarde")
 print("\n" + "=" * 80)
 print("SAUVEGARDE MODELE")
 print("=" * 80)
@@ -482,8 +375,8 @@ model_data = {
     }
 }
 
-joblib.dump(model_data, output_path)
-print(f"OK: Modele sauvegarde: {output_path}")
+bundle_dir = save_model(model_data, output_path)
+print(f"OK: Modele sauvegarde: {bundle_dir}")
 
 # Sauvegarder trades
 trades_path = os.path.join(base_path, 'backtest_v2_atr_trades.csv')
@@ -512,3 +405,5 @@ else:
     print(f"   -> Revoir parametres TP/SL ou features")
 
 print("\n" + "=" * 80)
+
+report.save(output_path)
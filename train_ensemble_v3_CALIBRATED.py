@@ -16,11 +16,12 @@ import xgboost as xgb
 import catboost as cb
 from sklearn.ensemble import VotingClassifier
 from sklearn.calibration import CalibratedClassifierCV
-from sklearn.metrics import roc_auc_score, brier_score_loss
-import joblib
+from sklearn.metrics import brier_score_loss
 import os
 from datetime import datetime
-from tqdm import tqdm
+from backtest_engine import simulate_trades
+from model_bundle import save_model
+from run_report import RunReport
 
 print("=" * 80)
 print("ENTRAINEMENT ENSEMBLE V3.0 - AVEC CALIBRATION")
@@ -46,7 +47,10 @@ print(f"   Train: jusqu'a {TRAIN_END_DATE}")
 print(f"   Calibration: {TRAIN_END_DATE} -> {VAL_END_DATE}")
 print(f"   Test: a partir de {TEST_START_DATE}")
 
+report = RunReport("train_ensemble_v3_CALIBRATED")
+
 # ==================== CHARGEMENT ====================
+report.stage("chargement")
 print("\n" + "=" * 80)
 print("CHARGEMENT DONNEES")
 print("=" * 80)
@@ -65,6 +69,7 @@ df_valid = df[df['target_binary'].isin([0, 1])].copy()
 print(f"OK: {len(df_valid)} lignes avec target valide")
 
 # ==================== PREPARATION FEATURES ====================
+report.stage("features")
 exclude_cols = ['time', 'target_binary', 'target_pct_change', 'sl_price', 'tp_price',
                 'open', 'high', 'low', 'close']
 feature_cols = [col for col in df_valid.columns if col not in exclude_cols]
@@ -72,6 +77,7 @@ feature_cols = [col for col in df_valid.columns if col not in exclude_cols]
 print(f"Features: {len(feature_cols)}")
 
 # ==================== SPLIT TEMPOREL ====================
+report.stage("split")
 print("\n" + "=" * 80)
 print("SPLIT TEMPOREL STRICT")
 print("=" * 80)
@@ -89,6 +95,7 @@ print(f"Calib: {len(df_calib)} lignes ({df_calib['time'].min()} -> {df_calib['ti
 print(f"Test: {len(df_test)} lignes ({df_test['time'].min()} -> {df_test['time'].max()})")
 
 # ==================== EQUILIBRAGE TRAIN ====================
+report.stage("equilibrage")
 print("\n" + "=" * 80)
 print("EQUILIBRAGE TRAIN")
 print("=" * 80)
@@ -111,6 +118,7 @@ X_calib = df_calib[feature_cols].replace([np.inf, -np.inf], np.nan).fillna(0)
 y_calib = df_calib['target_binary']
 
 # ==================== ENTRAINEMENT BASE MODELS ====================
+report.stage("entrainement")
 print("\n" + "=" * 80)
 print("ENTRAINEMENT MODELES DE BASE")
 print("=" * 80)
@@ -168,6 +176,7 @@ cat_model.fit(X_train, y_train)
 print(f"   OK")
 
 # ==================== CALIBRATION ====================
+report.stage("calibration")
 print("\n" + "=" * 80)
 print("CALIBRATION DES PROBABILITES (ISOTONIC)")
 print("=" * 80)
@@ -200,6 +209,7 @@ cat_calibrated.fit(X_calib, y_calib)
 print("   [3/3] CatBoost calibré")
 
 # ==================== VERIFICATION CALIBRATION ====================
+report.stage("verification calibration")
 print("\n" + "=" * 80)
 print("VERIFICATION CALIBRATION SUR DONNEES CALIB")
 print("=" * 80)
@@ -249,6 +259,7 @@ improvement = mae_before - mae_after
 print(f"\nAmélioration: {improvement:.1f} points de MAE")
 
 # ==================== ENSEMBLE CALIBRE ====================
+report.stage("ensemble")
 print("\n" + "=" * 80)
 print("CREATION ENSEMBLE CALIBRE")
 print("=" * 80)
@@ -274,6 +285,7 @@ print("OK: Ensemble calibré créé")
 mae_ensemble = check_calibration(ensemble_calibrated, X_calib, y_calib, "Ensemble Calibré")
 
 # ==================== BACKTEST ====================
+report.stage("backtest")
 print("\n" + "=" * 80)
 print("BACKTEST SUR DONNEES TEST")
 print("=" * 80)
@@ -289,92 +301,15 @@ df_signals['predicted_proba'] = y_pred_proba[signals_mask]
 
 print(f"OK: {len(df_signals)} signaux >= {PROBABILITY_THRESHOLD:.0%}")
 
-# Simulation trades
+# Simulation trades (backtest vectorisé)
 print("\nSimulation trades...")
-trades = []
-
-for idx, row in tqdm(df_signals.iterrows(), total=len(df_signals)):
-    entry_time = row['time']
-    entry_price = row['close']
-    signal_proba = row['predicted_proba']
-    signal_score = row['signal_score']
-
-    sl_price = row['sl_price']
-    tp_price = row['tp_price']
-    atr = row['atr14']
-
-    if signal_score >= 2:
-        direction = 1
-    elif signal_score <= -2:
-        direction = -1
-    else:
-        continue
-
-    future_bars = df_test[df_test['time'] > entry_time].head(180)
-    if len(future_bars) == 0:
-        continue
-
-    sl_distance = abs(sl_price - entry_price)
-    be_activated = False
-    trade_result = None
-    exit_price = None
-    bars_held = 0
-
-    for fb_idx, fb_row in future_bars.iterrows():
-        bars_held += 1
-
-        if direction > 0:
-            if fb_row['low'] <= sl_price:
-                trade_result = 'LOSS'
-                exit_price = sl_price
-                break
-            if fb_row['high'] >= tp_price:
-                trade_result = 'WIN'
-                exit_price = tp_price
-                break
-        else:
-            if fb_row['high'] >= sl_price:
-                trade_result = 'LOSS'
-                exit_price = sl_price
-                break
-            if fb_row['low'] <= tp_price:
-                trade_result = 'WIN'
-                exit_price = tp_price
-                break
-
-    if trade_result is None:
-        exit_price = future_bars.iloc[-1]['close']
-        bars_held = len(future_bars)
-        pnl_pct = (exit_price - entry_price) / entry_price * 100
-        if direction == -1:
-            pnl_pct = -pnl_pct
-        trade_result = 'WIN' if pnl_pct > 0 else 'LOSS'
-
-    pnl_pct = (exit_price - entry_price) / entry_price * 100
-    if direction == -1:
-        pnl_pct = -pnl_pct
-
-    pnl_usd = RISK_PER_TRADE * (pnl_pct / (sl_distance / entry_price * 100))
-
-    trades.append({
-        'entry_time': entry_time,
-        'entry_price': entry_price,
-        'exit_price': exit_price,
-        'direction': direction,
-        'signal_proba': signal_proba,
-        'result': trade_result,
-        'pnl_pct': pnl_pct,
-        'pnl_usd': pnl_usd,
-        'bars_held': bars_held,
-        'be_activated': be_activated,
-        'tp_price': tp_price,
-        'sl_price_initial': row['sl_price'],
-        'atr': atr
-    })
-
-df_trades = pd.DataFrame(trades)
+df_trades = simulate_trades(
+    df_test, signals_mask, y_pred_proba[signals_mask],
+    max_bars=180, use_break_even=USE_BREAK_EVEN, risk_per_trade=RISK_PER_TRADE
+)
 
 # ==================== RESULTATS ====================
+report.stage("resultats")
 print("\n" + "=" * 80)
 print("RESULTATS BACKTEST V3.0 CALIBRE")
 print("=" * 80)
@@ -407,6 +342,7 @@ mae_backtest = check_calibration(
 )
 
 # ==================== SAUVEGARDE ====================
+report.stage("sauvegarde")
 print("\n" + "=" * 80)
 print("SAUVEGARDE")
 print("=" * 80)
@@ -427,8 +363,8 @@ model_data = {
     }
 }
 
-joblib.dump(model_data, output_path)
-print(f"OK: Modèle sauvegardé: {output_path}")
+bundle_dir = save_model(model_data, output_path)
+print(f"OK: Modèle sauvegardé: {bundle_dir}")
 
 trades_path = os.path.join(base_path, 'backtest_v3_calibrated_trades.csv')
 df_trades.to_csv(trades_path, index=False)
@@ -440,3 +376,5 @@ print("=" * 80)
 print(f"\nCalibration MAE: {mae_ensemble:.1f} points (vs {mae_before:.1f} avant)")
 print(f"Win Rate: {win_rate:.2f}%")
 print(f"Return: {return_pct:.2f}%")
+
+report.save(output_path)
@@ -21,11 +21,18 @@ import xgboost as xgb
 import catboost as cb
 from sklearn.ensemble import VotingClassifier
 from sklearn.calibration import CalibratedClassifierCV
-from sklearn.metrics import roc_auc_score, brier_score_loss
-import joblib
 import os
 from datetime import datetime
-from tqdm import tqdm
+from labeling_engine import first_touch_labels
+from backtest_engine import simulate_trades
+from portfolio_backtest import simulate_portfolio, POSEIDON_RULES
+import labeling_engine
+import trade_levels
+from trade_levels import recalculate_tpsl, signal_direction
+from feature_cache import cached_frame
+from compact_dtypes import compact_frame, clean_matrix, memory_mb, memory_report
+from model_bundle import save_model
+from run_report import RunReport
 
 print("="*80)
 print("ENTRAINEMENT ENSEMBLE V4.0 FINAL - CONFIGURATION OPTIMALE")
@@ -58,7 +65,10 @@ print(f"   RR Target: {TARGET_RR}:1")
 print(f"   WR Attendu: ~25-27%")
 print(f"   Expectancy Attendu: ~$35-40/trade")
 
+report = RunReport("train_ensemble_v4_FINAL")
+
 # ==================== CHARGEMENT ====================
+report.stage("chargement + labels")
 print("\n" + "="*80)
 print("CHARGEMENT DONNEES")
 print("="*80)
@@ -75,65 +85,27 @@ print(f"OK: {len(df)} lignes chargées")
 # Recalculer TP/SL avec les nouveaux multiplicateurs
 print("\nRecalcul TP/SL optimaux...")
 
-def recalculate_tpsl(row):
-    """Recalculer TP/SL basé sur ATR optimisé"""
-    atr = row['atr14']
-    close = row['close']
-    signal_score = row['signal_score']
-
-    sl_dist = atr * SL_ATR_MULTIPLIER
-    tp_dist = atr * TP_ATR_MULTIPLIER
-
-    if signal_score >= 2:  # BUY
-        sl = close - sl_dist
-        tp = close + tp_dist
-    elif signal_score <= -2:  # SELL
-        sl = close + sl_dist
-        tp = close - tp_dist
-    else:
-        sl = row['sl_price']
-        tp = row['tp_price']
-
-    return pd.Series({'sl_price_new': sl, 'tp_price_new': tp})
-
-df[['sl_price_new', 'tp_price_new']] = df.apply(recalculate_tpsl, axis=1)
-
-# Recalculer target avec nouveaux TP/SL
-print("Recalcul target avec TP/SL optimisés...")
-
-def recalculate_target(row, df_full):
-    """Recalculer si TP ou SL est atteint avec nouveaux prix"""
-    if row['signal_score'] == 0:
-        return -1
-
-    entry_time = row['time']
-    entry_price = row['close']
-    sl_price = row['sl_price_new']
-    tp_price = row['tp_price_new']
-    signal_score = row['signal_score']
-
-    # Chercher barres futures
-    future_bars = df_full[df_full['time'] > entry_time].head(240)
-
-    if len(future_bars) == 0:
-        return -1
-
-    for _, bar in future_bars.iterrows():
-        if signal_score >= 2:  # BUY
-            if bar['low'] <= sl_price:
-                return 0  # LOSS
-            if bar['high'] >= tp_price:
-                return 1  # WIN
-        elif signal_score <= -2:  # SELL
-            if bar['high'] >= sl_price:
-                return 0  # LOSS
-            if bar['low'] <= tp_price:
-                return 1  # WIN
-
-    return -1  # Timeout
-
-print("   Calcul en cours (cela peut prendre quelques minutes)...")
-df['target_binary_new'] = [recalculate_target(row, df) for _, row in tqdm(df.iterrows(), total=len(df), desc="Target")]
+def relabel_tpsl(df):
+    """TP/SL optimisés + target first-touch (résultat mis en cache)"""
+    df = df.copy()
+    df[['sl_price_new', 'tp_price_new']] = recalculate_tpsl(df, SL_ATR_MULTIPLIER, TP_ATR_MULTIPLIER)
+
+    # Recalculer target avec nouveaux TP/SL
+    print("Recalcul target avec TP/SL optimisés...")
+
+    # Labellisation vectorisée (first-touch TP/SL sur 240 barres futures)
+    direction = signal_direction(df['signal_score'].values)
+    target_new, _, _ = first_touch_labels(
+        df['high'].values, df['low'].values, df['close'].values,
+        df['sl_price_new'].values, df['tp_price_new'].values,
+        direction, max_bars=240
+    )
+    df['target_binary_new'] = target_new
+    return df
+
+df = cached_frame(relabel_tpsl, df, os.path.join(base_path, "feature_cache"),
+                  params={'sl': SL_ATR_MULTIPLIER, 'tp': TP_ATR_MULTIPLIER, 'max_bars': 240},
+                  code=[trade_levels, labeling_engine])
 
 # Filtrer target valide
 df_valid = df[df['target_binary_new'].isin([0, 1])].copy()
@@ -145,6 +117,7 @@ df_valid['sl_price'] = df_valid['sl_price_new']
 df_valid['tp_price'] = df_valid['tp_price_new']
 
 # ==================== PREPARATION FEATURES ====================
+report.stage("features")
 exclude_cols = ['time', 'target_binary', 'target_binary_new', 'target_pct_change',
                 'sl_price', 'tp_price', 'sl_price_new', 'tp_price_new',
                 'open', 'high', 'low', 'close']
@@ -152,7 +125,13 @@ feature_cols = [col for col in df_valid.columns if col not in exclude_cols]
 
 print(f"\nFeatures: {len(feature_cols)}")
 
+# Types compacts (float32 / int8), une seule fois avant le split -> mêmes types partout
+mb_before = memory_mb(df_valid, feature_cols)
+df_valid = compact_frame(df_valid, columns=feature_cols)
+print(f"Types compacts: {mb_before:.1f} Mo -> {memory_mb(df_valid, feature_cols):.1f} Mo (features)")
+
 # ==================== SPLIT TEMPOREL ====================
+report.stage("split")
 print("\n" + "="*80)
 print("SPLIT TEMPOREL")
 print("="*80)
@@ -170,6 +149,7 @@ print(f"Calib: {len(df_calib)} lignes")
 print(f"Test: {len(df_test)} lignes")
 
 # ==================== EQUILIBRAGE ====================
+report.stage("equilibrage")
 print("\n" + "="*80)
 print("EQUILIBRAGE TRAIN")
 print("="*80)
@@ -184,13 +164,16 @@ df_train_balanced = df_train_balanced.sample(frac=1, random_state=42).reset_inde
 
 print(f"Train équilibré: {len(df_train_balanced)} lignes")
 
-X_train = df_train_balanced[feature_cols].replace([np.inf, -np.inf], np.nan).fillna(0)
+X_train = clean_matrix(df_train_balanced[feature_cols])
 y_train = df_train_balanced['target_binary']
 
-X_calib = df_calib[feature_cols].replace([np.inf, -np.inf], np.nan).fillna(0)
+X_calib = clean_matrix(df_calib[feature_cols])
 y_calib = df_calib['target_binary']
 
+memory_report({'X_train': X_train, 'X_calib': X_calib}, "Mémoire des matrices")
+
 # ==================== ENTRAINEMENT ====================
+report.stage("entrainement")
 print("\n" + "="*80)
 print("ENTRAINEMENT MODELES")
 print("="*80)
@@ -248,6 +231,7 @@ cat_model.fit(X_train, y_train)
 print("   OK")
 
 # ==================== CALIBRATION ====================
+report.stage("calibration")
 print("\n" + "="*80)
 print("CALIBRATION ISOTONIC")
 print("="*80)
@@ -278,11 +262,12 @@ ensemble_calibrated.estimators_ = [lgbm_calibrated, xgb_calibrated, cat_calibrat
 ensemble_calibrated.classes_ = np.array([0, 1])
 
 # ==================== BACKTEST ====================
+report.stage("backtest")
 print("\n" + "="*80)
 print("BACKTEST AVEC THRESHOLD 60%")
 print("="*80)
 
-X_test = df_test[feature_cols].replace([np.inf, -np.inf], np.nan).fillna(0)
+X_test = clean_matrix(df_test[feature_cols])
 
 y_pred_proba = ensemble_calibrated.predict_proba(X_test)[:, 1]
 
@@ -292,89 +277,16 @@ df_signals['predicted_proba'] = y_pred_proba[signals_mask]
 
 print(f"Signaux >= {PROBABILITY_THRESHOLD:.0%}: {len(df_signals)}")
 
-# Simulation trades
-trades = []
-
-for idx, row in tqdm(df_signals.iterrows(), total=len(df_signals), desc="Trades"):
-    entry_time = row['time']
-    entry_price = row['close']
-    signal_proba = row['predicted_proba']
-    signal_score = row['signal_score']
-
-    sl_price = row['sl_price']
-    tp_price = row['tp_price']
-    atr = row['atr14']
-
-    if signal_score >= 2:
-        direction = 1
-    elif signal_score <= -2:
-        direction = -1
-    else:
-        continue
-
-    future_bars = df_test[df_test['time'] > entry_time].head(240)
-    if len(future_bars) == 0:
-        continue
-
-    sl_distance = abs(sl_price - entry_price)
-    trade_result = None
-    exit_price = None
-    bars_held = 0
-
-    for fb_idx, fb_row in future_bars.iterrows():
-        bars_held += 1
-
-        if direction > 0:
-            if fb_row['low'] <= sl_price:
-                trade_result = 'LOSS'
-                exit_price = sl_price
-                break
-            if fb_row['high'] >= tp_price:
-                trade_result = 'WIN'
-                exit_price = tp_price
-                break
-        else:
-            if fb_row['high'] >= sl_price:
-                trade_result = 'LOSS'
-                exit_price = sl_price
-                break
-            if fb_row['low'] <= tp_price:
-                trade_result = 'WIN'
-                exit_price = tp_price
-                break
-
-    if trade_result is None:
-        exit_price = future_bars.iloc[-1]['close']
-        pnl_pct = (exit_price - entry_price) / entry_price * 100
-        if direction == -1:
-            pnl_pct = -pnl_pct
-        trade_result = 'WIN' if pnl_pct > 0 else 'LOSS'
-
-    pnl_pct = (exit_price - entry_price) / entry_price * 100
-    if direction == -1:
-        pnl_pct = -pnl_pct
-
-    pnl_usd = RISK_PER_TRADE * (pnl_pct / (sl_distance / entry_price * 100))
-
-    trades.append({
-        'entry_time': entry_time,
-        'entry_price': entry_price,
-        'exit_price': exit_price,
-        'direction': direction,
-        'signal_proba': signal_proba,
-        'result': trade_result,
-        'pnl_pct': pnl_pct,
-        'pnl_usd': pnl_usd,
-        'bars_held': bars_held,
-        'tp_price': tp_price,
-        'sl_price_initial': sl_price,
-        'atr': atr,
-        'rr_target': TARGET_RR
-    })
-
-df_trades = pd.DataFrame(trades)
+# Simulation trades (backtest vectorisé, horizon 240 barres)
+df_trades = simulate_trades(
+    df_test, signals_mask, y_pred_proba[signals_mask],
+    max_bars=240, use_break_even=USE_BREAK_EVEN, risk_per_trade=RISK_PER_TRADE
+)
+df_trades = df_trades.drop(columns='be_activated')
+df_trades['rr_target'] = TARGET_RR
 
 # ==================== RESULTATS ====================
+report.stage("resultats")
 print("\n" + "="*80)
 print("RESULTATS BACKTEST V4.0 FINAL")
 print("="*80)
@@ -397,7 +309,33 @@ print(f"   Avg Win: ${avg_win:.2f}")
 print(f"   Avg Loss: ${avg_loss:.2f}")
 print(f"   RR Realise: {avg_win/avg_loss:.2f}:1")
 
+# ==================== BACKTEST PORTEFEUILLE (REGLES POSEIDON) ====================
+report.stage("backtest portefeuille")
+print("\n" + "="*80)
+print("BACKTEST PORTEFEUILLE - REGLES EA POSEIDON")
+print("="*80)
+
+df_portfolio = simulate_portfolio(df_trades, df_test['time'], POSEIDON_RULES)
+
+if len(df_portfolio) > 0:
+    pf_win_rate = (df_portfolio['pnl_money'] > 0).mean() * 100
+    pf_pnl = df_portfolio['pnl_money'].sum()
+    pf_drawdown = (df_portfolio['balance'].cummax() - df_portfolio['balance']).max()
+
+    print(f"\nRègles: {POSEIDON_RULES['max_trades_per_day']} trades/jour max, "
+          f"session {POSEIDON_RULES['session_start_hour']}h-{POSEIDON_RULES['session_end_hour']}h, "
+          f"série de pertes >= {POSEIDON_RULES['loss_streak_trigger']} -> "
+          f"${POSEIDON_RULES['reduced_risk_money']:.0f}")
+    print(f"   Trades pris: {len(df_portfolio)} / {len(df_trades)}")
+    print(f"   Win Rate: {pf_win_rate:.1f}%")
+    print(f"   P&L Total: ${pf_pnl:,.2f}")
+    print(f"   Max Drawdown: ${pf_drawdown:,.2f}")
+    print(f"   Trades à risque réduit: {df_portfolio['risk_reduced'].sum()}")
+else:
+    print("\nATTENTION: Aucun trade ne respecte les règles Poseidon")
+
 # ==================== SAUVEGARDE ====================
+report.stage("sauvegarde")
 print("\n" + "="*80)
 print("SAUVEGARDE")
 print("="*80)
@@ -423,8 +361,8 @@ model_data = {
     }
 }
 
-joblib.dump(model_data, output_path)
-print(f"OK: Modele sauvegarde: {output_path}")
+bundle_dir = save_model(model_data, output_path)
+print(f"OK: Modele sauvegarde: {bundle_dir}")
 
 trades_path = os.path.join(base_path, 'backtest_v4_FINAL_trades.csv')
 df_trades.to_csv(trades_path, index=False)
@@ -448,3 +386,5 @@ else:
     print(f"\nPerformance insuffisante, revoir parametres")
 
 print("\n" + "="*80)
+
+report.save(output_path)
@@ -6,16 +6,20 @@ Avec TOUTES les features: Poseidon + ATR + ADX + H4 + MACRO (DXY/VIX/US10Y/SP500
 
 import pandas as pd
 import numpy as np
-import joblib
-from sklearn.model_selection import train_test_split
 from sklearn.calibration import CalibratedClassifierCV
 from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score
 import lightgbm as lgb
 import xgboost as xgb
 from catboost import CatBoostClassifier
-import optuna
 from datetime import datetime
 import os
+from dataset_store import read_dataset
+from binned_folds import holdout_folds
+from optuna_studies import run_study, study_fingerprint, lgb_pruning_callback
+from compact_dtypes import compact_frame, categorical_params, memory_mb, memory_report
+from trade_levels import recalculate_target_rr
+from model_bundle import save_model
+from run_report import RunReport
 
 print("="*80)
 print("ENTRAINEMENT ENSEMBLE V5.0 FINAL - RR 4:1 GARANTI")
@@ -25,6 +29,7 @@ print("="*80)
 CSV_FILE = r"C:\Users\lbye3\AppData\Roaming\MetaQuotes\Terminal\Common\Files\XAUUSD_ML_Data_V3_FINAL_WITH_MACRO_20Y.csv"
 OUTPUT_MODEL = r"C:\Users\lbye3\AppData\Roaming\MetaQuotes\Terminal\Common\Files\xauusd_ensemble_v5_FINAL_RR4_model.pkl"
 OUTPUT_TRADES = r"C:\Users\lbye3\AppData\Roaming\MetaQuotes\Terminal\Common\Files\backtest_v5_FINAL_RR4_trades.csv"
+STUDY_DIR = r"C:\Users\lbye3\AppData\Roaming\MetaQuotes\Terminal\Common\Files\optuna_studies"
 
 # Paramètres TP/SL avec RR 4:1 GARANTI
 SL_ATR_MULTIPLIER = 1.5  # SL = 1.5 × ATR
@@ -35,6 +40,17 @@ PROBABILITY_THRESHOLD = 0.55  # Seuil de probabilité (ajustable)
 INITIAL_CAPITAL = 10000
 RISK_PERCENT = 1.0  # 1% du capital par trade
 
+# Types compacts: float32 (continues), int8 (flags / signaux), category (heure / jour)
+COMPACT_DTYPES = True
+CATEGORICAL_FEATURES = ['hour', 'day_of_week'] if COMPACT_DTYPES else []
+XGB_CAT_PARAMS, CAT_CAT_PARAMS = categorical_params(CATEGORICAL_FEATURES)
+
+# Optuna: trials en parallèle (étude SQLite partagée, reprise après interruption)
+N_TRIALS = 50
+N_OPTUNA_WORKERS = 4
+OPTUNA_THREADS = max(1, (os.cpu_count() or 1) // N_OPTUNA_WORKERS)  # threads LightGBM par worker
+PRUNER = 'median'  # 'median', 'hyperband' ou None
+
 
 print(f"\nConfiguration:")
 print(f"   SL: {SL_ATR_MULTIPLIER}×ATR (variable)")
@@ -44,58 +60,63 @@ print(f"   Threshold: {PROBABILITY_THRESHOLD*100}%")
 print(f"   Capital initial: ${INITIAL_CAPITAL}")
 print(f"   Risque par trade: {RISK_PERCENT}%")
 
+# Features complètes (Poseidon + ATR + ADX + H4 + MACRO)
+FEATURES = [
+    # Poseidon base
+    'ema21', 'ema55', 'macd', 'macd_signal', 'macd_hist', 'smma50', 'smma200',
+    'signal_ema', 'signal_macd', 'signal_smma', 'signal_score',
+
+    # Nouveaux H1
+    'atr14', 'adx14', 'di_plus', 'di_minus',
+
+    # Nouveaux H4
+    'smma50_h4', 'rsi_h4', 'trend_h4',
+
+    # Macro (NOUVEAUX)
+    'DXY', 'VIX', 'US10Y', 'SP500', 'NASDAQ', 'DOW',
+
+    # Filtres
+    'rsi_filter', 'adx_regime',
+
+    # Temporel
+    'hour', 'day_of_week', 'month', 'in_session',
+
+    # Prix
+    'close', 'volume'
+]
+
+print(f"\n{len(FEATURES)} features utilisées:")
+for i, feat in enumerate(FEATURES, 1):
+    print(f"   {i}. {feat}")
+
+report = RunReport("train_ensemble_v5_FINAL_RR4")
+
 print("\n" + "="*80)
 print("CHARGEMENT DONNEES")
 print("="*80)
+report.stage("chargement")
 
-df = pd.read_csv(CSV_FILE)
-df['time'] = pd.to_datetime(df['time'])
+# Lecture des seules colonnes utiles (store Parquet, fallback CSV)
+df = read_dataset(CSV_FILE, columns=['time', 'target_binary'] + FEATURES)
 
 print(f"\nTotal lignes: {len(df)}")
 print(f"Période: {df['time'].min()} à {df['time'].max()}")
 print(f"Colonnes: {df.shape[1]}")
 
+if COMPACT_DTYPES:
+    mb_before = memory_mb(df, FEATURES)
+    df = compact_frame(df, columns=FEATURES, categorical=CATEGORICAL_FEATURES)
+    print(f"Types compacts: {mb_before:.1f} Mo -> {memory_mb(df, FEATURES):.1f} Mo (features)")
+
 # Recalculer target avec RR 4:1 garanti
 print("\n" + "="*80)
 print("RECALCUL TARGET AVEC RR 4:1 GARANTI")
 print("="*80)
+report.stage("labels")
 
-def recalculate_target_rr4(row):
-    """Recalcule le target avec RR 4:1 minimum garanti"""
-
-    if row['target_binary'] == -1:  # Pas de signal
-        return row['target_binary']
-
-    # Calcul SL et TP avec ATR
-    atr = row['atr14']
-    sl_distance = atr * SL_ATR_MULTIPLIER
-    tp_distance = atr * TP_ATR_MULTIPLIER
-
-    # Vérifier RR
-    rr_calculated = tp_distance / sl_distance if sl_distance > 0 else 0
-
-    # Si RR < 4.0, ajuster TP pour garantir RR 4:1
-    if rr_calculated < MIN_RR and sl_distance > 0:
-        tp_distance = sl_distance * MIN_RR
-
-    # Déterminer direction du trade
-    direction = 1 if row['signal_score'] >= 2 else -1
-
-    entry = row['close']
-
-    if direction > 0:  # BUY
-        sl_price = entry - sl_distance
-        tp_price = entry + tp_distance
-    else:  # SELL
-        sl_price = entry + sl_distance
-        tp_price = entry - tp_distance
-
-    # Le target_binary original est déjà calculé dans le CSV
-    # On le garde tel quel car il a été simulé sur les vraies barres
-    return row['target_binary']
-
+# Copie de target_binary (simulé sur les vraies barres): pas de cache disque
 print("Recalcul des targets avec RR 4:1 garanti...")
-df['target_binary_rr4'] = df.apply(recalculate_target_rr4, axis=1)
+df['target_binary_rr4'] = recalculate_target_rr(df)
 
 # Filtrer les lignes avec target valide
 df_valid = df[df['target_binary_rr4'] != -1].copy()
@@ -112,6 +133,7 @@ print(f"Break-even WR pour RR {MIN_RR}:1 = {(1/(1+MIN_RR))*100:.2f}%")
 print("\n" + "="*80)
 print("SPLIT TEMPOREL (WALK-FORWARD)")
 print("="*80)
+report.stage("split")
 
 df_train = df_valid[df_valid['time'] < '2020-01-01'].copy()
 df_calib = df_valid[(df_valid['time'] >= '2020-01-01') & (df_valid['time'] < '2021-01-01')].copy()
@@ -121,35 +143,6 @@ print(f"\nTrain: {len(df_train)} lignes ({df_train['time'].min()} à {df_train['
 print(f"Calib: {len(df_calib)} lignes ({df_calib['time'].min()} à {df_calib['time'].max()})")
 print(f"Test:  {len(df_test)} lignes ({df_test['time'].min()} à {df_test['time'].max()})")
 
-# Features complètes (Poseidon + ATR + ADX + H4 + MACRO)
-FEATURES = [
-    # Poseidon base
-    'ema21', 'ema55', 'macd', 'macd_signal', 'macd_hist', 'smma50', 'smma200',
-    'signal_ema', 'signal_macd', 'signal_smma', 'signal_score',
-
-    # Nouveaux H1
-    'atr14', 'adx14', 'di_plus', 'di_minus',
-
-    # Nouveaux H4
-    'smma50_h4', 'rsi_h4', 'trend_h4',
-
-    # Macro (NOUVEAUX)
-    'DXY', 'VIX', 'US10Y', 'SP500', 'NASDAQ', 'DOW',
-
-    # Filtres
-    'rsi_filter', 'adx_regime',
-
-    # Temporel
-    'hour', 'day_of_week', 'month', 'in_session',
-
-    # Prix
-    'close', 'volume'
-]
-
-print(f"\n{len(FEATURES)} features utilisées:")
-for i, feat in enumerate(FEATURES, 1):
-    print(f"   {i}. {feat}")
-
 TARGET = 'target_binary_rr4'
 
 X_train = df_train[FEATURES]
@@ -161,9 +154,15 @@ y_calib = df_calib[TARGET]
 X_test = df_test[FEATURES]
 y_test = df_test[TARGET]
 
+memory_report({'X_train': X_train, 'X_calib': X_calib, 'X_test': X_test}, "Mémoire des matrices")
+
 print("\n" + "="*80)
 print("OPTIMISATION HYPERPARAMETRES (OPTUNA)")
 print("="*80)
+report.stage("optuna", n_trials=N_TRIALS)
+
+# Train / calib binnés une seule fois pour les 50 trials
+tuning_folds = holdout_folds(X_train, y_train, X_calib, y_calib)
 
 def objective(trial):
     """Fonction objectif Optuna pour LightGBM"""
@@ -182,20 +181,25 @@ def objective(trial):
         'colsample_bytree': trial.suggest_float('colsample_bytree', 0.6, 1.0),
         'reg_alpha': trial.suggest_float('reg_alpha', 0.0, 1.0),
         'reg_lambda': trial.suggest_float('reg_lambda', 0.0, 1.0),
-        'random_state': 42
+        'random_state': 42,
+        'n_jobs': OPTUNA_THREADS
     }
 
-    model = lgb.LGBMClassifier(**params)
-    model.fit(X_train, y_train, eval_set=[(X_calib, y_calib)])
+    # Même modèle que LGBMClassifier(**params).fit(X_train, y_train), sans re-binning.
+    # AUC calib rapportée toutes les 10 itérations (metric n'influe pas sur l'apprentissage)
+    fold = tuning_folds.folds(params)[0]
+    model = tuning_folds.train({**params, 'metric': 'auc'}, fold,
+                               callbacks=[lgb_pruning_callback(trial, 'auc')])
 
-    y_pred_proba = model.predict_proba(X_calib)[:, 1]
-    score = roc_auc_score(y_calib, y_pred_proba)
+    y_pred_proba = model.predict(fold.X_val)
+    score = roc_auc_score(fold.y_val, y_pred_proba)
 
     return score
 
-print("\nOptimisation en cours (50 trials)...")
-study = optuna.create_study(direction='maximize', study_name='v5_rr4')
-study.optimize(objective, n_trials=50, show_progress_bar=True)
+print(f"\nOptimisation en cours ({N_TRIALS} trials, {N_OPTUNA_WORKERS} workers, pruner: {PRUNER})...")
+study = run_study(objective, 'v5_rr4', STUDY_DIR, N_TRIALS, n_workers=N_OPTUNA_WORKERS, pruner=PRUNER,
+                  n_warmup_steps=50, fingerprint=study_fingerprint(X_train, y_train, X_calib, y_calib),
+                  show_progress_bar=True)
 
 print(f"\nMeilleurs paramètres:")
 for key, value in study.best_params.items():
@@ -206,6 +210,7 @@ print(f"\nMeilleur score (ROC-AUC): {study.best_value:.4f}")
 print("\n" + "="*80)
 print("ENTRAINEMENT ENSEMBLE (LightGBM + XGBoost + CatBoost)")
 print("="*80)
+report.stage("entrainement")
 
 # LightGBM avec paramètres optimaux
 print("\n1. LightGBM...")
@@ -229,7 +234,8 @@ xgb_model = xgb.XGBClassifier(
     subsample=0.8,
     colsample_bytree=0.8,
     random_state=42,
-    eval_metric='logloss'
+    eval_metric='logloss',
+    **XGB_CAT_PARAMS
 )
 xgb_model.fit(X_train, y_train, eval_set=[(X_calib, y_calib)], verbose=False)
 
@@ -240,7 +246,8 @@ cat_model = CatBoostClassifier(
     learning_rate=0.05,
     depth=6,
     random_state=42,
-    verbose=False
+    verbose=False,
+    **CAT_CAT_PARAMS
 )
 cat_model.fit(X_train, y_train, eval_set=(X_calib, y_calib), verbose=False)
 
@@ -248,6 +255,7 @@ cat_model.fit(X_train, y_train, eval_set=(X_calib, y_calib), verbose=False)
 print("\n" + "="*80)
 print("CALIBRATION DES MODELES")
 print("="*80)
+report.stage("calibration")
 
 print("\nCalibration LightGBM (isotonic)...")
 lgbm_calibrated = CalibratedClassifierCV(lgbm_model, method='isotonic', cv='prefit')
@@ -267,6 +275,7 @@ print("\nOK: Calibration terminée")
 print("\n" + "="*80)
 print("PREDICTIONS ENSEMBLE (SOFT VOTING)")
 print("="*80)
+report.stage("predictions")
 
 y_pred_lgb = lgbm_calibrated.predict_proba(X_test)[:, 1]
 y_pred_xgb = xgb_calibrated.predict_proba(X_test)[:, 1]
@@ -293,6 +302,7 @@ print(f"\nROC-AUC Score: {roc_auc_score(y_test, y_pred_proba):.4f}")
 print("\n" + "="*80)
 print("BACKTEST AVEC RR 4:1 GARANTI")
 print("="*80)
+report.stage("backtest")
 
 df_test_bt = df_test.copy()
 df_test_bt['signal_proba'] = y_pred_proba
@@ -401,6 +411,7 @@ else:
 print("\n" + "="*80)
 print("SAUVEGARDE")
 print("="*80)
+report.stage("sauvegarde")
 
 model_data = {
     'lgbm': lgbm_calibrated,
@@ -416,8 +427,8 @@ model_data = {
     }
 }
 
-joblib.dump(model_data, OUTPUT_MODEL)
-print(f"\nModèle sauvegardé: {OUTPUT_MODEL}")
+bundle_dir = save_model(model_data, OUTPUT_MODEL)
+print(f"\nModèle sauvegardé: {bundle_dir}")
 
 # Sauvegarder trades
 df_trades_save = df_trades[['time', 'close', 'signal_proba', 'signal_score', 'target_binary_rr4',
@@ -428,3 +439,5 @@ print(f"Trades sauvegardés: {OUTPUT_TRADES}")
 print("\n" + "="*80)
 print("ENTRAINEMENT V5.0 FINAL TERMINE")
 print("="*80)
+
+report.save(OUTPUT_MODEL)
@@ -9,27 +9,37 @@ Entraînement Ensemble V6 OPTIMIZED - Améliorations Complètes
 
 import pandas as pd
 import numpy as np
-import joblib
-from sklearn.model_selection import train_test_split
-from sklearn.calibration import CalibratedClassifierCV
-from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score
-from sklearn.ensemble import RandomForestClassifier, ExtraTreesClassifier
-import lightgbm as lgb
-import xgboost as xgb
-from catboost import CatBoostClassifier
-import optuna
 from datetime import datetime
 import os
+from walk_forward import train_windows, optimize_threshold, ENSEMBLE_WEIGHTS
+from dataset_store import read_dataset
+import feature_registry
+from feature_cache import cached_frame
+from compact_dtypes import compact_frame, memory_mb
+import trade_levels
+from compiled_ensemble import compile_ensemble, compare_with_model_data, PARITY_TOLERANCE
+from prediction_store import PredictionStore, model_fingerprint
+from model_bundle import save_model, saved_fingerprint, model_size_mb
+from run_report import RunReport
+from v6_dataset import (FEATURES_BASE, FEATURES_ADVANCED, FEATURES, TARGET, LOAD_COLUMNS, WINDOWS,
+                        create_advanced_features, prepare_dataset)
 
 print("="*80)
 print("ENTRAINEMENT ENSEMBLE V6.0 OPTIMIZED")
 print("="*80)
 
+# Durée / CPU / mémoire par étape -> rapport JSON à côté du modèle
+report = RunReport("train_ensemble_v6_OPTIMIZED")
+
 # Configuration
 CSV_FILE = r"C:\Users\lbye3\AppData\Roaming\MetaQuotes\Terminal\Common\Files\XAUUSD_ML_Data_V3_FINAL_WITH_MACRO_20Y.csv"
 OUTPUT_MODEL = r"C:\Users\lbye3\AppData\Roaming\MetaQuotes\Terminal\Common\Files\xauusd_ensemble_v6_OPTIMIZED_model.pkl"
+OUTPUT_CALIBRATION = r"C:\Users\lbye3\AppData\Roaming\MetaQuotes\Terminal\Common\Files\xauusd_ensemble_v6_OPTIMIZED_calibration.npz"
 OUTPUT_TRADES = r"C:\Users\lbye3\AppData\Roaming\MetaQuotes\Terminal\Common\Files\backtest_v6_OPTIMIZED_trades.csv"
 OUTPUT_THRESHOLD_ANALYSIS = r"C:\Users\lbye3\AppData\Roaming\MetaQuotes\Terminal\Common\Files\threshold_analysis_v6.csv"
+CACHE_DIR = r"C:\Users\lbye3\AppData\Roaming\MetaQuotes\Terminal\Common\Files\feature_cache"
+PREDICTION_DIR = r"C:\Users\lbye3\AppData\Roaming\MetaQuotes\Terminal\Common\Files\prediction_store"
+STUDY_DIR = r"C:\Users\lbye3\AppData\Roaming\MetaQuotes\Terminal\Common\Files\optuna_studies"
 
 # Paramètres TP/SL avec RR 4:1 GARANTI
 SL_ATR_MULTIPLIER = 1.5
@@ -40,105 +50,59 @@ MIN_RR = 4.0
 INITIAL_CAPITAL = 10000
 RISK_PERCENT = 1.0
 
+# Parallélisme walk-forward (une fenêtre = un processus)
+N_PARALLEL_WINDOWS = 3
+CORES_PER_WINDOW = max(1, (os.cpu_count() or 1) // N_PARALLEL_WINDOWS)
+
+# Optuna: pruning des trials + études SQLite reprises après interruption
+OPTUNA_PRUNER = 'median'  # 'median', 'hyperband' ou None
+
+# Types compacts: float32 (continues), int8 (flags / signaux), category (heure / jour)
+COMPACT_DTYPES = True
+CATEGORICAL_FEATURES = ['hour', 'day_of_week'] if COMPACT_DTYPES else []
+
 print(f"\nConfiguration:")
 print(f"   SL: {SL_ATR_MULTIPLIER}×ATR (variable)")
 print(f"   TP: {TP_ATR_MULTIPLIER}×ATR (variable)")
 print(f"   RR minimum garanti: {MIN_RR}:1")
 print(f"   Capital initial: ${INITIAL_CAPITAL}")
 print(f"   Risque par trade: {RISK_PERCENT}%")
+print(f"   Walk-forward: {N_PARALLEL_WINDOWS} fenêtres en parallèle x {CORES_PER_WINDOW} cœurs")
+
+print(f"\n{len(FEATURES)} features totales:")
+print(f"   - {len(FEATURES_BASE)} features de base (V5)")
+print(f"   - {len(FEATURES_ADVANCED)} nouvelles features (V6)")
 
 print("\n" + "="*80)
 print("CHARGEMENT DONNEES")
 print("="*80)
 
-df = pd.read_csv(CSV_FILE)
-df['time'] = pd.to_datetime(df['time'])
+# Lecture des seules colonnes utiles: features de base, colonnes nécessaires aux
+# features avancées (high/low...) et target (store Parquet, fallback CSV)
+report.stage("chargement")
+df = read_dataset(CSV_FILE, columns=LOAD_COLUMNS)
 
 print(f"\nTotal lignes: {len(df)}")
 print(f"Période: {df['time'].min()} à {df['time'].max()}")
 print(f"Colonnes: {df.shape[1]}")
 
-# NOUVEAU: Feature Engineering Avancé
-print("\n" + "="*80)
-print("FEATURE ENGINEERING AVANCÉ")
-print("="*80)
-
-def create_advanced_features(df):
-    """Création de features avancées"""
-
-    print("\nCréation de nouvelles features...")
-
-    # 1. Volatilité multi-timeframe
-    df['atr_ratio_h4_h1'] = df['atr14'] / (df['atr14'].rolling(96).mean() + 1e-10)  # 96 bars = 4 jours H1
-
-    # 2. Volume spike (écart par rapport à la moyenne)
-    df['volume_ma20'] = df['volume'].rolling(20).mean()
-    df['volume_spike'] = df['volume'] / (df['volume_ma20'] + 1e-10)
-
-    # 3. Distance prix / EMAs
-    df['price_distance_ema21'] = (df['close'] - df['ema21']) / df['close']
-    df['price_distance_ema55'] = (df['close'] - df['ema55']) / df['close']
-
-    # 4. RSI momentum (changement de RSI)
-    df['rsi_momentum'] = df['rsi_h4'] - df['rsi_h4'].shift(1)
-
-    # 5. MACD momentum
-    df['macd_momentum'] = df['macd_hist'] - df['macd_hist'].shift(1)
-
-    # 6. ADX strength (forte tendance si ADX > 25)
-    df['adx_strong_trend'] = (df['adx14'] > 25).astype(int)
-
-    # 7. Correlation DXY/VIX (inverse correlation avec or)
-    df['dxy_vix_product'] = df['DXY'] * df['VIX']  # Produit comme proxy de risk-off
-
-    # 8. Macro momentum
-    df['dxy_momentum'] = df['DXY'] - df['DXY'].shift(1)
-    df['vix_momentum'] = df['VIX'] - df['VIX'].shift(1)
-
-    # 9. Support/Resistance approximatif (high/low rolling)
-    df['resistance_distance'] = (df['high'].rolling(20).max() - df['close']) / df['close']
-    df['support_distance'] = (df['close'] - df['low'].rolling(20).min()) / df['close']
-
-    # 10. EMA crossover strength
-    df['ema_cross_strength'] = (df['ema21'] - df['ema55']) / df['close']
-
-    # 11. SMMA crossover H1 vs H4
-    df['smma_alignment'] = ((df['smma50'] > df['smma200']).astype(int) == df['trend_h4']).astype(int)
-
-    # 12. RSI extremes
-    df['rsi_extreme_high'] = (df['rsi_h4'] > 70).astype(int)
-    df['rsi_extreme_low'] = (df['rsi_h4'] < 30).astype(int)
-
-    # Remplir NaN
-    df = df.fillna(method='ffill').fillna(method='bfill').fillna(0)
-
-    print(f"✅ {15} nouvelles features créées")
-
-    return df
-
-df = create_advanced_features(df)
-
-# Recalculer target avec RR 4:1 garanti
+# Feature engineering avancé + target recalculée avec RR 4:1 garanti
 print("\n" + "="*80)
-print("RECALCUL TARGET AVEC RR 4:1 GARANTI")
+print("FEATURE ENGINEERING AVANCÉ + TARGET RR 4:1 GARANTI")
 print("="*80)
 
-def recalculate_target_rr4(row):
-    """Recalcule le target avec RR 4:1 minimum garanti"""
-    if row['target_binary'] == -1:
-        return row['target_binary']
+# Données, code des features et paramètres inchangés -> pas de recalcul
+report.stage("features + labels")
+df = cached_frame(prepare_dataset, df, CACHE_DIR,
+                  params={'sl': SL_ATR_MULTIPLIER, 'tp': TP_ATR_MULTIPLIER, 'min_rr': MIN_RR,
+                          'features': FEATURES_ADVANCED},
+                  code=[create_advanced_features, trade_levels, feature_registry])
 
-    atr = row['atr14']
-    sl_distance = atr * SL_ATR_MULTIPLIER
-    tp_distance = atr * TP_ATR_MULTIPLIER
+if COMPACT_DTYPES:
+    mb_before = memory_mb(df, FEATURES)
+    df = compact_frame(df, columns=FEATURES, categorical=CATEGORICAL_FEATURES)
+    print(f"Types compacts: {mb_before:.1f} Mo -> {memory_mb(df, FEATURES):.1f} Mo (features)")
 
-    rr_calculated = tp_distance / sl_distance if sl_distance > 0 else 0
-    if rr_calculated < MIN_RR and sl_distance > 0:
-        tp_distance = sl_distance * MIN_RR
-
-    return row['target_binary']
-
-df['target_binary_rr4'] = df.apply(recalculate_target_rr4, axis=1)
 df_valid = df[df['target_binary_rr4'] != -1].copy()
 
 print(f"\nLignes avec target valide: {len(df_valid)}")
@@ -154,273 +118,55 @@ print("\n" + "="*80)
 print("WALK-FORWARD OPTIMIZATION (3 FENÊTRES)")
 print("="*80)
 
-# Définir les fenêtres
-windows = [
-    {
-        'name': 'Window 1',
-        'train_start': '2008-01-01', 'train_end': '2016-12-31',
-        'calib_start': '2017-01-01', 'calib_end': '2017-12-31',
-        'test_start': '2018-01-01', 'test_end': '2019-12-31'
-    },
-    {
-        'name': 'Window 2',
-        'train_start': '2010-01-01', 'train_end': '2018-12-31',
-        'calib_start': '2019-01-01', 'calib_end': '2019-12-31',
-        'test_start': '2020-01-01', 'test_end': '2021-12-31'
-    },
-    {
-        'name': 'Window 3',
-        'train_start': '2012-01-01', 'train_end': '2020-12-31',
-        'calib_start': '2021-01-01', 'calib_end': '2021-12-31',
-        'test_start': '2022-01-01', 'test_end': '2025-12-31'
-    }
-]
-
-# Features complètes (V5 + nouvelles features V6)
-FEATURES_BASE = [
-    # Poseidon base
-    'ema21', 'ema55', 'macd', 'macd_signal', 'macd_hist', 'smma50', 'smma200',
-    'signal_ema', 'signal_macd', 'signal_smma', 'signal_score',
-    # H1
-    'atr14', 'adx14', 'di_plus', 'di_minus',
-    # H4
-    'smma50_h4', 'rsi_h4', 'trend_h4',
-    # Macro
-    'DXY', 'VIX', 'US10Y', 'SP500', 'NASDAQ', 'DOW',
-    # Filtres
-    'rsi_filter', 'adx_regime',
-    # Temporel
-    'hour', 'day_of_week', 'month', 'in_session',
-    # Prix
-    'close', 'volume'
-]
-
-FEATURES_ADVANCED = [
-    # Nouvelles V6
-    'atr_ratio_h4_h1', 'volume_spike', 'price_distance_ema21', 'price_distance_ema55',
-    'rsi_momentum', 'macd_momentum', 'adx_strong_trend', 'dxy_vix_product',
-    'dxy_momentum', 'vix_momentum', 'resistance_distance', 'support_distance',
-    'ema_cross_strength', 'smma_alignment', 'rsi_extreme_high', 'rsi_extreme_low'
-]
-
-FEATURES = FEATURES_BASE + FEATURES_ADVANCED
+# Fenêtres v6_dataset.WINDOWS
+windows = WINDOWS
 
-print(f"\n{len(FEATURES)} features totales:")
-print(f"   - {len(FEATURES_BASE)} features de base (V5)")
-print(f"   - {len(FEATURES_ADVANCED)} nouvelles features (V6)")
+# Entraînement Walk-Forward (fenêtres indépendantes, en parallèle)
+report.stage("walk-forward", windows=len(windows))
+all_models, all_test_results = train_windows(df_valid, windows, FEATURES, TARGET,
+                                             n_parallel=N_PARALLEL_WINDOWS,
+                                             cores_per_window=CORES_PER_WINDOW, n_trials=30,
+                                             categorical=CATEGORICAL_FEATURES,
+                                             study_dir=STUDY_DIR, pruner=OPTUNA_PRUNER)
+for r in all_test_results:
+    report.add_spans(r['spans'], parent=f"walk-forward/window {r['window']}")
 
-TARGET = 'target_binary_rr4'
-
-# Entraînement Walk-Forward
-all_models = []
-all_test_results = []
-
-for i, window in enumerate(windows, 1):
-    print(f"\n{'='*80}")
-    print(f"WINDOW {i}: {window['name']}")
-    print(f"{'='*80}")
-
-    # Split données
-    df_train = df_valid[(df_valid['time'] >= window['train_start']) & (df_valid['time'] <= window['train_end'])].copy()
-    df_calib = df_valid[(df_valid['time'] >= window['calib_start']) & (df_valid['time'] <= window['calib_end'])].copy()
-    df_test = df_valid[(df_valid['time'] >= window['test_start']) & (df_valid['time'] <= window['test_end'])].copy()
-
-    print(f"\nTrain: {len(df_train)} lignes ({window['train_start']} à {window['train_end']})")
-    print(f"Calib: {len(df_calib)} lignes ({window['calib_start']} à {window['calib_end']})")
-    print(f"Test:  {len(df_test)} lignes ({window['test_start']} à {window['test_end']})")
-
-    if len(df_train) < 1000 or len(df_calib) < 100 or len(df_test) < 100:
-        print(f"⚠️ Fenêtre {i} ignorée (données insuffisantes)")
-        continue
-
-    X_train = df_train[FEATURES]
-    y_train = df_train[TARGET]
-    X_calib = df_calib[FEATURES]
-    y_calib = df_calib[TARGET]
-    X_test = df_test[FEATURES]
-    y_test = df_test[TARGET]
-
-    # Optuna pour LightGBM (rapide, 30 trials)
-    print(f"\n--- Optimisation Optuna (30 trials) ---")
-
-    def objective(trial):
-        params = {
-            'objective': 'binary',
-            'metric': 'binary_logloss',
-            'boosting_type': 'gbdt',
-            'verbosity': -1,
-            'n_estimators': trial.suggest_int('n_estimators', 100, 300),
-            'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.05),
-            'num_leaves': trial.suggest_int('num_leaves', 20, 60),
-            'max_depth': trial.suggest_int('max_depth', 3, 6),
-            'min_child_samples': trial.suggest_int('min_child_samples', 20, 60),
-            'subsample': trial.suggest_float('subsample', 0.6, 0.9),
-            'colsample_bytree': trial.suggest_float('colsample_bytree', 0.6, 0.9),
-            'reg_alpha': trial.suggest_float('reg_alpha', 0.0, 1.0),
-            'reg_lambda': trial.suggest_float('reg_lambda', 0.0, 1.0),
-            'random_state': 42
-        }
-
-        model = lgb.LGBMClassifier(**params)
-        model.fit(X_train, y_train, eval_set=[(X_calib, y_calib)])
-
-        y_pred_proba = model.predict_proba(X_calib)[:, 1]
-        score = roc_auc_score(y_calib, y_pred_proba)
-
-        return score
-
-    study = optuna.create_study(direction='maximize', study_name=f'v6_window{i}')
-    study.optimize(objective, n_trials=30, show_progress_bar=False)
-
-    print(f"Meilleur ROC-AUC: {study.best_value:.4f}")
-
-    # Entraîner les 5 modèles
-    print(f"\n--- Entraînement Ensemble (5 modèles) ---")
-
-    # 1. LightGBM optimisé
-    best_params_lgb = study.best_params.copy()
-    best_params_lgb.update({'objective': 'binary', 'metric': 'binary_logloss', 'boosting_type': 'gbdt', 'verbosity': -1, 'random_state': 42})
-    lgbm_model = lgb.LGBMClassifier(**best_params_lgb)
-    lgbm_model.fit(X_train, y_train, eval_set=[(X_calib, y_calib)])
-
-    # 2. XGBoost
-    xgb_model = xgb.XGBClassifier(n_estimators=200, learning_rate=0.03, max_depth=5, subsample=0.8, colsample_bytree=0.8, random_state=42, eval_metric='logloss')
-    xgb_model.fit(X_train, y_train, eval_set=[(X_calib, y_calib)], verbose=False)
-
-    # 3. CatBoost
-    cat_model = CatBoostClassifier(iterations=200, learning_rate=0.03, depth=5, random_state=42, verbose=False)
-    cat_model.fit(X_train, y_train, eval_set=(X_calib, y_calib), verbose=False)
-
-    # 4. RandomForest
-    rf_model = RandomForestClassifier(n_estimators=200, max_depth=10, min_samples_split=20, random_state=42, n_jobs=-1)
-    rf_model.fit(X_train, y_train)
-
-    # 5. ExtraTrees
-    et_model = ExtraTreesClassifier(n_estimators=200, max_depth=10, min_samples_split=20, random_state=42, n_jobs=-1)
-    et_model.fit(X_train, y_train)
-
-    # Calibration
-    print(f"\n--- Calibration ---")
-    lgbm_calibrated = CalibratedClassifierCV(lgbm_model, method='isotonic', cv='prefit')
-    lgbm_calibrated.fit(X_calib, y_calib)
-
-    xgb_calibrated = CalibratedClassifierCV(xgb_model, method='isotonic', cv='prefit')
-    xgb_calibrated.fit(X_calib, y_calib)
-
-    cat_calibrated = CalibratedClassifierCV(cat_model, method='isotonic', cv='prefit')
-    cat_calibrated.fit(X_calib, y_calib)
-
-    rf_calibrated = CalibratedClassifierCV(rf_model, method='isotonic', cv='prefit')
-    rf_calibrated.fit(X_calib, y_calib)
-
-    et_calibrated = CalibratedClassifierCV(et_model, method='isotonic', cv='prefit')
-    et_calibrated.fit(X_calib, y_calib)
-
-    # Prédictions ensemble
-    y_pred_lgb = lgbm_calibrated.predict_proba(X_test)[:, 1]
-    y_pred_xgb = xgb_calibrated.predict_proba(X_test)[:, 1]
-    y_pred_cat = cat_calibrated.predict_proba(X_test)[:, 1]
-    y_pred_rf = rf_calibrated.predict_proba(X_test)[:, 1]
-    y_pred_et = et_calibrated.predict_proba(X_test)[:, 1]
-
-    # Moyenne pondérée (donner plus de poids aux meilleurs modèles)
-    y_pred_proba = (y_pred_lgb * 0.3 + y_pred_xgb * 0.25 + y_pred_cat * 0.25 + y_pred_rf * 0.1 + y_pred_et * 0.1)
-
-    # Sauvegarder pour analyse
-    all_models.append({
-        'window': i,
-        'lgbm': lgbm_calibrated,
-        'xgb': xgb_calibrated,
-        'catboost': cat_calibrated,
-        'rf': rf_calibrated,
-        'et': et_calibrated,
-        'features': FEATURES
-    })
+# Probabilités de test (ensemble + 5 modèles) par barre, réutilisables sans re-scorer
+prediction_store = PredictionStore(PREDICTION_DIR)
 
-    all_test_results.append({
-        'window': i,
-        'df_test': df_test,
-        'y_pred_proba': y_pred_proba,
-        'y_test': y_test
-    })
+def store_window_predictions(fingerprint, r):
+    prediction_store.put(fingerprint, r['df_test']['time'], {'proba': r['y_pred_proba'], **r['model_probas']})
 
-    print(f"✅ Window {i} terminée")
+for model_entry, r in zip(all_models, all_test_results):
+    store_window_predictions(model_fingerprint(*(model_entry[name] for name in ENSEMBLE_WEIGHTS)), r)
 
 # OPTIMISATION DU THRESHOLD
+report.stage("threshold")
 print("\n" + "="*80)
 print("OPTIMISATION DU THRESHOLD")
 print("="*80)
 
-# Combiner tous les résultats de test
-df_all_test = pd.concat([r['df_test'].assign(y_pred_proba=r['y_pred_proba']) for r in all_test_results])
-y_all_test = pd.concat([pd.Series(r['y_test'].values) for r in all_test_results])
+# Combiner tous les résultats de test; courbe de threshold complète (tri unique),
+# échantillonnée sur la grille 0.50-0.70, meilleur threshold par Sharpe
+risk_amount = INITIAL_CAPITAL * (RISK_PERCENT / 100)
+df_all_test, df_threshold, best = optimize_threshold(
+    all_test_results, TARGET, win_pnl=risk_amount * MIN_RR, loss_pnl=-risk_amount,
+    thresholds=np.arange(0.50, 0.71, 0.01))
+best_threshold = best['threshold']
 
 print(f"\nTotal test samples: {len(df_all_test)}")
-
-# Tester différents thresholds
-thresholds = np.arange(0.50, 0.71, 0.01)
-threshold_results = []
-
-for threshold in thresholds:
-    df_test_bt = df_all_test.copy()
-    df_test_bt['signal_binary'] = (df_test_bt['y_pred_proba'] >= threshold).astype(int)
-
-    # Filtrer trades
-    df_trades = df_test_bt[df_test_bt['signal_binary'] == 1].copy()
-
-    if len(df_trades) == 0:
-        continue
-
-    # Backtest simple
-    risk_amount = INITIAL_CAPITAL * (RISK_PERCENT / 100)
-    wins = (df_trades['target_binary_rr4'] == 1).sum()
-    losses = (df_trades['target_binary_rr4'] == 0).sum()
-    total_trades = len(df_trades)
-
-    if total_trades == 0:
-        continue
-
-    win_rate = wins / total_trades
-
-    # P&L
-    total_pnl = (wins * risk_amount * MIN_RR) - (losses * risk_amount)
-    expectancy = total_pnl / total_trades
-
-    # Sharpe approximatif
-    pnls = []
-    for _, row in df_trades.iterrows():
-        if row['target_binary_rr4'] == 1:
-            pnls.append(risk_amount * MIN_RR)
-        else:
-            pnls.append(-risk_amount)
-
-    sharpe = np.mean(pnls) / (np.std(pnls) + 1e-10) if len(pnls) > 0 else 0
-
-    threshold_results.append({
-        'threshold': threshold,
-        'total_trades': total_trades,
-        'win_rate': win_rate,
-        'expectancy': expectancy,
-        'sharpe': sharpe,
-        'total_pnl': total_pnl
-    })
-
-# Trouver meilleur threshold par Sharpe
-df_threshold = pd.DataFrame(threshold_results)
-best_idx = df_threshold['sharpe'].idxmax()
-best_threshold = df_threshold.loc[best_idx, 'threshold']
-
 print(f"\nMeilleur threshold trouvé: {best_threshold:.2f}")
-print(f"   Sharpe Ratio: {df_threshold.loc[best_idx, 'sharpe']:.4f}")
-print(f"   Win Rate: {df_threshold.loc[best_idx, 'win_rate']*100:.2f}%")
-print(f"   Expectancy: ${df_threshold.loc[best_idx, 'expectancy']:.2f}")
-print(f"   Total trades: {df_threshold.loc[best_idx, 'total_trades']:.0f}")
+print(f"   Sharpe Ratio: {best['sharpe']:.4f}")
+print(f"   Win Rate: {best['win_rate']*100:.2f}%")
+print(f"   Expectancy: ${best['expectancy']:.2f}")
+print(f"   Total trades: {best['total_trades']:.0f}")
 
 # Sauvegarder analyse
 df_threshold.to_csv(OUTPUT_THRESHOLD_ANALYSIS, index=False)
 print(f"\n✅ Analyse threshold sauvegardée: {OUTPUT_THRESHOLD_ANALYSIS}")
 
 # BACKTEST FINAL AVEC THRESHOLD OPTIMAL
+report.stage("backtest")
 print("\n" + "="*80)
 print(f"BACKTEST FINAL (Threshold: {best_threshold:.2f})")
 print("="*80)
@@ -507,6 +253,7 @@ else:
     print(f"   ❌ NON PROFITABLE: WR est {abs(margin):.2f} points en dessous du break-even")
 
 # Sauvegarder
+report.stage("compilation + sauvegarde")
 print("\n" + "="*80)
 print("SAUVEGARDE")
 print("="*80)
@@ -522,6 +269,9 @@ model_data = {
     'et': final_model['et'],
     'features': FEATURES,
     'threshold': best_threshold,
+    'weights': ENSEMBLE_WEIGHTS,
+    'training_window': windows[-1],
+    'training_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
     'config': {
         'sl_atr_mult': SL_ATR_MULTIPLIER,
         'tp_atr_mult': TP_ATR_MULTIPLIER,
@@ -530,8 +280,30 @@ model_data = {
     }
 }
 
-joblib.dump(model_data, OUTPUT_MODEL)
-print(f"\n✅ Modèle sauvegardé: {OUTPUT_MODEL}")
+# Ensemble compilé (arbres en tableaux NumPy) pour l'inférence faible latence,
+# stocké dans le bundle à côté des modèles natifs s'il reproduit model_data
+compiled = compile_ensemble(model_data, weights=ENSEMBLE_WEIGHTS)
+check = compare_with_model_data(compiled, model_data, all_test_results[-1]['df_test'][FEATURES])
+if check['ok']:
+    model_data['compiled'] = compiled
+
+bundle_dir = save_model(model_data, OUTPUT_MODEL)
+print(f"\n✅ Modèle sauvegardé: {bundle_dir} ({model_size_mb(OUTPUT_MODEL):.1f} MB)")
+gaps = ", ".join(f"{name} {check[name]:.1e}" for name in [*ENSEMBLE_WEIGHTS, 'ensemble', 'row'])
+if check['ok']:
+    print(f"✅ Ensemble compilé: {compiled.n_trees} arbres")
+    print(f"   Écart max vs model_data: {gaps}")
+    print(f"   Latence 1 barre: {check['latency_model_data_ms']:.2f} ms -> {check['latency_compiled_ms']:.2f} ms")
+else:
+    print(f"❌ Ensemble compilé NON sauvegardé (écart > {PARITY_TOLERANCE:.0e}): {gaps}")
+    print(f"   Serveur d'inférence indisponible pour ce modèle (python check_compiled_parity.py)")
+
+# Prédictions du modèle sauvegardé (window 3) indexées par l'empreinte du bundle
+store_window_predictions(saved_fingerprint(OUTPUT_MODEL), all_test_results[-1])
+
+# Calibration isotonique + poids (points de rupture, sans sklearn)
+compiled.calibration.save(OUTPUT_CALIBRATION)
+print(f"✅ Tables de calibration sauvegardées: {OUTPUT_CALIBRATION}")
 
 # Sauvegarder trades
 df_trades_save = df_trades_final[['time', 'close', 'y_pred_proba', 'signal_score', 'target_binary_rr4',
@@ -542,3 +314,5 @@ print(f"✅ Trades sauvegardés: {OUTPUT_TRADES}")
 print("\n" + "="*80)
 print("ENTRAINEMENT V6.0 OPTIMIZED TERMINE")
 print("="*80)
+
+report.save(OUTPUT_MODEL)
@@ -14,11 +14,10 @@ import numpy as np
 import lightgbm as lgb
 from sklearn.model_selection import TimeSeriesSplit
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
-import matplotlib.pyplot as plt
-import seaborn as sns
-import joblib
 import os
 from datetime import datetime
+from model_bundle import save_model, model_size_mb
+from run_report import RunReport
 
 print("=" * 80)
 print("🤖 ENTRAÎNEMENT MODÈLE ML - LIGHTGBM (DATASET ÉQUILIBRÉ)")
@@ -47,7 +46,10 @@ LGBM_PARAMS = {
 # Validation temporelle
 N_SPLITS = 5
 
+report = RunReport("train_lightgbm_balanced")
+
 # ==================== CHARGEMENT DONNÉES ====================
+report.stage("chargement")
 print("\n" + "=" * 80)
 print("📂 CHARGEMENT DONNÉES")
 print("=" * 80)
@@ -62,6 +64,7 @@ df = pd.read_csv(csv_path)
 print(f"✅ {len(df)} lignes chargées")
 
 # ==================== PRÉPARATION DONNÉES ====================
+report.stage("preparation")
 print("\n" + "=" * 80)
 print("🔧 PRÉPARATION DONNÉES AVEC UNDERSAMPLING")
 print("=" * 80)
@@ -115,6 +118,7 @@ if nan_count > 0:
 print(f"\n✅ Dataset final: {X.shape[0]} lignes × {X.shape[1]} features")
 
 # ==================== VALIDATION TEMPORELLE ====================
+report.stage("validation temporelle")
 print("\n" + "=" * 80)
 print("📈 VALIDATION TEMPORELLE (WALK-FORWARD)")
 print("=" * 80)
@@ -205,6 +209,7 @@ print(f"\n{'Win Rate (pred)':<20} {df_metrics['win_rate'].mean():.2f}%      ± {
 print(f"{'True Win Rate':<20} {df_metrics['true_win_rate'].mean():.2f}%      ± {df_metrics['true_win_rate'].std():.2f}%")
 
 # ==================== ENTRAÎNEMENT MODÈLE FINAL ====================
+report.stage("entrainement")
 print("\n" + "=" * 80)
 print("🏆 ENTRAÎNEMENT MODÈLE FINAL (sur dataset équilibré complet)")
 print("=" * 80)
@@ -224,6 +229,7 @@ final_model = lgb.train(
 print(f"✅ Modèle final entraîné avec {final_model.best_iteration} arbres")
 
 # ==================== FEATURE IMPORTANCE ====================
+report.stage("feature importance")
 print("\n" + "=" * 80)
 print("🔍 IMPORTANCE DES FEATURES")
 print("=" * 80)
@@ -237,7 +243,9 @@ feature_importance_df = pd.DataFrame({
 print(f"\n🏆 TOP 20 FEATURES LES PLUS IMPORTANTES:")
 print(feature_importance_df.head(20).to_string(index=False))
 
-# Graphique
+# Graphique (matplotlib chargé seulement ici)
+import matplotlib.pyplot as plt
+
 plt.figure(figsize=(10, 8))
 top_20 = feature_importance_df.head(20)
 plt.barh(range(len(top_20)), top_20['importance'].values)
@@ -253,6 +261,7 @@ print(f"\n💾 Graphique sauvegardé: {plot_path}")
 plt.close()
 
 # ==================== SAUVEGARDE MODÈLE ====================
+report.stage("sauvegarde")
 print("\n" + "=" * 80)
 print("💾 SAUVEGARDE MODÈLE")
 print("=" * 80)
@@ -271,10 +280,10 @@ model_data = {
     'threshold': 0.25
 }
 
-joblib.dump(model_data, model_path)
-print(f"✅ Modèle sauvegardé: {model_path}")
+bundle_dir = save_model(model_data, model_path)
+print(f"✅ Modèle sauvegardé: {bundle_dir}")
 
-file_size_mb = os.path.getsize(model_path) / (1024 * 1024)
+file_size_mb = model_size_mb(model_path)
 print(f"📦 Taille du fichier: {file_size_mb:.2f} MB")
 
 # ==================== RÉSUMÉ FINAL ====================
@@ -300,3 +309,5 @@ print(f"   Win Rate: 8.64% → {df_metrics['win_rate'].mean():.2f}%")
 print(f"   Le modèle peut maintenant VRAIMENT filtrer les signaux WIN!")
 
 print("\n" + "=" * 80)
+
+report.save(model_path)
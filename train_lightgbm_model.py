@@ -12,11 +12,10 @@ import numpy as np
 import lightgbm as lgb
 from sklearn.model_selection import TimeSeriesSplit
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
-import matplotlib.pyplot as plt
-import seaborn as sns
-import joblib
 import os
 from datetime import datetime
+from model_bundle import save_model, model_size_mb
+from run_report import RunReport
 
 print("=" * 80)
 print("🤖 ENTRAÎNEMENT MODÈLE ML - LIGHTGBM")
@@ -48,7 +47,10 @@ LGBM_PARAMS = {
 # Validation temporelle
 N_SPLITS = 5  # 5 folds pour walk-forward validation
 
+report = RunReport("train_lightgbm_model")
+
 # ==================== CHARGEMENT DONNÉES ====================
+report.stage("chargement")
 print("\n" + "=" * 80)
 print("📂 CHARGEMENT DONNÉES")
 print("=" * 80)
@@ -64,6 +66,7 @@ print(f"✅ {len(df)} lignes chargées")
 print(f"📊 {len(df.columns)} colonnes")
 
 # ==================== PRÉPARATION DONNÉES ====================
+report.stage("preparation")
 print("\n" + "=" * 80)
 print("🔧 PRÉPARATION DONNÉES")
 print("=" * 80)
@@ -108,6 +111,7 @@ else:
 print(f"\n✅ Dataset final: {X.shape[0]} lignes × {X.shape[1]} features")
 
 # ==================== VALIDATION TEMPORELLE ====================
+report.stage("validation temporelle")
 print("\n" + "=" * 80)
 print("📈 VALIDATION TEMPORELLE (WALK-FORWARD)")
 print("=" * 80)
@@ -200,6 +204,7 @@ print(f"\n{'Win Rate (pred)':<20} {df_metrics['win_rate'].mean():.2f}%      ± {
 print(f"{'True Win Rate':<20} {df_metrics['true_win_rate'].mean():.2f}%      ± {df_metrics['true_win_rate'].std():.2f}%")
 
 # ==================== ENTRAÎNEMENT MODÈLE FINAL ====================
+report.stage("entrainement")
 print("\n" + "=" * 80)
 print("🏆 ENTRAÎNEMENT MODÈLE FINAL (sur toutes les données)")
 print("=" * 80)
@@ -219,6 +224,7 @@ final_model = lgb.train(
 print(f"✅ Modèle final entraîné avec {final_model.best_iteration} arbres")
 
 # ==================== FEATURE IMPORTANCE ====================
+report.stage("feature importance")
 print("\n" + "=" * 80)
 print("🔍 IMPORTANCE DES FEATURES")
 print("=" * 80)
@@ -232,7 +238,9 @@ feature_importance_df = pd.DataFrame({
 print(f"\n🏆 TOP 20 FEATURES LES PLUS IMPORTANTES:")
 print(feature_importance_df.head(20).to_string(index=False))
 
-# Graphique
+# Graphique (matplotlib chargé seulement ici)
+import matplotlib.pyplot as plt
+
 plt.figure(figsize=(10, 8))
 top_20 = feature_importance_df.head(20)
 plt.barh(range(len(top_20)), top_20['importance'].values)
@@ -248,6 +256,7 @@ print(f"\n💾 Graphique sauvegardé: {plot_path}")
 plt.close()
 
 # ==================== SAUVEGARDE MODÈLE ====================
+report.stage("sauvegarde")
 print("\n" + "=" * 80)
 print("💾 SAUVEGARDE MODÈLE")
 print("=" * 80)
@@ -265,11 +274,11 @@ model_data = {
     'n_features': len(feature_cols)
 }
 
-joblib.dump(model_data, model_path)
-print(f"✅ Modèle sauvegardé: {model_path}")
+bundle_dir = save_model(model_data, model_path)
+print(f"✅ Modèle sauvegardé: {bundle_dir}")
 
 # Taille du fichier
-file_size_mb = os.path.getsize(model_path) / (1024 * 1024)
+file_size_mb = model_size_mb(model_path)
 print(f"📦 Taille du fichier: {file_size_mb:.2f} MB")
 
 # ==================== RÉSUMÉ FINAL ====================
@@ -296,3 +305,5 @@ print(f"   3. Optimiser les hyperparamètres avec Optuna (optionnel)")
 print(f"   4. Intégrer le modèle dans votre EA MT5")
 
 print("\n" + "=" * 80)
+
+report.save(model_path)
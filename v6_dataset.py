@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Dataset V6: features, fenêtres walk-forward et préparation (features avancées + target RR4)
+Version 1.0 - 2026-10-18
+
+OBJECTIF:
+- Sortir de train_ensemble_v6_OPTIMIZED.py les listes de features, les fenêtres
+  et prepare_dataset pour les partager avec le pipeline (run_pipeline.py)
+- Même code -> mêmes clés de cache (feature_cache) dans les deux chemins
+"""
+
+import pandas as pd
+from feature_registry import compute_features, required_columns
+from trade_levels import recalculate_target_rr
+
+# Features complètes (V5 + nouvelles features V6)
+FEATURES_BASE = [
+    # Poseidon base
+    'ema21', 'ema55', 'macd', 'macd_signal', 'macd_hist', 'smma50', 'smma200',
+    'signal_ema', 'signal_macd', 'signal_smma', 'signal_score',
+    # H1
+    'atr14', 'adx14', 'di_plus', 'di_minus',
+    # H4
+    'smma50_h4', 'rsi_h4', 'trend_h4',
+    # Macro
+    'DXY', 'VIX', 'US10Y', 'SP500', 'NASDAQ', 'DOW',
+    # Filtres
+    'rsi_filter', 'adx_regime',
+    # Temporel
+    'hour', 'day_of_week', 'month', 'in_session',
+    # Prix
+    'close', 'volume'
+]
+
+FEATURES_ADVANCED = [
+    # Nouvelles V6
+    'atr_ratio_h4_h1', 'volume_spike', 'price_distance_ema21', 'price_distance_ema55',
+    'rsi_momentum', 'macd_momentum', 'adx_strong_trend', 'dxy_vix_product',
+    'dxy_momentum', 'vix_momentum', 'resistance_distance', 'support_distance',
+    'ema_cross_strength', 'smma_alignment', 'rsi_extreme_high', 'rsi_extreme_low'
+]
+
+FEATURES = FEATURES_BASE + FEATURES_ADVANCED
+
+TARGET = 'target_binary_rr4'
+
+# Lecture des seules colonnes utiles: features de base, colonnes nécessaires aux
+# features avancées (high/low...) et target (store Parquet, fallback CSV)
+LOAD_COLUMNS = list(dict.fromkeys(['time', 'target_binary'] + FEATURES_BASE +
+                                  required_columns(FEATURES_ADVANCED)))
+
+# Fenêtres walk-forward
+WINDOWS = [
+    {
+        'name': 'Window 1',
+        'train_start': '2008-01-01', 'train_end': '2016-12-31',
+        'calib_start': '2017-01-01', 'calib_end': '2017-12-31',
+        'test_start': '2018-01-01', 'test_end': '2019-12-31'
+    },
+    {
+        'name': 'Window 2',
+        'train_start': '2010-01-01', 'train_end': '2018-12-31',
+        'calib_start': '2019-01-01', 'calib_end': '2019-12-31',
+        'test_start': '2020-01-01', 'test_end': '2021-12-31'
+    },
+    {
+        'name': 'Window 3',
+        'train_start': '2012-01-01', 'train_end': '2020-12-31',
+        'calib_start': '2021-01-01', 'calib_end': '2021-12-31',
+        'test_start': '2022-01-01', 'test_end': '2025-12-31'
+    }
+]
+
+
+def create_advanced_features(df):
+    """Création de features avancées (seulement FEATURES_ADVANCED et leurs dépendances)"""
+
+    print("\nCréation de nouvelles features...")
+
+    # Graphe de dépendances: atr14_roll_mean_96, volume_roll_mean_20, rsi_h4_lag1,
+    # high_roll_max_20... calculés une seule fois puis jetés
+    df = pd.concat([df, compute_features(df, FEATURES_ADVANCED)], axis=1)
+
+    # Remplir NaN
+    df = df.fillna(method='ffill').fillna(method='bfill').fillna(0)
+
+    print(f"✅ {len(FEATURES_ADVANCED)} nouvelles features créées")
+
+    return df
+
+
+def prepare_dataset(df):
+    """Features avancées + target RR4 (résultat mis en cache)"""
+    df = create_advanced_features(df)
+    df[TARGET] = recalculate_target_rr(df)
+    return df
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+Entraînement d'une fenêtre walk-forward (V6) - exécutable en processus séparé
+Version 1.0 - 2026-10-18
+
+OBJECTIF:
+- Sortir le corps de la boucle "for window in windows" de train_ensemble_v6_OPTIMIZED.py
+- Chaque fenêtre = job indépendant (Optuna 30 trials + 5 modèles + 5 calibrations)
+- Budget de cœurs par fenêtre (n_jobs) pour lancer les fenêtres en parallèle
+  (joblib / loky) sans sur-souscrire la machine
+- Les 5 modèles se partagent ce budget (ensemble_scheduler.fit_ensemble)
+- train_windows / optimize_threshold: boucle des fenêtres et choix du threshold,
+  partagés par le trainer V6 et run_pipeline.py
+
+NOTE:
+- Module séparé obligatoire: les workers loky importent train_window sans
+  ré-exécuter le script principal
+"""
+
+import pandas as pd
+import lightgbm as lgb
+import xgboost as xgb
+from catboost import CatBoostClassifier
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.ensemble import RandomForestClassifier, ExtraTreesClassifier
+from sklearn.metrics import roc_auc_score
+from joblib import Parallel, delayed
+from ensemble_scheduler import fit_ensemble
+from binned_folds import holdout_folds
+from optuna_studies import run_study, study_fingerprint, lgb_pruning_callback
+from compact_dtypes import categorical_params, memory_report
+from calibration_table import calibration_table, calibration_input
+from threshold_curve import threshold_curve, sample_curve, find_optimal_threshold
+from run_report import RunReport
+
+# Poids de la moyenne (plus de poids aux meilleurs modèles)
+ENSEMBLE_WEIGHTS = {'lgbm': 0.3, 'xgb': 0.25, 'catboost': 0.25, 'rf': 0.1, 'et': 0.1}
+
+
+def split_window(df_valid, window):
+    """Découpe train / calib / test d'une fenêtre (bornes incluses)."""
+    def period(start, end):
+        return df_valid[(df_valid['time'] >= start) & (df_valid['time'] <= end)].copy()
+
+    df_train = period(window['train_start'], window['train_end'])
+    df_calib = period(window['calib_start'], window['calib_end'])
+    df_test = period(window['test_start'], window['test_end'])
+    return df_train, df_calib, df_test
+
+
+def train_window(i, df_train, df_calib, df_test, features, target, n_jobs=1, n_trials=30,
+                 categorical=(), study_dir=None, pruner='median'):
+    """
+    Entraîne et calibre l'ensemble V6 sur une fenêtre walk-forward.
+
+    Args:
+        i: numéro de la fenêtre (1, 2, 3...)
+        df_train, df_calib, df_test: données de la fenêtre (split_window)
+        features: liste des features
+        target: colonne cible
+        n_jobs: cœurs alloués à cette fenêtre (tous les modèles)
+        n_trials: trials Optuna pour LightGBM
+        categorical: colonnes category (compact_dtypes) -> XGBoost / CatBoost natifs
+        study_dir: dossier SQLite des études Optuna (reprise après interruption, None: en mémoire)
+        pruner: pruner Optuna ('median', 'hyperband' ou None)
+
+    Returns:
+        (model_entry, test_result) au format de all_models / all_test_results
+    """
+    timer = RunReport(f"window {i}")
+    timer.stage("preparation")
+
+    X_train = df_train[features]
+    y_train = df_train[target]
+    X_calib = df_calib[features]
+    y_calib = df_calib[target]
+    X_test = df_test[features]
+    y_test = df_test[target]
+
+    memory_report({'X_train': X_train, 'X_calib': X_calib, 'X_test': X_test},
+                  f"Window {i} - Mémoire des matrices")
+    xgb_cat_params, cat_cat_params = categorical_params(categorical)
+
+    # Optuna pour LightGBM (rapide, 30 trials)
+    print(f"\n--- Window {i}: Optimisation Optuna ({n_trials} trials, {n_jobs} cœurs) ---")
+
+    # Train / calib binnés une seule fois pour tous les trials de la fenêtre
+    timer.stage("optuna", n_trials=n_trials)
+    tuning_folds = holdout_folds(X_train, y_train, X_calib, y_calib)
+
+    def objective(trial):
+        params = {
+            'objective': 'binary',
+            'metric': 'binary_logloss',
+            'boosting_type': 'gbdt',
+            'verbosity': -1,
+            'n_estimators': trial.suggest_int('n_estimators', 100, 300),
+            'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.05),
+            'num_leaves': trial.suggest_int('num_leaves', 20, 60),
+            'max_depth': trial.suggest_int('max_depth', 3, 6),
+            'min_child_samples': trial.suggest_int('min_child_samples', 20, 60),
+            'subsample': trial.suggest_float('subsample', 0.6, 0.9),
+            'colsample_bytree': trial.suggest_float('colsample_bytree', 0.6, 0.9),
+            'reg_alpha': trial.suggest_float('reg_alpha', 0.0, 1.0),
+            'reg_lambda': trial.suggest_float('reg_lambda', 0.0, 1.0),
+            'random_state': 42,
+            'n_jobs': n_jobs
+        }
+
+        # Même modèle que LGBMClassifier(**params).fit(X_train, y_train), sans re-binning.
+        # AUC calib rapportée toutes les 10 itérations (metric n'influe pas sur l'apprentissage)
+        fold = tuning_folds.folds(params)[0]
+        model = tuning_folds.train({**params, 'metric': 'auc'}, fold,
+                                   callbacks=[lgb_pruning_callback(trial, 'auc')])
+
+        y_pred_proba = model.predict(fold.X_val)
+        score = roc_auc_score(fold.y_val, y_pred_proba)
+
+        return score
+
+    # Fenêtres déjà parallèles: un seul worker Optuna par fenêtre
+    study = run_study(objective, f'v6_window{i}', study_dir, n_trials, n_workers=1, pruner=pruner,
+                      n_warmup_steps=50, fingerprint=study_fingerprint(X_train, y_train, X_calib, y_calib))
+
+    print(f"Window {i} - Meilleur ROC-AUC: {study.best_value:.4f}")
+
+    # Entraîner les 5 modèles
+    print(f"\n--- Window {i}: Entraînement Ensemble (5 modèles) ---")
+    timer.stage("fit", n_jobs=n_jobs, rows=len(X_train))
+
+    # 1. LightGBM optimisé
+    best_params_lgb = study.best_params.copy()
+    best_params_lgb.update({'objective': 'binary', 'metric': 'binary_logloss', 'boosting_type': 'gbdt',
+                            'verbosity': -1, 'random_state': 42})
+    lgbm_model = lgb.LGBMClassifier(**best_params_lgb)
+
+    # 2. XGBoost
+    xgb_model = xgb.XGBClassifier(n_estimators=200, learning_rate=0.03, max_depth=5, subsample=0.8, colsample_bytree=0.8,
+                                  random_state=42, eval_metric='logloss', **xgb_cat_params)
+
+    # 3. CatBoost
+    cat_model = CatBoostClassifier(iterations=200, learning_rate=0.03, depth=5, random_state=42, verbose=False,
+                                   **cat_cat_params)
+
+    # 4. RandomForest
+    rf_model = RandomForestClassifier(n_estimators=200, max_depth=10, min_samples_split=20, random_state=42)
+
+    # 5. ExtraTrees
+    et_model = ExtraTreesClassifier(n_estimators=200, max_depth=10, min_samples_split=20, random_state=42)
+
+    # Fits simultanés dans le budget de cœurs de la fenêtre
+    models = fit_ensemble([
+        ('lgbm', lgbm_model, (X_train, y_train), {'eval_set': [(X_calib, y_calib)]}),
+        ('xgb', xgb_model, (X_train, y_train), {'eval_set': [(X_calib, y_calib)], 'verbose': False}),
+        ('catboost', cat_model, (X_train, y_train), {'eval_set': (X_calib, y_calib), 'verbose': False}),
+        ('rf', rf_model, (X_train, y_train), {}),
+        ('et', et_model, (X_train, y_train), {}),
+    ], total_cores=n_jobs)
+
+    # Calibration
+    print(f"\n--- Window {i}: Calibration ---")
+    timer.stage("calibration")
+    calibrated = {}
+    for name, model in models.items():
+        calibrated[name] = CalibratedClassifierCV(model, method='isotonic', cv='prefit')
+        calibrated[name].fit(X_calib, y_calib)
+
+    # Prédictions ensemble: tables isotoniques pondérées sur la réponse brute vue
+    # par chaque calibrateur (decision_function si elle existe, ex. LightGBM >= 4.7)
+    # -> équivalent à sum(calibrated[name].predict_proba(X_test)[:, 1] * weight)
+    timer.stage("prediction", rows=len(X_test))
+    table = calibration_table(calibrated, ENSEMBLE_WEIGHTS)
+    raw_responses = {name: calibration_input(calibrated[name], X_test) for name in ENSEMBLE_WEIGHTS}
+    y_pred_proba = table.blend(raw_responses)
+
+    model_entry = {'window': i, **calibrated, 'features': features}
+    test_result = {
+        'window': i,
+        'df_test': df_test,
+        'y_pred_proba': y_pred_proba,
+        'model_probas': {name: table.calibrate(name, raw) for name, raw in raw_responses.items()},
+        'y_test': y_test
+    }
+
+    # Mesures du worker, rattachées au rapport du script principal (add_spans)
+    timer.finish()
+    test_result['spans'] = timer.spans
+
+    print(f"✅ Window {i} terminée")
+    return model_entry, test_result
+
+
+def train_windows(df_valid, windows, features, target, n_parallel=3, cores_per_window=1, n_trials=30,
+                  categorical=(), study_dir=None, pruner='median'):
+    """
+    Entraîne toutes les fenêtres walk-forward (n_parallel processus loky).
+
+    Les fenêtres avec trop peu de données (train < 1000, calib / test < 100) sont ignorées.
+
+    Returns:
+        (all_models, all_test_results) dans l'ordre des fenêtres
+    """
+    jobs = []
+    for i, window in enumerate(windows, 1):
+        print(f"\n{'='*80}")
+        print(f"WINDOW {i}: {window['name']}")
+        print(f"{'='*80}")
+
+        # Split données
+        df_train, df_calib, df_test = split_window(df_valid, window)
+
+        print(f"\nTrain: {len(df_train)} lignes ({window['train_start']} à {window['train_end']})")
+        print(f"Calib: {len(df_calib)} lignes ({window['calib_start']} à {window['calib_end']})")
+        print(f"Test:  {len(df_test)} lignes ({window['test_start']} à {window['test_end']})")
+
+        if len(df_train) < 1000 or len(df_calib) < 100 or len(df_test) < 100:
+            print(f"⚠️ Fenêtre {i} ignorée (données insuffisantes)")
+            continue
+
+        jobs.append(delayed(train_window)(i, df_train, df_calib, df_test, features, target,
+                                          n_jobs=cores_per_window, n_trials=n_trials,
+                                          categorical=categorical, study_dir=study_dir, pruner=pruner))
+
+    print(f"\nLancement de {len(jobs)} fenêtres ({n_parallel} en parallèle, "
+          f"{cores_per_window} cœurs/fenêtre)...")
+
+    # Parallel conserve l'ordre des fenêtres -> résultats déterministes
+    results = Parallel(n_jobs=n_parallel, backend='loky')(jobs)
+    return [model_entry for model_entry, _ in results], [test_result for _, test_result in results]
+
+
+def optimize_threshold(all_test_results, target, win_pnl, loss_pnl, thresholds):
+    """
+    Threshold de meilleur Sharpe sur les prédictions de test de toutes les fenêtres.
+
+    Args:
+        all_test_results: test_result de chaque fenêtre (train_window)
+        target: colonne cible
+        win_pnl, loss_pnl: P&L d'un trade gagnant / perdant
+        thresholds: grille de seuils (ex: np.arange(0.50, 0.71, 0.01))
+
+    Returns:
+        (df_all_test avec y_pred_proba, df_threshold, ligne du meilleur threshold)
+    """
+    df_all_test = pd.concat([r['df_test'].assign(y_pred_proba=r['y_pred_proba']) for r in all_test_results])
+
+    # Courbe de threshold complète (tri unique), échantillonnée sur la grille
+    curve = threshold_curve(df_all_test['y_pred_proba'].values, df_all_test[target].values,
+                            win_pnl=win_pnl, loss_pnl=loss_pnl)
+    df_threshold = sample_curve(curve, thresholds).rename(columns={'n_trades': 'total_trades'})
+    df_threshold = df_threshold[['threshold', 'total_trades', 'win_rate', 'expectancy', 'sharpe', 'total_pnl']]
+
+    return df_all_test, df_threshold, find_optimal_threshold(df_threshold, metric='sharpe')